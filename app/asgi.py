@@ -0,0 +1,551 @@
+"""ASGI entry point serving the API with async views.
+
+:func:`create_asgi_app` builds the same Flask application as
+:func:`app.create_app.create_app` and wraps it in :class:`AsyncAPI`, an ASGI
+callable (``uvicorn app.asgi:create_asgi_app --factory``). The routes that
+spend their time waiting are coroutines: registration, login and password
+changes await their PBKDF2 job on the :mod:`app.hashing` pool, and the wall
+stream is an async generator fed by an :class:`~app.events.AsyncSubscription`,
+so neither ties up a thread while it waits. They apply the same validation,
+rate limits and tokens as the blueprints and share their request handling
+and error bodies (:mod:`app.views`) and stream framing
+(:class:`~app.events.PostStream`). They also stand in for the Flask request
+hooks: they are counted in the request metrics under the blueprint's
+endpoint name, sampled by the profiler and report hashing time in
+``Server-Timing``. Store calls, which may block (SQLite waits on its
+database lock), run on the default thread pool.
+
+Every other request (listings and search with their HTTP cache, bulk import,
+export, pages, static files, metrics) is handed to the Flask app on the
+loop's default thread pool. The request body is read from the ASGI channel
+as the app consumes it, so the NDJSON import streams in both directions, and
+streamed responses are relayed chunk by chunk.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import io
+import json
+import math
+import re
+import sys
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+from urllib.parse import parse_qs
+
+from flask import Flask
+from marshmallow import ValidationError
+
+from .create_app import create_app
+from .events import PostStream, last_event_id, post_publisher
+from .hashing import HashingBusyError, server_timing, track_hash_timing
+from .metrics import metrics
+from .profiling import profiler, run_in_thread
+from .ratelimit import RateLimitExceeded, author_key, check_limits, email_key
+from .schemas import load_user_create, load_user_update
+from .store import (
+    authenticate_user_async,
+    create_post,
+    create_user_async,
+    delete_user,
+    get_user,
+    list_posts_since,
+    update_user_async,
+)
+from .tokens import InvalidTokenError, parse_bearer, session_tokens
+from .views import (
+    NOT_FOUND,
+    login_credentials,
+    login_result,
+    post_author,
+    post_error,
+    user_result,
+    user_write_error,
+)
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+Headers = List[Tuple[bytes, bytes]]
+
+
+class Request:
+    """The parts of an HTTP request the async views read."""
+
+    def __init__(self, scope: Scope, body: bytes) -> None:
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.body = body
+        self.headers = {
+            name.decode("latin-1").lower(): value.decode("latin-1")
+            for name, value in scope.get("headers", ())
+        }
+        client = scope.get("client")
+        self.remote_addr = client[0] if client else None
+        self.args = parse_qs(
+            scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True
+        )
+
+    def arg(self, name: str) -> Optional[str]:
+        values = self.args.get(name)
+        return values[0] if values else None
+
+    def get_json(self) -> Any:
+        """Return the decoded JSON body, or ``None`` (like ``silent=True``)."""
+
+        mimetype = self.headers.get("content-type", "").split(";")[0].strip()
+        if mimetype != "application/json" and not mimetype.endswith("+json"):
+            return None
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            return None
+
+
+class Reply(NamedTuple):
+    """A response; *body* is either complete or an async iterator of chunks."""
+
+    status: int
+    headers: Headers
+    body: Union[bytes, AsyncIterator[bytes]]
+
+
+View = Callable[..., Awaitable[Reply]]
+Route = Tuple[str, View]
+
+_USER_PATH = re.compile(r"/api/users/(\d+)")
+
+
+class AsyncAPI:
+    """ASGI application serving the hot API routes natively."""
+
+    def __init__(self, flask_app: Flask) -> None:
+        self.flask_app = flask_app
+        self.config = flask_app.config
+        self._routes: Dict[Tuple[str, str], Route] = {
+            (method, path): (self._endpoint(method, path), view)
+            for (method, path), view in {
+                ("POST", "/api/auth/login"): self.login,
+                ("POST", "/api/users"): self.create_user,
+                ("POST", "/api/wall/posts"): self.create_post,
+                ("GET", "/api/wall/stream"): self.stream_posts,
+            }.items()
+        }
+        self._user_routes: Dict[str, Route] = {
+            method: (self._endpoint(method, "/api/users/1"), view)
+            for method, view in {
+                "GET": self.get_user,
+                "PUT": self.update_user,
+                "DELETE": self.delete_user,
+            }.items()
+        }
+
+    def _endpoint(self, method: str, path: str) -> str:
+        # Metrics label native routes with the endpoint Flask would have used.
+        return self.flask_app.url_map.bind("").match(path, method)[0]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await _lifespan(receive, send)
+            return
+        if scope["type"] != "http":  # pragma: no cover - websockets
+            return
+        route, args = self._match(scope["method"], scope["path"])
+        if route is None:
+            await self._call_wsgi(scope, receive, send)
+            return
+        endpoint, view = route
+        request = Request(scope, await _read_body(receive))
+        started = time.perf_counter()
+        timing = track_hash_timing()
+        profiler.enter_request()
+        try:
+            reply = await self._dispatch(view, request, args)
+        finally:
+            profiler.exit_request()
+        metrics.observe_request(
+            endpoint, request.method, reply.status, time.perf_counter() - started
+        )
+        if timing[1]:
+            reply.headers.append((b"server-timing", server_timing(*timing).encode()))
+        await send(
+            {
+                "type": "http.response.start",
+                "status": reply.status,
+                "headers": reply.headers,
+            }
+        )
+        if isinstance(reply.body, bytes):
+            await send({"type": "http.response.body", "body": reply.body})
+        else:
+            await _stream(reply.body, receive, send)
+
+    async def _dispatch(self, view: View, request: Request, args: Tuple) -> Reply:
+        try:
+            return await view(request, *args)
+        except RateLimitExceeded as exc:
+            retry_after = str(max(1, math.ceil(exc.retry_after)))
+            return self._json({"error": "rate_limited"}, 429, Retry_After=retry_after)
+        except HashingBusyError:
+            return self._json({"error": "hashing_busy"}, 503, Retry_After="1")
+        except Exception:  # pragma: no cover - logging side effect
+            self.flask_app.logger.exception("Unhandled server error")
+            return self._json({"error": "internal_error"}, 500)
+
+    def _match(self, method: str, path: str) -> Tuple[Optional[Route], Tuple]:
+        route = self._routes.get((method, path))
+        if route is not None:
+            return route, ()
+        match = _USER_PATH.fullmatch(path)
+        if match is not None and method in self._user_routes:
+            return self._user_routes[method], (int(match.group(1)),)
+        return None, ()
+
+    # Responses -------------------------------------------------------------
+
+    def _json(self, payload: Any, status: int, **headers: str) -> Reply:
+        body = self.flask_app.json.dumps_bytes(payload) + b"\n"
+        return Reply(
+            status,
+            [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                *_encode_headers(headers),
+            ],
+            body,
+        )
+
+    async def _authorize(
+        self, request: Request, owner: Optional[int] = None, optional: bool = False
+    ) -> Tuple[Optional[int], Optional[Reply]]:
+        """Resolve the bearer token like :func:`app.tokens.require_auth`.
+
+        Returns the authenticated user id (or ``None``) and, when the
+        request must be refused, the error reply. Cutoffs kept in a shared
+        backend are read on a worker thread.
+        """
+
+        token = parse_bearer(request.headers.get("authorization"))
+        user_id = None
+        if token is not None:
+            try:
+                if session_tokens.shares_cutoffs:
+                    user_id = await run_in_thread(session_tokens.verify, token)
+                else:
+                    user_id = session_tokens.verify(token)
+            except InvalidTokenError:
+                return None, self._unauthorized("invalid_token")
+        elif not optional and self.config.get("AUTH_REQUIRED", False):
+            return None, self._unauthorized("authentication_required")
+        if owner is not None and user_id is not None and owner != user_id:
+            return user_id, self._json({"error": "forbidden"}, 403)
+        return user_id, None
+
+    def _unauthorized(self, error: str) -> Reply:
+        return self._json({"error": error}, 401, WWW_Authenticate="Bearer")
+
+    # Views -----------------------------------------------------------------
+
+    async def login(self, request: Request) -> Reply:
+        payload = request.get_json()
+        check_limits(
+            self.config,
+            [
+                ("RATE_LIMIT_LOGIN_IP", request.remote_addr),
+                ("RATE_LIMIT_LOGIN_EMAIL", email_key(payload)),
+            ],
+        )
+        credentials = login_credentials(payload)
+        if credentials is None:
+            return self._json({"error": "validation_error"}, 400)
+
+        user = await authenticate_user_async(*credentials)
+        if not user:
+            return self._json({"error": "invalid_credentials"}, 401)
+
+        token = await run_in_thread(session_tokens.issue, user["id"])
+        return self._json(*login_result(user, token, self.config))
+
+    async def create_user(self, request: Request) -> Reply:
+        payload = request.get_json() or {}
+        try:
+            data = load_user_create(payload, self.config["VALIDATION_MODE"])
+            user = await create_user_async(
+                data["name"], data["email"], data["password"]
+            )
+        except (ValidationError, ValueError) as exc:
+            return self._json(*user_write_error(exc))
+        return self._json(user, 201)
+
+    async def get_user(self, request: Request, uid: int) -> Reply:
+        return self._json(*user_result(await run_in_thread(get_user, uid)))
+
+    async def update_user(self, request: Request, uid: int) -> Reply:
+        _, refused = await self._authorize(request, owner=uid)
+        if refused is not None:
+            return refused
+        payload = request.get_json() or {}
+        try:
+            data = load_user_update(payload, self.config["VALIDATION_MODE"])
+            user = await update_user_async(uid, **data)
+        except (ValidationError, ValueError) as exc:
+            return self._json(*user_write_error(exc))
+        return self._json(*user_result(user))
+
+    async def delete_user(self, request: Request, uid: int) -> Reply:
+        _, refused = await self._authorize(request, owner=uid)
+        if refused is not None:
+            return refused
+        if not await run_in_thread(delete_user, uid):
+            return self._json(*NOT_FOUND)
+        return Reply(204, [], b"")
+
+    async def create_post(self, request: Request) -> Reply:
+        payload = request.get_json() or {}
+        author = request.headers.get("x-author")
+        check_limits(
+            self.config,
+            [
+                ("RATE_LIMIT_POSTS_IP", request.remote_addr),
+                ("RATE_LIMIT_POSTS_AUTHOR", author_key(author)),
+            ],
+        )
+        user_id, refused = await self._authorize(request, optional=True)
+        if refused is not None:
+            return refused
+        user = None
+        if user_id is not None:
+            user = await run_in_thread(get_user, user_id)
+        author = post_author(author, user)
+
+        try:
+            post = await run_in_thread(create_post, payload.get("content"), author)
+        except ValueError as exc:
+            return self._json(*post_error(exc))
+        return self._json(post, 201)
+
+    async def stream_posts(self, request: Request) -> Reply:
+        try:
+            last_id = last_event_id(
+                request.headers.get("last-event-id") or request.arg("last_event_id")
+            )
+        except ValueError:
+            return self._json({"error": "validation_error"}, 400)
+
+        heartbeat = self.config["SSE_HEARTBEAT_SECONDS"]
+        backlog_limit = self.config["SSE_BACKLOG"]
+        stream = PostStream(
+            last_id, self.flask_app.json.dumps, self.config["SSE_RETRY_MS"]
+        )
+
+        async def generate() -> AsyncIterator[bytes]:
+            # Subscribe before reading the backlog so no post falls in between.
+            subscription = post_publisher.subscribe_async()
+            try:
+                yield stream.opening().encode()
+                if last_id is not None:
+                    backlog = await run_in_thread(
+                        list_posts_since, last_id, backlog_limit
+                    )
+                    for frame in stream.backlog(backlog):
+                        yield frame.encode()
+                while not stream.ended and not subscription.overflowed:
+                    frame = stream.frame(await subscription.get(heartbeat))
+                    if frame:
+                        yield frame.encode()
+            finally:
+                post_publisher.unsubscribe(subscription)
+
+        headers = _encode_headers(
+            {
+                "Content-Type": "text/event-stream; charset=utf-8",
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no",
+            }
+        )
+        return Reply(200, headers, generate())
+
+    # WSGI fallback ---------------------------------------------------------
+
+    async def _call_wsgi(self, scope: Scope, receive: Receive, send: Send) -> None:
+        loop = asyncio.get_running_loop()
+        environ = _wsgi_environ(scope, _RequestBody(receive, loop))
+        started: Dict[str, Any] = {}
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            started["status"] = int(status.split(" ", 1)[0])
+            started["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers
+            ]
+
+        def begin():
+            iterable = self.flask_app(environ, start_response)
+            iterator = iter(iterable)
+            return iterable, iterator, next(iterator, None)
+
+        # Each step may run on a different executor thread, but a streamed
+        # response keeps its request context pushed between steps, so they
+        # all share one copy of the context variables.
+        context = contextvars.copy_context()
+        iterable, iterator, chunk = await loop.run_in_executor(None, context.run, begin)
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": started["status"],
+                    "headers": started["headers"],
+                }
+            )
+            while chunk is not None:
+                if chunk:
+                    await send(
+                        {"type": "http.response.body", "body": chunk, "more_body": True}
+                    )
+                chunk = await loop.run_in_executor(
+                    None, context.run, next, iterator, None
+                )
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                await loop.run_in_executor(None, context.run, close)
+
+
+def _encode_headers(headers: Dict[str, str]) -> Headers:
+    return [
+        (name.replace("_", "-").lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in headers.items()
+    ]
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+class _RequestBody(io.RawIOBase):
+    """``wsgi.input`` pulling the ASGI request body as the WSGI app reads it.
+
+    Reads happen on a worker thread; each ``http.request`` message is
+    awaited on the event loop, so only the unread part of a large body is
+    ever buffered.
+    """
+
+    def __init__(self, receive: Receive, loop: asyncio.AbstractEventLoop) -> None:
+        self._receive = receive
+        self._loop = loop
+        self._chunk = b""
+        self._offset = 0
+        self._done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        while self._offset >= len(self._chunk) and not self._done:
+            message = asyncio.run_coroutine_threadsafe(
+                self._receive(), self._loop
+            ).result()
+            if message["type"] != "http.request":
+                self._done = True
+                break
+            self._chunk, self._offset = message.get("body", b""), 0
+            self._done = not message.get("more_body", False)
+        size = min(len(buffer), len(self._chunk) - self._offset)
+        buffer[:size] = self._chunk[self._offset : self._offset + size]
+        self._offset += size
+        return size
+
+
+async def _stream(chunks: AsyncIterator[bytes], receive: Receive, send: Send) -> None:
+    """Send *chunks* as they are produced until they end or the client leaves."""
+
+    async def pump() -> None:
+        async for chunk in chunks:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def disconnected() -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    tasks = [asyncio.ensure_future(pump()), asyncio.ensure_future(disconnected())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _lifespan(receive: Receive, send: Send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+def _wsgi_environ(scope: Scope, body: io.RawIOBase) -> Dict[str, Any]:
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ: Dict[str, Any] = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BufferedReader(body),
+        # The ASGI server delimits the body, with or without Content-Length.
+        "wsgi.input_terminated": True,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", ()):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = "HTTP_" + name
+        value = raw_value.decode("latin-1")
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+def create_asgi_app(testing: bool = False) -> AsyncAPI:
+    """Return the ASGI application; the Flask app is at ``.flask_app``."""
+
+    return AsyncAPI(create_app(testing))
+
+
+__all__ = ["AsyncAPI", "create_asgi_app"]
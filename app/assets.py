@@ -0,0 +1,228 @@
+"""Fingerprinted, precompressed static assets.
+
+At startup (or ahead of time with ``flask build-assets``) every file under
+``app/static`` is copied to ``STATIC_BUILD_DIR`` under a name carrying a
+hash of its content (``js/app.3f2a9c41d0b7.js``), next to ``.gz`` and, when
+the ``brotli`` package is installed, ``.br`` variants of the compressible
+ones. ``url_for('static', filename=...)`` then yields the hashed name, so a
+changed file gets a new URL and the old one can be cached forever: hashed
+names are served with ``Cache-Control: immutable`` and the smallest variant
+the client accepts, without compressing per request.
+
+Unhashed names keep Flask's default handling, so old links still work.
+Building is idempotent and writes nothing once the build is current, so
+after ``flask build-assets`` startup only reads; files are written under
+temporary names and renamed into place, so workers starting together do not
+see partial files.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import click
+from flask import Flask, current_app, request, send_from_directory
+
+try:  # pragma: no cover - depends on the environment
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+MANIFEST = "manifest.json"
+IMMUTABLE = "public, max-age=31536000, immutable"
+COMPRESSIBLE = (".css", ".js", ".json", ".map", ".svg", ".txt", ".html")
+HASH_LENGTH = 12
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+def _compressors() -> List[Tuple[str, str]]:
+    """Return the ``(encoding, suffix)`` pairs this process can build."""
+
+    available = [("gzip", SUFFIXES["gzip"])]
+    if brotli is not None:
+        available.insert(0, ("br", SUFFIXES["br"]))
+    return available
+
+
+def _compress(encoding: str, data: bytes) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    # mtime=0 keeps the output identical across builds.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, "wb") as handle:
+        handle.write(data)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+
+def fingerprinted_name(filename: str, data: bytes) -> str:
+    """Return *filename* with a hash of *data* before its extension."""
+
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    root, ext = os.path.splitext(filename)
+    return f"{root}.{digest}{ext}"
+
+
+def build_assets(static_dir: str, build_dir: str) -> Dict[str, Dict[str, object]]:
+    """Fingerprint and precompress the files of *static_dir* into *build_dir*.
+
+    Returns the manifest, keyed by path relative to *static_dir*: the hashed
+    path and the encodings available for it. It is also written to
+    ``manifest.json`` in *build_dir*.
+    """
+
+    manifest: Dict[str, Dict[str, object]] = {}
+    build_root = os.path.abspath(build_dir)
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != build_root)
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            filename = os.path.relpath(path, static_dir).replace(os.sep, "/")
+            with open(path, "rb") as handle:
+                data = handle.read()
+            hashed = fingerprinted_name(filename, data)
+            target = os.path.join(build_dir, hashed)
+            if not os.path.exists(target):
+                _write(target, data)
+            encodings = []
+            if name.endswith(COMPRESSIBLE):
+                for encoding, suffix in _compressors():
+                    if not os.path.exists(target + suffix):
+                        compressed = _compress(encoding, data)
+                        if len(compressed) >= len(data):
+                            continue
+                        _write(target + suffix, compressed)
+                    encodings.append(encoding)
+            manifest[filename] = {"path": hashed, "encodings": encodings}
+
+    encoded = json.dumps(manifest, indent=2, sort_keys=True).encode()
+    manifest_path = os.path.join(build_dir, MANIFEST)
+    try:
+        with open(manifest_path, "rb") as handle:
+            current = handle.read() == encoded
+    except OSError:
+        current = False
+    if not current:
+        _write(manifest_path, encoded)
+    return manifest
+
+
+class AssetManifest:
+    """Lookups between source names, hashed names and their encodings.
+
+    Only encodings whose precompressed file exists in *build_dir* are kept,
+    whatever the manifest lists and whichever compressors this process has.
+    """
+
+    def __init__(self, build_dir: str, manifest: Mapping[str, Mapping]) -> None:
+        self.build_dir = build_dir
+        self.urls = {name: entry["path"] for name, entry in manifest.items()}
+        self._hashed = {
+            entry["path"]: (name, self._on_disk(entry["path"], entry["encodings"]))
+            for name, entry in manifest.items()
+        }
+
+    def _on_disk(self, hashed: str, encodings: List[str]) -> Tuple[str, ...]:
+        path = os.path.join(self.build_dir, hashed)
+        return tuple(
+            encoding
+            for encoding in encodings
+            if encoding in SUFFIXES and os.path.isfile(path + SUFFIXES[encoding])
+        )
+
+    def lookup(self, hashed: str) -> Optional[Tuple[str, Tuple[str, ...]]]:
+        """Return the source name and encodings of a hashed name, if known."""
+
+        return self._hashed.get(hashed)
+
+
+def _static_url_defaults(endpoint: str, values: Dict[str, str]) -> None:
+    if endpoint != "static" or "filename" not in values:
+        return
+    assets = current_app.extensions.get("assets")
+    if assets is not None:
+        values["filename"] = assets.urls.get(values["filename"], values["filename"])
+
+
+def _serve_static(filename: str):
+    assets: AssetManifest = current_app.extensions["assets"]
+    entry = assets.lookup(filename)
+    if entry is None:
+        return current_app.send_static_file(filename)
+    source, encodings = entry
+    chosen = None
+    for encoding in encodings:
+        if request.accept_encodings[encoding]:
+            chosen = encoding
+            break
+    mimetype = mimetypes.guess_type(source)[0] or "application/octet-stream"
+    served = filename + (SUFFIXES[chosen] if chosen else "")
+    response = send_from_directory(assets.build_dir, served, mimetype=mimetype)
+    if chosen:
+        response.content_encoding = chosen
+    if encodings:
+        response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = IMMUTABLE
+    return response
+
+
+def configure_assets(app: Flask) -> Optional[AssetManifest]:
+    """Build the assets of *app* per ``STATIC_FINGERPRINT``/``STATIC_BUILD_DIR``."""
+
+    if not app.config.get("STATIC_FINGERPRINT", True) or not app.static_folder:
+        app.extensions.pop("assets", None)
+        return None
+    build_dir = app.config.get("STATIC_BUILD_DIR") or os.path.join(
+        app.instance_path, "static"
+    )
+    try:
+        manifest = build_assets(app.static_folder, build_dir)
+    except OSError:
+        app.logger.warning("Could not build static assets in %s", build_dir)
+        app.extensions.pop("assets", None)
+        return None
+    assets = AssetManifest(build_dir, manifest)
+    app.extensions["assets"] = assets
+    return assets
+
+
+def _build_command() -> None:
+    """Build the fingerprinted static assets and list them."""
+
+    assets = configure_assets(current_app)
+    if assets is None:
+        raise click.ClickException("static fingerprinting is disabled or failed")
+    click.echo(assets.build_dir)
+    for name, hashed in sorted(assets.urls.items()):
+        encodings = " ".join(assets.lookup(hashed)[1])
+        click.echo(f"  {name} -> {hashed} {encodings}".rstrip())
+
+
+def init_app(app: Flask) -> None:
+    """Fingerprint ``app/static`` and serve hashed names with long caching."""
+
+    app.cli.command("build-assets")(_build_command)
+    if configure_assets(app) is None:
+        return
+    app.url_defaults(_static_url_defaults)
+    app.view_functions["static"] = _serve_static
+
+
+__all__ = [
+    "AssetManifest",
+    "build_assets",
+    "configure_assets",
+    "fingerprinted_name",
+    "init_app",
+]
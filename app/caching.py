@@ -0,0 +1,208 @@
+"""HTTP caching for the listing endpoints.
+
+Two layers sit in front of the store: conditional requests answered from
+collection versions (``ETag``/``Last-Modified``), and :class:`ResponseCache`,
+an LRU of encoded (and optionally gzipped) listing pages invalidated by the
+store's mutation functions.
+"""
+
+from __future__ import annotations
+
+import gzip
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Hashable, Mapping, Optional, Tuple
+
+from flask import Response, current_app, request
+
+from .storage.base import Version
+
+EncodedPage = Tuple[bytes, Optional[int]]
+
+
+def last_modified(version: Version) -> int:
+    """Return the ``Last-Modified`` second to advertise for *version*.
+
+    HTTP dates have one-second resolution, so a later write in the second
+    *version* was made in would carry the same date. Until that second is
+    over the date is set one second earlier, so a client revalidating with
+    it compares older than any write made in that second.
+    """
+
+    second = int(version.modified)
+    return second - 1 if second >= int(time.time()) else second
+
+
+def apply_validators(response: Response, version: Version) -> Response:
+    """Attach ``ETag``/``Last-Modified`` for *version* to *response*.
+
+    ``Cache-Control: no-cache`` makes clients revalidate on every use, which
+    is cheap because an unchanged collection is answered with a bare 304.
+    """
+
+    response.set_etag(version.tag, weak=True)
+    response.last_modified = datetime.fromtimestamp(
+        last_modified(version), timezone.utc
+    )
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified(version: Version) -> Optional[Response]:
+    """Return a 304 response if the client already holds *version*.
+
+    ``If-None-Match`` takes precedence over ``If-Modified-Since`` as required
+    by RFC 9110. Only the collection version is consulted, never its data.
+    """
+
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(version.tag)
+    elif request.if_modified_since:
+        fresh = int(version.modified) <= request.if_modified_since.timestamp()
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    return apply_validators(Response(status=304), version)
+
+
+class CachedListing:
+    """Encoded JSON body of one listing page plus its next cursor."""
+
+    __slots__ = ("body", "next_cursor", "_gzipped")
+
+    def __init__(self, body: bytes, next_cursor: Optional[int]) -> None:
+        self.body = body
+        self.next_cursor = next_cursor
+        self._gzipped: Optional[bytes] = None
+
+    def gzipped(self, level: int) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=level, mtime=0)
+        return self._gzipped
+
+
+class ResponseCache:
+    """Bounded LRU of :class:`CachedListing` keyed by collection and request.
+
+    Keys embed the collection version, so entries written by another worker
+    process are never served stale. Within this process the store also calls
+    :meth:`invalidate` on every mutation, so outdated pages are dropped
+    immediately instead of waiting for LRU eviction.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Hashable], CachedListing]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, collection: str, key: Hashable) -> Optional[CachedListing]:
+        with self._lock:
+            entry = self._entries.get((collection, key))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((collection, key))
+            self.hits += 1
+            return entry
+
+    def put(self, collection: str, key: Hashable, entry: CachedListing) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[(collection, key)] = entry
+            self._entries.move_to_end((collection, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, collection: str) -> None:
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == collection]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.invalidations = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+response_cache = ResponseCache()
+
+
+def configure_cache(config: Mapping[str, Any]) -> None:
+    """Size the response cache from ``RESPONSE_CACHE_MAX_ENTRIES``."""
+
+    response_cache.max_entries = int(config.get("RESPONSE_CACHE_MAX_ENTRIES", 256))
+    response_cache.clear()
+
+
+def cached_listing(
+    collection: str, version: Version, key: Hashable, build: Callable[[], EncodedPage]
+) -> Response:
+    """Return the JSON listing for *key*, building it with *build* on a miss.
+
+    *build* returns the encoded JSON body and the next cursor.
+
+    The response carries the ``X-Next-Cursor`` header, conditional-request
+    validators for *version*, and ``X-Cache: HIT``/``MISS``. When
+    ``RESPONSE_CACHE_GZIP`` is on and the client accepts gzip, the compressed
+    body is computed once per entry and reused.
+    """
+
+    config = current_app.config
+    cache_key = (version.tag, key)
+    entry = None
+    if config["RESPONSE_CACHE_ENABLED"]:
+        entry = response_cache.get(collection, cache_key)
+    status = "HIT" if entry is not None else "MISS"
+    if entry is None:
+        body, next_cursor = build()
+        entry = CachedListing(body + b"\n", next_cursor)
+        if config["RESPONSE_CACHE_ENABLED"]:
+            response_cache.put(collection, cache_key, entry)
+
+    response = Response(entry.body, mimetype="application/json")
+    if config["RESPONSE_CACHE_GZIP"]:
+        response.vary.add("Accept-Encoding")
+        if (
+            len(entry.body) >= config["RESPONSE_CACHE_GZIP_MIN_BYTES"]
+            and "gzip" in request.accept_encodings
+        ):
+            response.set_data(entry.gzipped(config["RESPONSE_CACHE_GZIP_LEVEL"]))
+            response.content_encoding = "gzip"
+    if entry.next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(entry.next_cursor)
+    response.headers["X-Cache"] = status
+    return apply_validators(response, version)
+
+
+__all__ = [
+    "CachedListing",
+    "ResponseCache",
+    "apply_validators",
+    "cached_listing",
+    "configure_cache",
+    "not_modified",
+    "response_cache",
+]
@@ -10,6 +10,65 @@ class Config:
 
     SECRET_KEY = os.environ.get("SECRET_KEY", "change-me")
     JSON_SORT_KEYS = False
+    JSON_FAST_PATH = os.environ.get("JSON_FAST_PATH", "1") == "1"
+    VALIDATION_MODE = os.environ.get("VALIDATION_MODE", "compiled")
+    STORE_BACKEND = os.environ.get("STORE_BACKEND", "memory")
+    SQLITE_PATH = os.environ.get("SQLITE_PATH", "app.db")
+    STORE_JOURNAL_DIR = os.environ.get("STORE_JOURNAL_DIR")
+    SHARED_STORE_PATH = os.environ.get("SHARED_STORE_PATH", "/dev/shm/app-store")
+    SHARED_STORE_SIZE = int(os.environ.get("SHARED_STORE_SIZE", 256 << 20))
+    SHARED_STORE_MAX_USERS = int(os.environ.get("SHARED_STORE_MAX_USERS", 1_000_000))
+    JOURNAL_FSYNC_INTERVAL = float(os.environ.get("JOURNAL_FSYNC_INTERVAL", 0.05))
+    JOURNAL_SNAPSHOT_EVERY = int(os.environ.get("JOURNAL_SNAPSHOT_EVERY", 100_000))
+    USERS_PAGE_SIZE = int(os.environ.get("USERS_PAGE_SIZE", 100))
+    USERS_PAGE_MAX = int(os.environ.get("USERS_PAGE_MAX", 1000))
+    USERS_BULK_BATCH_SIZE = int(os.environ.get("USERS_BULK_BATCH_SIZE", 64))
+    USERS_BULK_MAX_LINE_BYTES = int(os.environ.get("USERS_BULK_MAX_LINE_BYTES", 16384))
+    USERS_BULK_MAX_LINES = int(os.environ.get("USERS_BULK_MAX_LINES", 10_000))
+    USERS_SEARCH_LIMIT = int(os.environ.get("USERS_SEARCH_LIMIT", 10))
+    USERS_SEARCH_MAX = int(os.environ.get("USERS_SEARCH_MAX", 50))
+    USERS_EXPORT_CHUNK = int(os.environ.get("USERS_EXPORT_CHUNK", 500))
+    WALL_MAX_POSTS = int(os.environ.get("WALL_MAX_POSTS", 10_000))
+    WALL_PAGE_SIZE = int(os.environ.get("WALL_PAGE_SIZE", 50))
+    WALL_PAGE_MAX = int(os.environ.get("WALL_PAGE_MAX", 200))
+    STATIC_FINGERPRINT = os.environ.get("STATIC_FINGERPRINT", "1") == "1"
+    STATIC_BUILD_DIR = os.environ.get("STATIC_BUILD_DIR")
+    RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "1") == "1"
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 256))
+    RESPONSE_CACHE_GZIP = os.environ.get("RESPONSE_CACHE_GZIP", "1") == "1"
+    RESPONSE_CACHE_GZIP_MIN_BYTES = 1024
+    RESPONSE_CACHE_GZIP_LEVEL = 6
+    SSE_QUEUE_SIZE = int(os.environ.get("SSE_QUEUE_SIZE", 100))
+    SSE_BACKLOG = int(os.environ.get("SSE_BACKLOG", 200))
+    SSE_HEARTBEAT_SECONDS = float(os.environ.get("SSE_HEARTBEAT_SECONDS", 15))
+    SSE_RETRY_MS = int(os.environ.get("SSE_RETRY_MS", 3000))
+    SSE_POLL_SECONDS = float(os.environ.get("SSE_POLL_SECONDS", 0.5))
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+    PROFILER_ENABLED = os.environ.get("PROFILER_ENABLED", "0") == "1"
+    PROFILER_TOKEN = os.environ.get("PROFILER_TOKEN")
+    PROFILER_REQUIRE_TOKEN = False
+    PROFILER_MAX_SECONDS = float(os.environ.get("PROFILER_MAX_SECONDS", 30))
+    AUTH_REQUIRED = os.environ.get("AUTH_REQUIRED", "0") == "1"
+    AUTH_TOKEN_MAX_AGE = float(os.environ.get("AUTH_TOKEN_MAX_AGE", 3600))
+    AUTH_TOKEN_CACHE_SIZE = int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", 10_000))
+    RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") == "1"
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", 100_000))
+    RATE_LIMIT_LOGIN_IP = os.environ.get("RATE_LIMIT_LOGIN_IP", "30/minute")
+    RATE_LIMIT_LOGIN_EMAIL = os.environ.get("RATE_LIMIT_LOGIN_EMAIL", "5/minute")
+    RATE_LIMIT_POSTS_IP = os.environ.get("RATE_LIMIT_POSTS_IP", "20/minute")
+    RATE_LIMIT_POSTS_AUTHOR = os.environ.get("RATE_LIMIT_POSTS_AUTHOR", "10/minute")
+    RATE_LIMIT_BULK_IP = os.environ.get("RATE_LIMIT_BULK_IP", "10/hour")
+    RATE_LIMIT_BULK_USER = os.environ.get("RATE_LIMIT_BULK_USER", "5/hour")
+    HASH_EXECUTOR = os.environ.get("HASH_EXECUTOR", "thread")
+    HASH_WORKERS = int(os.environ.get("HASH_WORKERS", 0)) or os.cpu_count() or 1
+    HASH_QUEUE_DEPTH = int(os.environ.get("HASH_QUEUE_DEPTH", 32))
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256")
+    # Calibrate PBKDF2 iterations at startup to take this long; 0 keeps the
+    # method above as is.
+    PASSWORD_HASH_TARGET_MS = float(os.environ.get("PASSWORD_HASH_TARGET_MS", 0))
+    PASSWORD_HASH_MIN_ITERATIONS = int(
+        os.environ.get("PASSWORD_HASH_MIN_ITERATIONS", 100_000)
+    )
 
 
 class DevelopmentConfig(Config):
@@ -22,12 +81,25 @@ class TestingConfig(Config):
     """Configuration used during automated tests."""
 
     TESTING = True
+    STORE_BACKEND = "memory"
+    STORE_JOURNAL_DIR = None
+    HASH_WORKERS = 2
+    RATE_LIMIT_ENABLED = False
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:1000"
+    PASSWORD_HASH_TARGET_MS = 0
+    STATIC_FINGERPRINT = False
 
 
 class ProductionConfig(Config):
     """Configuration for production deployments."""
 
     DEBUG = False
+    # The profiler exposes code paths; never serve it without a token.
+    PROFILER_REQUIRE_TOKEN = True
+    # Updating or deleting a user needs that user's session token.
+    AUTH_REQUIRED = True
+    # Size the hash cost to this machine rather than a library default.
+    PASSWORD_HASH_TARGET_MS = float(os.environ.get("PASSWORD_HASH_TARGET_MS", 250))
 
 
 CONFIG_MAP = {
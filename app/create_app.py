@@ -2,8 +2,11 @@ from __future__ import annotations
 
 from flask import Flask, jsonify
 
+from . import assets, hashing, json_provider, metrics, profiling, ratelimit, tokens
+from .caching import configure_cache, response_cache
 from .config import get_config
-from .store import reset_store
+from .events import configure_events
+from .store import configure_store, reset_store
 
 
 def create_app(testing: bool = False) -> Flask:
@@ -11,6 +14,16 @@ def create_app(testing: bool = False) -> Flask:
     config_name = "test" if testing else None
     app.config.from_object(get_config(config_name))
     app.config.update(TESTING=testing)
+    json_provider.init_app(app)
+    configure_store(app.config)
+    configure_events(app.config)
+    configure_cache(app.config)
+    hashing.init_app(app)
+    metrics.init_app(app)
+    profiling.init_app(app)
+    ratelimit.init_app(app)
+    tokens.init_app(app)
+    assets.init_app(app)
 
     from .routes import auth_bp, users_bp, wall_bp
     from .pages import pages_bp
@@ -27,6 +40,16 @@ def create_app(testing: bool = False) -> Flask:
     def health():  # pragma: no cover - trivial
         return {"status": "ok"}, 200
 
+    @app.get("/api/cache/stats")
+    def cache_stats():
+        return jsonify(response_cache.stats()), 200
+
+    @app.get("/api/metrics")
+    def metrics_endpoint():
+        if not metrics.metrics.enabled:
+            return jsonify({"error": "not_found"}), 404
+        return metrics.metrics_response()
+
     @app.errorhandler(404)
     def handle_404(error):  # pragma: no cover - simple
         return jsonify({"error": "not_found"}), 404
@@ -35,6 +58,12 @@ def create_app(testing: bool = False) -> Flask:
     def handle_405(error):  # pragma: no cover - simple
         return jsonify({"error": "method_not_allowed"}), 405
 
+    @app.errorhandler(hashing.HashingBusyError)
+    def handle_hashing_busy(error):
+        response = jsonify({"error": "hashing_busy"})
+        response.headers["Retry-After"] = "1"
+        return response, 503
+
     @app.errorhandler(500)
     def handle_500(error):  # pragma: no cover - logging side effect
         app.logger.exception("Unhandled server error")
@@ -0,0 +1,246 @@
+"""In-process fan-out of newly created wall posts to stream subscribers.
+
+Posts are published by the process that creates them. When the storage
+backend is shared with other processes, the store also has the publisher
+*follow* it: while a process streams posts, a background thread polls the
+backend so posts written by other workers reach local subscribers too.
+
+:class:`PostStream` frames what a subscriber receives as server-sent events;
+the WSGI and the ASGI stream views both drive one and only do the waiting.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+
+class Subscription:
+    """A subscriber's bounded queue of posts awaiting delivery.
+
+    When the queue is full the subscriber is considered too slow: it is
+    detached from the publisher and ``overflowed`` is set, so the stream can
+    end and the client resume from its last event id instead of the server
+    buffering without bound.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def offer(self, post: Dict[str, Any]) -> bool:
+        try:
+            self._queue.put_nowait(post)
+        except queue.Full:
+            self.overflowed = True
+            return False
+        return True
+
+    def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Return the next post, or ``None`` after *timeout* seconds."""
+
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription:
+    """A :class:`Subscription` consumed from an asyncio event loop.
+
+    Posts are published from request threads, so they are handed to the
+    subscriber's loop with ``call_soon_threadsafe`` and queued there; the
+    overflow rule is the same, applied when the post reaches the loop.
+    """
+
+    def __init__(self, maxsize: int, loop: asyncio.AbstractEventLoop) -> None:
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize)
+        self._loop = loop
+        self.overflowed = False
+
+    def offer(self, post: Dict[str, Any]) -> bool:
+        if self.overflowed:
+            return False
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, post)
+        except RuntimeError:  # the loop has been closed
+            return False
+        return True
+
+    def _deliver(self, post: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(post)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Return the next post, or ``None`` after *timeout* seconds."""
+
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class PostPublisher:
+    """Deliver each published post to every current subscriber."""
+
+    def __init__(self, queue_size: int = 100, poll_interval: float = 0.5) -> None:
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self._subscribers: Set[Subscription | AsyncSubscription] = set()
+        self._lock = threading.Lock()
+        self._poll: Optional[Callable[[bool], None]] = None
+        self._follower_pid: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def follow(self, poll: Optional[Callable[[bool], None]]) -> None:
+        """Call *poll* every ``poll_interval`` seconds once posts are streamed.
+
+        *poll* publishes the posts other processes wrote since its last call.
+        The first call of a process passes ``False``: it only catches up, so
+        a new subscriber is not sent older posts. ``None`` stops following.
+        """
+
+        with self._lock:
+            self._poll = poll
+            self._follower_pid = None
+
+    def _start_following(self) -> None:
+        # Threads do not survive fork, so each worker starts its own.
+        pid = os.getpid()
+        with self._lock:
+            if self._poll is None or self._follower_pid == pid:
+                return
+            self._follower_pid = pid
+            poll = self._poll
+        threading.Thread(
+            target=self._follow, args=(poll, pid), name="post-follower", daemon=True
+        ).start()
+
+    def _follow(self, poll: Callable[[bool], None], pid: int) -> None:
+        publish = False
+        while self._poll is poll and self._follower_pid == pid:
+            try:
+                poll(publish)
+            except Exception:  # pragma: no cover - retried on the next tick
+                pass
+            publish = True
+            time.sleep(self.poll_interval)
+
+    def subscribe(self) -> Subscription:
+        self._start_following()
+        subscription = Subscription(self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def subscribe_async(self) -> AsyncSubscription:
+        """Subscribe from a coroutine, delivering posts to the running loop."""
+
+        self._start_following()
+        subscription = AsyncSubscription(self.queue_size, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription | AsyncSubscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, post: Dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if not subscription.offer(post):
+                self.unsubscribe(subscription)
+
+
+post_publisher = PostPublisher()
+
+
+def sse(event: str, data: str, event_id: Optional[int] = None) -> str:
+    """Return one server-sent event frame."""
+
+    prefix = "" if event_id is None else f"id: {event_id}\n"
+    return f"{prefix}event: {event}\ndata: {data}\n\n"
+
+
+def last_event_id(raw: Optional[str]) -> Optional[int]:
+    """Parse a ``Last-Event-ID`` value; :class:`ValueError` if it is invalid."""
+
+    return int(raw) if raw else None
+
+
+class PostStream:
+    """Server-sent event frames of one client of the wall stream.
+
+    A client resuming from *last_id* first gets the posts it missed, read
+    by the view with :func:`~app.store.list_posts_since`, then the posts of
+    its subscription. Posts it already received are skipped, and once the
+    backlog is too old to replay the stream ends with a ``reset`` event.
+    """
+
+    keep_alive = ": keep-alive\n\n"
+
+    def __init__(
+        self, last_id: Optional[int], encode: Callable[[Any], str], retry_ms: int
+    ) -> None:
+        self.last_id = last_id
+        self.ended = False
+        self._encode = encode
+        self._retry_ms = retry_ms
+
+    def opening(self) -> str:
+        return f"retry: {self._retry_ms}\n\n"
+
+    def backlog(self, posts: Optional[List[Dict[str, Any]]]) -> Iterator[str]:
+        """Frame the missed *posts*; ``None`` means they are no longer kept."""
+
+        if posts is None:
+            self.ended = True
+            yield sse("reset", "{}")
+            return
+        for post in posts:
+            yield self._frame(post)
+
+    def frame(self, post: Optional[Dict[str, Any]]) -> str:
+        """Frame a post from the subscription, or a keep-alive for ``None``.
+
+        Returns an empty string for a post the client already has.
+        """
+
+        if post is None:
+            return self.keep_alive
+        if self.last_id is not None and post["id"] <= self.last_id:
+            return ""
+        return self._frame(post)
+
+    def _frame(self, post: Dict[str, Any]) -> str:
+        self.last_id = post["id"]
+        return sse("post", self._encode(post), post["id"])
+
+
+def configure_events(config: Dict[str, Any]) -> None:
+    """Apply ``SSE_QUEUE_SIZE`` and ``SSE_POLL_SECONDS`` from *config*."""
+
+    post_publisher.queue_size = int(config.get("SSE_QUEUE_SIZE", 100))
+    post_publisher.poll_interval = float(config.get("SSE_POLL_SECONDS", 0.5))
+
+
+__all__ = [
+    "AsyncSubscription",
+    "PostPublisher",
+    "PostStream",
+    "Subscription",
+    "configure_events",
+    "last_event_id",
+    "post_publisher",
+    "sse",
+]
@@ -0,0 +1,373 @@
+"""Bounded worker pool that runs password hashing off the request thread.
+
+The hash method comes from ``PASSWORD_HASH_METHOD``. With
+``PASSWORD_HASH_TARGET_MS`` set, the PBKDF2 iteration count is instead
+calibrated at startup so one hash takes about that long on the current
+hardware (never below ``PASSWORD_HASH_MIN_ITERATIONS``). Hashes made with
+other parameters are still accepted and are rewritten with the current ones
+on the next successful login (:func:`needs_rehash`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Callable, List, Mapping, Optional, Sequence, Tuple
+
+from flask import Flask, Response, g, has_request_context
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+from .metrics import metrics
+
+DEFAULT_METHOD = "pbkdf2:sha256"
+EXECUTOR_KINDS = ("thread", "process")
+DEFAULT_MIN_ITERATIONS = 100_000
+CALIBRATION_ITERATIONS = 20_000
+# Stored PBKDF2 hashes within this fraction of the current iteration count
+# are kept, so workers whose calibrations differ slightly do not keep
+# rewriting each other's hashes.
+REHASH_TOLERANCE = 0.2
+
+# ``[seconds, calls]`` spent hashing by the current ASGI request, which has
+# no Flask ``g``; see :func:`track_hash_timing`.
+_hash_timing: ContextVar[Optional[List]] = ContextVar("hash_timing", default=None)
+
+
+@lru_cache(maxsize=32)
+def canonical_method(method: str) -> str:
+    """Return *method* with Werkzeug's defaults filled in, as hashes store it.
+
+    ``"pbkdf2"`` becomes ``"pbkdf2:sha256:600000"`` and ``"scrypt"``
+    becomes ``"scrypt:32768:8:1"``.
+    """
+
+    name, *args = method.split(":")
+    if name == "pbkdf2":
+        digest = args[0] if args else "sha256"
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{digest}:{iterations}"
+    if name == "scrypt":
+        n, r, p = map(int, args) if args else (2**15, 8, 1)
+        return f"scrypt:{n}:{r}:{p}"
+    raise ValueError(f"unsupported password hash method: {method}")
+
+
+@lru_cache(maxsize=8)
+def calibrate_method(
+    method: str, target_ms: float, min_iterations: int = DEFAULT_MIN_ITERATIONS
+) -> Tuple[str, float]:
+    """Return a PBKDF2 method taking about *target_ms* and its estimated ms.
+
+    PBKDF2 cost is linear in the iteration count, so the best of three short
+    runs is extrapolated. The count is rounded to two significant digits.
+    Other methods are returned unchanged with an estimate of 0. Results are
+    cached, so an app rebuilt in the same process keeps its calibration.
+    """
+
+    canonical = canonical_method(method)
+    name, digest = canonical.split(":")[:2]
+    if name != "pbkdf2":
+        return canonical, 0.0
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        hashlib.pbkdf2_hmac(digest, b"calibration", b"salt", CALIBRATION_ITERATIONS)
+        best = min(best, time.perf_counter() - started)
+    per_iteration_ms = best * 1000 / CALIBRATION_ITERATIONS
+    iterations = int(target_ms / per_iteration_ms)
+    iterations = round(iterations, 2 - len(str(iterations)))
+    iterations = max(min_iterations, iterations)
+    return f"pbkdf2:{digest}:{iterations}", iterations * per_iteration_ms
+
+
+def needs_rehash(pwhash: str, method: str) -> bool:
+    """Return whether *pwhash* was made with other parameters than *method*."""
+
+    stored = pwhash.split("$", 1)[0]
+    current = canonical_method(method)
+    if stored == current:
+        return False
+    stored_name, *stored_args = stored.split(":")
+    name, *args = current.split(":")
+    if stored_name != "pbkdf2" or name != "pbkdf2" or stored_args[:1] != args[:1]:
+        return True
+    try:
+        iterations = int(stored_args[1])
+    except (IndexError, ValueError):
+        return True
+    return abs(iterations - int(args[1])) > REHASH_TOLERANCE * int(args[1])
+
+
+class HashingBusyError(RuntimeError):
+    """Raised when the hashing queue is saturated and work is rejected."""
+
+
+class HashingPool:
+    """Run PBKDF2 hashing on a fixed-size executor with a bounded backlog.
+
+    At most ``workers + queue_depth`` jobs may be running or queued; further
+    submissions fail immediately with :class:`HashingBusyError` instead of
+    piling up behind a burst of logins.
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        workers: Optional[int] = None,
+        queue_depth: int = 32,
+        method: str = DEFAULT_METHOD,
+    ) -> None:
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"unknown hashing executor: {kind}")
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_depth = queue_depth
+        self.method = method
+        self.estimated_ms: Optional[float] = None
+        self._slots = threading.BoundedSemaphore(self.workers + queue_depth)
+        executor_cls = ThreadPoolExecutor if kind == "thread" else ProcessPoolExecutor
+        self._executor: Executor = executor_cls(max_workers=self.workers)
+
+    def _submit(
+        self, func: Callable[..., Any], *args: Any, block: bool = False
+    ) -> Future:
+        if not self._slots.acquire(blocking=block):
+            raise HashingBusyError("hashing_busy")
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        future = self._submit(func, *args)
+        started = time.perf_counter()
+        try:
+            return future.result()
+        finally:
+            _meter(time.perf_counter() - started)
+
+    async def _run_async(self, func: Callable[..., Any], *args: Any) -> Any:
+        # Same admission control as _run, but the event loop keeps serving
+        # other requests while the job runs instead of a thread blocking.
+        future = self._submit(func, *args)
+        started = time.perf_counter()
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            _meter(time.perf_counter() - started)
+
+    @property
+    def iterations(self) -> int:
+        """PBKDF2 iterations of new hashes; 0 for other methods."""
+
+        name, *args = canonical_method(self.method).split(":")
+        return int(args[1]) if name == "pbkdf2" else 0
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        return needs_rehash(pwhash, self.method)
+
+    def hash(self, password: str) -> str:
+        return self._run(generate_password_hash, password, self.method)
+
+    def check(self, pwhash: str, password: str) -> bool:
+        return self._run(check_password_hash, pwhash, password)
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run_async(generate_password_hash, password, self.method)
+
+    async def check_async(self, pwhash: str, password: str) -> bool:
+        return await self._run_async(check_password_hash, pwhash, password)
+
+    def hash_many(self, passwords: Sequence[str]) -> List[str]:
+        """Hash *passwords* in parallel and return the hashes in order.
+
+        Bulk work waits for free slots instead of failing fast, and keeps at
+        most ``workers`` jobs in flight so the queue stays open to
+        interactive requests running alongside an import.
+        """
+
+        hashes: List[str] = []
+        started = time.perf_counter()
+        try:
+            for start in range(0, len(passwords), self.workers):
+                batch = passwords[start : start + self.workers]
+                futures = [
+                    self._submit(generate_password_hash, pw, self.method, block=True)
+                    for pw in batch
+                ]
+                hashes.extend(future.result() for future in futures)
+        finally:
+            if passwords:
+                _meter(time.perf_counter() - started, len(passwords))
+        return hashes
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+def _meter(elapsed: float, calls: int = 1) -> None:
+    metrics.observe_stage("hash", elapsed)
+    if has_request_context():
+        g.hash_seconds = g.get("hash_seconds", 0.0) + elapsed
+        g.hash_calls = g.get("hash_calls", 0) + calls
+        return
+    timing = _hash_timing.get()
+    if timing is not None:
+        timing[0] += elapsed
+        timing[1] += calls
+
+
+def track_hash_timing() -> List:
+    """Start accumulating ``[seconds, calls]`` of hashing in this context.
+
+    For requests served outside Flask (the ASGI views); pass the result to
+    :func:`server_timing` once the response is ready.
+    """
+
+    timing = [0.0, 0]
+    _hash_timing.set(timing)
+    return timing
+
+
+def server_timing(seconds: float, calls: int) -> str:
+    """Return the ``Server-Timing`` entry for *calls* hashes in *seconds*."""
+
+    return f'hash;dur={seconds * 1000:.1f};desc="{calls} call(s)"'
+
+
+_pool: Optional[HashingPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> HashingPool:
+    """Return the active pool, creating one with default settings if needed."""
+
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool()
+    return _pool
+
+
+def configure_hashing(config: Mapping[str, Any]) -> HashingPool:
+    """Replace the active pool with one built from *config*."""
+
+    global _pool
+    method = config.get("PASSWORD_HASH_METHOD", DEFAULT_METHOD)
+    target_ms = float(config.get("PASSWORD_HASH_TARGET_MS") or 0)
+    estimated_ms = None
+    if target_ms > 0:
+        min_iterations = config.get("PASSWORD_HASH_MIN_ITERATIONS")
+        method, estimated_ms = calibrate_method(
+            method, target_ms, int(min_iterations or DEFAULT_MIN_ITERATIONS)
+        )
+    pool = HashingPool(
+        kind=config.get("HASH_EXECUTOR", "thread"),
+        workers=config.get("HASH_WORKERS"),
+        queue_depth=int(config.get("HASH_QUEUE_DEPTH", 32)),
+        method=method,
+    )
+    pool.estimated_ms = estimated_ms
+    with _pool_lock:
+        previous, _pool = _pool, pool
+    if previous is not None:
+        previous.shutdown()
+    return pool
+
+
+def hash_password(password: str) -> str:
+    return get_pool().hash(password)
+
+
+def verify_password(pwhash: str, password: str) -> bool:
+    return get_pool().check(pwhash, password)
+
+
+def hash_passwords(passwords: Sequence[str]) -> List[str]:
+    return get_pool().hash_many(passwords)
+
+
+def password_needs_rehash(pwhash: str) -> bool:
+    return get_pool().needs_rehash(pwhash)
+
+
+async def hash_password_async(password: str) -> str:
+    return await get_pool().hash_async(password)
+
+
+async def verify_password_async(pwhash: str, password: str) -> bool:
+    return await get_pool().check_async(pwhash, password)
+
+
+def _add_server_timing(response: Response) -> Response:
+    elapsed = g.get("hash_seconds")
+    if elapsed is not None:
+        response.headers.add("Server-Timing", server_timing(elapsed, g.hash_calls))
+    return response
+
+
+def init_app(app: Flask) -> None:
+    """Configure the pool from ``app.config`` and report hashing time.
+
+    Every response whose handler hashed or verified a password carries a
+    ``Server-Timing: hash;dur=<ms>`` entry with the time spent waiting on
+    the pool.
+    """
+
+    pool = configure_hashing(app.config)
+    if pool.estimated_ms:
+        app.logger.info(
+            "Password hashing calibrated to %s (~%.0f ms per hash)",
+            pool.method,
+            pool.estimated_ms,
+        )
+    metrics.register_gauge(
+        "app_password_hash_iterations",
+        "PBKDF2 iterations used for new password hashes (0 for other methods).",
+        lambda: get_pool().iterations,
+    )
+    metrics.register_gauge(
+        "app_password_hash_estimated_seconds",
+        "Calibrated duration of one password hash (0 when not calibrated).",
+        lambda: (get_pool().estimated_ms or 0) / 1000,
+    )
+    app.after_request(_add_server_timing)
+
+
+__all__ = [
+    "HashingBusyError",
+    "HashingPool",
+    "calibrate_method",
+    "canonical_method",
+    "configure_hashing",
+    "get_pool",
+    "hash_password",
+    "hash_password_async",
+    "hash_passwords",
+    "init_app",
+    "needs_rehash",
+    "password_needs_rehash",
+    "server_timing",
+    "track_hash_timing",
+    "verify_password",
+    "verify_password_async",
+]
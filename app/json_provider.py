@@ -0,0 +1,136 @@
+"""JSON provider with an ``orjson`` fast path.
+
+When ``orjson`` is installed (it is pinned in ``requirements.txt``) and
+``JSON_FAST_PATH`` is on, responses are encoded straight to bytes in C.
+Otherwise the provider behaves exactly like Flask's default, stdlib-based one.
+Either way, non-dict mappings such as the store's slotted records are encoded
+as objects, and listing pages of records are encoded column by column from
+their slots by :meth:`FastJSONProvider.encode_records`.
+"""
+
+from __future__ import annotations
+
+import typing as t
+from collections.abc import Mapping
+from json.encoder import encode_basestring, encode_basestring_ascii
+from operator import itemgetter
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from .storage.records import PostRecord, UserRecord
+
+try:  # pragma: no cover - depends on the environment
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """:class:`DefaultJSONProvider` that prefers ``orjson`` when enabled."""
+
+    fast_path = orjson is not None
+
+    @staticmethod
+    def default(o: t.Any) -> t.Any:
+        if isinstance(o, (UserRecord, PostRecord)):
+            return o.as_dict()
+        if isinstance(o, Mapping):
+            return dict(o)
+        return DefaultJSONProvider.default(o)
+
+    @property
+    def using_orjson(self) -> bool:
+        return self.fast_path and orjson is not None
+
+    def _orjson_default(self, o: t.Any) -> t.Any:
+        if isinstance(o, (UserRecord, PostRecord)):
+            return orjson.Fragment(self.encode_records([o], list(o))[1:-1])
+        return self.default(o)
+
+    def _orjson_options(self) -> int:
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps(self, obj: t.Any, **kwargs: t.Any) -> str:
+        if kwargs or not self.using_orjson:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode()
+
+    def dumps_bytes(self, obj: t.Any) -> bytes:
+        """Serialize *obj* to UTF-8 JSON bytes."""
+
+        if not self.using_orjson:
+            return super().dumps(obj).encode()
+        return orjson.dumps(
+            obj, default=self._orjson_default, option=self._orjson_options()
+        )
+
+    def encode_records(
+        self, records: t.Iterable[t.Mapping[str, t.Any]], fields: t.Sequence[str]
+    ) -> str:
+        """Return *fields* of each stored record as a JSON array string.
+
+        Values are gathered one field at a time for the whole page, from the
+        slots of :class:`UserRecord` and :class:`PostRecord` or by key from
+        plain dict rows, and strings are escaped by the stdlib's C helpers.
+        No per-record dict is built and private fields such as
+        ``password_hash`` are never read.
+        """
+
+        records = records if isinstance(records, list) else list(records)
+        if not records:
+            return "[]"
+        names = tuple(sorted(fields) if self.sort_keys else fields)
+        escape = encode_basestring_ascii if self.ensure_ascii else encode_basestring
+        row = ",".join(escape(name).replace("%", "%%") + ":%s" for name in names)
+        kind = type(records[0])
+        if issubclass(kind, (UserRecord, PostRecord)):
+            columns = [kind.column(records, name) for name in names]
+        else:
+            columns = [list(map(itemgetter(name), records)) for name in names]
+        encoded = [self._encode_column(column, escape) for column in columns]
+        template = "{" + row + "}"
+        return "[" + ",".join([template % values for values in zip(*encoded)]) + "]"
+
+    def _encode_column(
+        self, values: t.List[t.Any], escape: t.Callable[[str], str]
+    ) -> t.List[str]:
+        try:
+            if type(values[0]) is str:
+                return list(map(escape, values))
+            if type(values[0]) is int:
+                return list(map(int.__repr__, values))
+        except TypeError:  # a column of mixed types
+            pass
+        return [self.dumps(value) for value in values]
+
+    def dumps_records(
+        self, records: t.Iterable[t.Mapping[str, t.Any]], fields: t.Sequence[str]
+    ) -> bytes:
+        """Serialize only *fields* of each stored record as a JSON array."""
+
+        return self.encode_records(records, fields).encode()
+
+    def response(self, *args: t.Any, **kwargs: t.Any):
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        if pretty or not self.using_orjson:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            self.dumps_bytes(obj) + b"\n", mimetype=self.mimetype
+        )
+
+
+def init_app(app: Flask) -> None:
+    """Install :class:`FastJSONProvider` configured from ``app.config``."""
+
+    provider = FastJSONProvider(app)
+    provider.fast_path = app.config.get("JSON_FAST_PATH", True)
+    provider.sort_keys = app.config.get("JSON_SORT_KEYS", provider.sort_keys)
+    app.json = provider
+
+
+__all__ = ["FastJSONProvider", "init_app"]
@@ -0,0 +1,335 @@
+"""Request and hot-path timing exposed in Prometheus text format.
+
+:data:`metrics` keeps per-endpoint request histograms, per-stage histograms
+for the expensive steps inside a request (validation, hashing, store access,
+serialization) and callback gauges sampled at scrape time. Instrumentation
+points use :func:`stage` or :func:`timed`; both reduce to a flag check when
+``METRICS_ENABLED`` is off.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, TypeVar
+
+from flask import Flask, Response, g, request
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations in seconds."""
+
+    __slots__ = ("buckets", "counts", "total", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        # One slot per bucket plus the implicit +Inf bucket.
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """Return cumulative bucket counts, the sum and the count."""
+
+        with self._lock:
+            counts, total, count = list(self.counts), self.total, self.count
+        cumulative, running = [], 0
+        for value in counts:
+            running += value
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs: Mapping[str, str]) -> str:
+    if not pairs:
+        return ""
+    body = ",".join(f'{key}="{_escape(str(value))}"' for key, value in pairs.items())
+    return "{" + body + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Stage:
+    __slots__ = ("registry", "name", "started")
+
+    def __init__(self, registry: "MetricsRegistry", name: str) -> None:
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.registry.observe_stage(self.name, time.perf_counter() - self.started)
+
+
+class MetricsRegistry:
+    """Counters, histograms and gauges for one process."""
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str, str], int] = {}
+        self._request_seconds: Dict[str, Histogram] = {}
+        self._stage_seconds: Dict[str, Histogram] = {}
+        self._gauges: Dict[str, Tuple[str, List[Tuple[Dict[str, str], Callable]]]] = {}
+
+    def _histogram(self, table: Dict[str, Histogram], key: str) -> Histogram:
+        histogram = table.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = table.setdefault(key, Histogram())
+        return histogram
+
+    def observe_request(
+        self, endpoint: str, method: str, status: int, seconds: float
+    ) -> None:
+        if not self.enabled:
+            return
+        key = (endpoint, method, str(status))
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+        self._histogram(self._request_seconds, endpoint).observe(seconds)
+
+    def observe_stage(self, name: str, seconds: float) -> None:
+        if self.enabled:
+            self._histogram(self._stage_seconds, name).observe(seconds)
+
+    def stage(self, name: str):
+        """Context manager timing the enclosed block as stage *name*."""
+
+        return _Stage(self, name) if self.enabled else nullcontext()
+
+    def register_gauge(
+        self,
+        name: str,
+        help_text: str,
+        read: Callable[[], float],
+        labels: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        """Expose the value returned by *read* at scrape time."""
+
+        with self._lock:
+            _, series = self._gauges.setdefault(name, (help_text, []))
+            series[:] = [s for s in series if s[0] != dict(labels or {})]
+            series.append((dict(labels or {}), read))
+
+    def reset(self) -> None:
+        """Drop recorded observations; registered gauges are kept."""
+
+        with self._lock:
+            self._requests = {}
+            self._request_seconds = {}
+            self._stage_seconds = {}
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+
+        lines: List[str] = [
+            "# HELP http_requests_total Requests handled, by endpoint, method, status.",
+            "# TYPE http_requests_total counter",
+        ]
+        with self._lock:
+            requests = sorted(self._requests.items())
+            request_seconds = sorted(self._request_seconds.items())
+            stage_seconds = sorted(self._stage_seconds.items())
+            gauges = sorted(self._gauges.items())
+        for (endpoint, method, status), count in requests:
+            labels = _labels({"endpoint": endpoint, "method": method, "status": status})
+            lines.append(f"http_requests_total{labels} {count}")
+        self._render_histograms(
+            lines,
+            "http_request_duration_seconds",
+            "Time spent handling requests, by endpoint.",
+            "endpoint",
+            request_seconds,
+        )
+        self._render_histograms(
+            lines,
+            "app_stage_duration_seconds",
+            "Time spent in instrumented stages of request handling.",
+            "stage",
+            stage_seconds,
+        )
+        for name, (help_text, series) in gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, read in series:
+                lines.append(f"{name}{_labels(labels)} {_number(read())}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histograms(
+        lines: List[str],
+        name: str,
+        help_text: str,
+        label: str,
+        histograms: List[Tuple[str, Histogram]],
+    ) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for key, histogram in histograms:
+            cumulative, total, count = histogram.snapshot()
+            bounds = [_number(b) for b in histogram.buckets] + ["+Inf"]
+            for bound, value in zip(bounds, cumulative):
+                labels = _labels({label: key, "le": bound})
+                lines.append(f"{name}_bucket{labels} {value}")
+            labels = _labels({label: key})
+            lines.append(f"{name}_sum{labels} {_number(total)}")
+            lines.append(f"{name}_count{labels} {count}")
+
+
+metrics = MetricsRegistry()
+
+
+def stage(name: str):
+    """Time the enclosed block as stage *name* on the global registry."""
+
+    return metrics.stage(name)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorator recording each call of the wrapped function as stage *name*."""
+
+    def decorate(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not metrics.enabled:
+                    return await func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    metrics.observe_stage(name, time.perf_counter() - started)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.observe_stage(name, time.perf_counter() - started)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+def configure_metrics(config: Mapping[str, Any]) -> MetricsRegistry:
+    metrics.enabled = bool(config.get("METRICS_ENABLED", True))
+    return metrics
+
+
+def _start_timer() -> None:
+    if metrics.enabled:
+        g.metrics_started = time.perf_counter()
+
+
+def _record_request(response: Response) -> Response:
+    started = g.pop("metrics_started", None)
+    if started is not None:
+        metrics.observe_request(
+            request.endpoint or "unmatched",
+            request.method,
+            response.status_code,
+            time.perf_counter() - started,
+        )
+    return response
+
+
+def _register_gauges() -> None:
+    # Imported here: the store imports this module for its own timings.
+    from .caching import response_cache
+    from .events import post_publisher
+    from .store import get_store
+
+    for collection in ("users", "posts"):
+        metrics.register_gauge(
+            "app_store_records",
+            "Records currently held by the store, by collection.",
+            lambda collection=collection: get_store().collection_size(collection),
+            {"collection": collection},
+        )
+    metrics.register_gauge(
+        "app_response_cache_entries",
+        "Encoded listing pages held by the response cache.",
+        lambda: response_cache.stats()["entries"],
+    )
+    metrics.register_gauge(
+        "app_stream_subscribers",
+        "Clients connected to the wall event stream.",
+        lambda: len(post_publisher),
+    )
+
+
+def metrics_response() -> Response:
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+
+def init_app(app: Flask) -> None:
+    """Time every request and expose ``GET /api/metrics``.
+
+    Durations cover the handler up to the response object; the body of a
+    streamed response is not included.
+    """
+
+    configure_metrics(app.config)
+    _register_gauges()
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+
+
+__all__ = [
+    "Histogram",
+    "MetricsRegistry",
+    "configure_metrics",
+    "init_app",
+    "metrics",
+    "metrics_response",
+    "stage",
+    "timed",
+]
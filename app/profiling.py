@@ -0,0 +1,188 @@
+"""On-demand sampling profiler for live requests.
+
+``GET /api/debug/profile?seconds=N`` samples the Python stacks of every
+thread currently handling a request, at a fixed interval, for *N* seconds,
+and answers with the collected stacks in the collapsed format used by
+``flamegraph.pl`` and speedscope (``frame;frame;frame count`` per line).
+
+Sampling works from a background thread through :func:`sys._current_frames`,
+so nothing is added to the request path beyond registering which threads are
+inside a request. Registrations are counted, so the event loop thread of the
+ASGI app stays sampled while any of its requests is in flight, and blocking
+work it hands to :func:`run_in_thread` is sampled on the worker thread.
+
+The endpoint is disabled unless ``PROFILER_ENABLED`` is set and, when
+``PROFILER_TOKEN`` is configured (mandatory under ``ProductionConfig``),
+callers must send it in ``X-Profiler-Token``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import CodeType, FrameType
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+from flask import Blueprint, Flask, Response, current_app, jsonify, request
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+
+T = TypeVar("T")
+
+profiling_bp = Blueprint("profiling_api", __name__, url_prefix="/api/debug")
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+
+def _frame_label(code: CodeType, cache: Dict[CodeType, str]) -> str:
+    label = cache.get(code)
+    if label is None:
+        path = code.co_filename
+        if path.startswith(_ROOT):
+            path = path[len(_ROOT) :]
+        elif "site-packages" + os.sep in path:
+            path = path.split("site-packages" + os.sep, 1)[1]
+        label = f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ",")
+        cache[code] = label
+    return label
+
+
+def _collapse(frame: Optional[FrameType], cache: Dict[CodeType, str]) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code, cache))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+class SamplingProfiler:
+    """Collect stack samples of request threads from a background thread."""
+
+    def __init__(self) -> None:
+        # Thread id -> requests it is serving; each thread updates its own key.
+        self._active: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def enter_request(self) -> None:
+        ident = threading.get_ident()
+        self._active[ident] = self._active.get(ident, 0) + 1
+
+    def exit_request(self, _exc: Optional[BaseException] = None) -> None:
+        ident = threading.get_ident()
+        count = self._active.get(ident, 0)
+        if count > 1:
+            self._active[ident] = count - 1
+        else:
+            self._active.pop(ident, None)
+
+    def call(self, func: Callable[..., T], *args: Any) -> T:
+        """Call *func* with the current thread registered as in a request."""
+
+        self.enter_request()
+        try:
+            return func(*args)
+        finally:
+            self.exit_request()
+
+    def profile(
+        self, seconds: float, interval: float, exclude: Tuple[int, ...] = ()
+    ) -> Tuple[Counter, int]:
+        """Sample for *seconds*; return stack counts and the number of ticks.
+
+        Threads listed in *exclude* (typically the caller) are skipped. Only
+        one profile runs at a time; overlapping calls raise
+        :class:`ProfilerBusyError`.
+        """
+
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("profiler_busy")
+        try:
+            stacks: Counter = Counter()
+            cache: Dict[CodeType, str] = {}
+            ticks = 0
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                frames = sys._current_frames()
+                for ident in tuple(self._active):
+                    if ident in exclude:
+                        continue
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        stacks[_collapse(frame, cache)] += 1
+                ticks += 1
+                del frames
+                time.sleep(interval)
+            return stacks, ticks
+        finally:
+            self._lock.release()
+
+
+profiler = SamplingProfiler()
+
+
+async def run_in_thread(func: Callable[..., T], *args: Any) -> T:
+    """Await blocking *func* on the default executor, keeping it sampled."""
+
+    return await asyncio.to_thread(profiler.call, func, *args)
+
+
+def _authorized() -> bool:
+    token = current_app.config.get("PROFILER_TOKEN")
+    if token:
+        supplied = request.headers.get("X-Profiler-Token", "")
+        return hmac.compare_digest(supplied.encode(), token.encode())
+    return not current_app.config.get("PROFILER_REQUIRE_TOKEN", False)
+
+
+@profiling_bp.get("/profile")
+def profile_route():
+    if not current_app.config.get("PROFILER_ENABLED"):
+        return jsonify({"error": "not_found"}), 404
+    if not _authorized():
+        return jsonify({"error": "forbidden"}), 403
+    try:
+        seconds = float(request.args.get("seconds", 5))
+        interval = float(request.args.get("interval_ms", 5)) / 1000
+    except ValueError:
+        return jsonify({"error": "validation_error"}), 400
+    max_seconds = current_app.config.get("PROFILER_MAX_SECONDS", 30)
+    if not 0 < seconds <= max_seconds or not 0.001 <= interval <= 1:
+        return jsonify({"error": "validation_error"}), 400
+
+    try:
+        stacks, ticks = profiler.profile(
+            seconds, interval, exclude=(threading.get_ident(),)
+        )
+    except ProfilerBusyError:
+        return jsonify({"error": "profiler_busy"}), 409
+
+    body = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+    response = Response(body, mimetype="text/plain")
+    response.headers["X-Profile-Samples"] = str(ticks)
+    return response
+
+
+def init_app(app: Flask) -> None:
+    """Track request threads and register the profiling endpoint."""
+
+    app.before_request(profiler.enter_request)
+    app.teardown_request(profiler.exit_request)
+    app.register_blueprint(profiling_bp)
+
+
+__all__ = [
+    "ProfilerBusyError",
+    "SamplingProfiler",
+    "init_app",
+    "profiler",
+    "profiling_bp",
+    "run_in_thread",
+]
@@ -0,0 +1,276 @@
+"""Per-client rate limiting with in-memory token buckets.
+
+Views opt in with :func:`rate_limit`, naming for each rule the request
+attribute to key on (``ip``, ``email``, ``author`` or the authenticated
+``user``) and the config entry holding its limit, written ``"N/period"``
+(``"5/minute"``, ``"20/30s"``).
+A request passes only if every matching bucket has a token left; otherwise
+:class:`RateLimitExceeded` is raised before the view runs, so a throttled
+login never reaches password hashing and a throttled post never reaches the
+store, and the client receives ``429`` with ``Retry-After``.
+
+Buckets are kept in one bounded, least-recently-used map. A bucket that has
+been idle long enough to refill completely is equivalent to a missing one,
+so such buckets are dropped as they age out; ``RATE_LIMIT_MAX_KEYS`` caps
+the map regardless. Every check is O(1) per rule.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from flask import Flask, current_app, g, jsonify, request
+
+from .storage.base import normalize_email
+
+_PERIODS = {"second": 1.0, "minute": 60.0, "hour": 3600.0, "day": 86400.0}
+_SECONDS = re.compile(r"(\d+(?:\.\d+)?)s")
+MAX_KEY_LENGTH = 320
+
+
+class Limit(NamedTuple):
+    """``capacity`` requests per ``period`` seconds, refilled continuously."""
+
+    capacity: int
+    period: float
+
+
+@lru_cache(maxsize=64)
+def parse_limit(spec: Optional[str]) -> Optional[Limit]:
+    """Parse ``"N/period"``; an empty spec means no limit.
+
+    *period* is ``second``, ``minute``, ``hour``, ``day`` or a number of
+    seconds such as ``30s``.
+    """
+
+    spec = (spec or "").strip()
+    if not spec:
+        return None
+    count, _, period = spec.partition("/")
+    seconds = _PERIODS.get(period.strip())
+    if seconds is None:
+        match = _SECONDS.fullmatch(period.strip())
+        seconds = float(match.group(1)) if match else None
+    if not count.strip().isdigit() or not seconds or int(count) < 1:
+        raise ValueError(f"invalid rate limit: {spec!r}")
+    return Limit(int(count), seconds)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request exhausts one of its buckets."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__("rate_limited")
+        self.retry_after = retry_after
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by any hashable value.
+
+    Each bucket is ``[tokens, updated, full_at]``. Buckets are ordered by
+    last use; those past ``full_at`` are dropped from the old end on every
+    call and the map never holds more than *max_keys* buckets.
+    """
+
+    def __init__(
+        self,
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[Hashable, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def acquire(self, rules: Sequence[Tuple[Hashable, Limit]]) -> float:
+        """Take one token from each bucket in *rules*, all or nothing.
+
+        Returns ``0.0`` on success, otherwise the seconds until every bucket
+        has a token again; nothing is consumed in that case.
+        """
+
+        now = self._clock()
+        buckets = self._buckets
+        with self._lock:
+            while buckets:
+                oldest = next(iter(buckets.values()))
+                if oldest[2] > now:
+                    break
+                buckets.popitem(last=False)
+            levels = []
+            wait = 0.0
+            for key, limit in rules:
+                refill = limit.capacity / limit.period
+                bucket = buckets.get(key)
+                if bucket is None:
+                    tokens = float(limit.capacity)
+                else:
+                    tokens = min(limit.capacity, bucket[0] + (now - bucket[1]) * refill)
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / refill)
+                levels.append((key, tokens - 1, (limit.capacity - tokens + 1) / refill))
+            if wait:
+                return wait
+            for key, tokens, refill_time in levels:
+                buckets[key] = [tokens, now, now + refill_time]
+                buckets.move_to_end(key)
+            while len(buckets) > self.max_keys:
+                buckets.popitem(last=False)
+        return 0.0
+
+
+limiter = TokenBucketLimiter()
+
+
+def email_key(payload: Any) -> Optional[str]:
+    """Return the bucket key for the ``email`` of a login *payload*."""
+
+    email = payload.get("email") if isinstance(payload, dict) else None
+    if not isinstance(email, str) or not email.strip():
+        return None
+    return normalize_email(email.strip())[:MAX_KEY_LENGTH]
+
+
+def author_key(header: Optional[str]) -> Optional[str]:
+    """Return the bucket key for an ``X-Author`` *header* value."""
+
+    author = (header or "").strip()
+    return author.casefold()[:MAX_KEY_LENGTH] or None
+
+
+def _client_ip() -> Optional[str]:
+    return request.remote_addr
+
+
+def _login_email() -> Optional[str]:
+    return email_key(request.get_json(silent=True))
+
+
+def _author() -> Optional[str]:
+    return author_key(request.headers.get("X-Author"))
+
+
+def _auth_user() -> Optional[str]:
+    uid = g.get("auth_user_id")
+    return None if uid is None else str(uid)
+
+
+KEY_FUNCTIONS: Dict[str, Callable[[], Optional[str]]] = {
+    "ip": _client_ip,
+    "email": _login_email,
+    "author": _author,
+    "user": _auth_user,
+}
+
+
+def check_limits(
+    config: Mapping[str, Any], rules: Sequence[Tuple[str, Optional[str]]]
+) -> None:
+    """Take a token for each ``(config_name, key value)`` rule or raise.
+
+    Rules whose value is ``None`` or whose limit is empty are skipped. Raises
+    :class:`RateLimitExceeded` when any bucket is empty, taking no token.
+    """
+
+    if not config.get("RATE_LIMIT_ENABLED", True):
+        return
+    buckets = []
+    for name, value in rules:
+        limit = parse_limit(config.get(name))
+        if limit and value is not None:
+            buckets.append(((name, value), limit))
+    retry_after = limiter.acquire(buckets) if buckets else 0.0
+    if retry_after:
+        raise RateLimitExceeded(retry_after)
+
+
+def rate_limit(*rules: Tuple[str, str]) -> Callable:
+    """Throttle the decorated view by ``(key, config_name)`` *rules*.
+
+    *key* names an entry of :data:`KEY_FUNCTIONS`; requests for which it
+    yields ``None`` (no email in the body, no ``X-Author``) skip that rule.
+    Buckets are scoped by *config_name*, so each route and key has its own.
+    """
+
+    for key, _ in rules:
+        if key not in KEY_FUNCTIONS:
+            raise ValueError(f"unknown rate limit key: {key}")
+
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(*args: Any, **kwargs: Any):
+            config = current_app.config
+            if config.get("RATE_LIMIT_ENABLED", True):
+                check_limits(
+                    config,
+                    [
+                        (name, KEY_FUNCTIONS[key]() if config.get(name) else None)
+                        for key, name in rules
+                    ],
+                )
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def configure_rate_limits(config: Mapping[str, Any]) -> TokenBucketLimiter:
+    """Size the limiter from ``RATE_LIMIT_MAX_KEYS`` and drop existing buckets."""
+
+    limiter.max_keys = int(config.get("RATE_LIMIT_MAX_KEYS", 100_000))
+    limiter.clear()
+    return limiter
+
+
+def _too_many_requests(error: RateLimitExceeded):
+    response = jsonify({"error": "rate_limited"})
+    response.headers["Retry-After"] = str(max(1, math.ceil(error.retry_after)))
+    return response, 429
+
+
+def init_app(app: Flask) -> None:
+    """Configure the limiter and answer throttled requests with ``429``."""
+
+    configure_rate_limits(app.config)
+    app.register_error_handler(RateLimitExceeded, _too_many_requests)
+
+
+__all__ = [
+    "KEY_FUNCTIONS",
+    "Limit",
+    "RateLimitExceeded",
+    "TokenBucketLimiter",
+    "author_key",
+    "check_limits",
+    "configure_rate_limits",
+    "email_key",
+    "init_app",
+    "limiter",
+    "parse_limit",
+    "rate_limit",
+]
@@ -1,23 +1,26 @@
 from __future__ import annotations
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 
+from ..ratelimit import rate_limit
 from ..store import authenticate_user
+from ..tokens import session_tokens
+from ..views import login_credentials, login_result
 
 auth_bp = Blueprint("auth_api", __name__, url_prefix="/api/auth")
 
 
 @auth_bp.post("/login")
+@rate_limit(("ip", "RATE_LIMIT_LOGIN_IP"), ("email", "RATE_LIMIT_LOGIN_EMAIL"))
 def login_route():
-    payload = request.get_json(silent=True) or {}
-    email = (payload.get("email") or "").strip()
-    password = payload.get("password") or ""
-
-    if not email or not password:
+    credentials = login_credentials(request.get_json(silent=True))
+    if credentials is None:
         return jsonify({"error": "validation_error"}), 400
 
-    user = authenticate_user(email, password)
+    user = authenticate_user(*credentials)
     if not user:
         return jsonify({"error": "invalid_credentials"}), 401
 
-    return jsonify(user), 200
+    token = session_tokens.issue(user["id"])
+    payload, status = login_result(user, token, current_app.config)
+    return jsonify(payload), status
@@ -0,0 +1,68 @@
+"""Query-string parsing shared by the paginated listing endpoints."""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+from flask import request
+
+
+class PageArgsError(ValueError):
+    """Raised when paging or projection arguments are malformed."""
+
+    def __init__(self, details: Dict[str, List[str]]) -> None:
+        super().__init__("validation_error")
+        self.details = details
+
+
+def _parse_int(name: str, minimum: int, errors: Dict[str, List[str]]) -> Optional[int]:
+    raw = request.args.get(name)
+    if raw is None or raw == "":
+        return None
+    try:
+        value = int(raw)
+    except ValueError:
+        errors[name] = ["Not a valid integer."]
+        return None
+    if value < minimum:
+        errors[name] = [f"Must be greater than or equal to {minimum}."]
+        return None
+    return value
+
+
+def parse_page_args(
+    cursor_name: Optional[str], default_limit: int, max_limit: int
+) -> tuple[Optional[int], int]:
+    """Return ``(cursor, limit)`` from the query string.
+
+    ``limit`` defaults to *default_limit* and may not exceed *max_limit*, so a
+    single request never materialises more than *max_limit* records. Pass
+    ``None`` as *cursor_name* for endpoints without a cursor.
+    """
+
+    errors: Dict[str, List[str]] = {}
+    cursor = _parse_int(cursor_name, 0, errors) if cursor_name else None
+    limit = _parse_int("limit", 1, errors)
+    if limit is not None and limit > max_limit:
+        errors["limit"] = [f"Must be less than or equal to {max_limit}."]
+    if errors:
+        raise PageArgsError(errors)
+    return cursor, default_limit if limit is None else limit
+
+
+def parse_fields(allowed: tuple[str, ...]) -> Optional[List[str]]:
+    """Return the ``fields=`` projection as a list, or ``None`` for all fields."""
+
+    raw = request.args.get("fields")
+    if not raw:
+        return None
+    fields = [name.strip() for name in raw.split(",") if name.strip()]
+    if not fields:
+        raise PageArgsError({"fields": ["At least one field is required."]})
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise PageArgsError({"fields": [f"Unknown field: {', '.join(unknown)}."]})
+    return list(dict.fromkeys(fields))
+
+
+__all__ = ["PageArgsError", "parse_fields", "parse_page_args"]
@@ -1,55 +1,250 @@
 from __future__ import annotations
 
-from flask import Blueprint, jsonify, request
+import json
+from typing import IO, Iterator, Optional, Tuple
+
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    jsonify,
+    request,
+    stream_with_context,
+)
 from marshmallow import ValidationError
 
-from ..schemas import user_create_schema, user_update_schema
-from ..store import create_user, delete_user, get_user, list_users, update_user
+from ..caching import cached_listing, not_modified
+from ..metrics import stage
+from ..ratelimit import rate_limit
+from ..schemas import load_user_create, load_user_update
+from ..store import (
+    PUBLIC_USER_FIELDS,
+    collection_version,
+    create_user,
+    create_users,
+    delete_user,
+    get_user,
+    list_user_records,
+    search_user_records,
+    update_user,
+)
+from ..tokens import require_auth
+from ..views import user_result, user_write_error
+from .pagination import PageArgsError, parse_fields, parse_page_args
 
 users_bp = Blueprint("users_api", __name__, url_prefix="/api/users")
 
+MAX_PREFIX_LENGTH = 100
+
 
 @users_bp.post("")
 def create_user_route():
     payload = request.get_json(silent=True) or {}
     try:
-        data = user_create_schema.load(payload)
+        data = load_user_create(payload, current_app.config["VALIDATION_MODE"])
         user = create_user(data["name"], data["email"], data["password"])
-        return jsonify(user), 201
-    except ValidationError as ve:
-        return jsonify({"error": "validation_error", "details": ve.messages}), 400
-    except ValueError as ve:
-        if str(ve) == "email_already_exists":
-            return jsonify({"error": "email_already_exists"}), 409
-        raise
+    except (ValidationError, ValueError) as exc:
+        body, status = user_write_error(exc)
+        return jsonify(body), status
+    return jsonify(user), 201
+
+
+def _ndjson_lines(
+    stream: IO[bytes], max_bytes: int
+) -> Iterator[Tuple[int, Optional[bytes]]]:
+    """Yield ``(line_number, line)`` for each non-blank line of *stream*.
+
+    Lines longer than *max_bytes* are drained and yielded as ``None`` so a
+    single oversized record cannot make the server buffer it whole.
+    """
+
+    number = 0
+    while True:
+        line = stream.readline(max_bytes + 1)
+        if not line:
+            return
+        number += 1
+        if len(line) > max_bytes:
+            while line and not line.endswith(b"\n"):
+                line = stream.readline(max_bytes + 1)
+            yield number, None
+        elif line.strip():
+            yield number, line
+
+
+@users_bp.post("/bulk")
+@require_auth(required=True)
+@rate_limit(("ip", "RATE_LIMIT_BULK_IP"), ("user", "RATE_LIMIT_BULK_USER"))
+def bulk_create_users_route():
+    """Create users from an NDJSON body, streaming one result per line.
+
+    Lines are validated as they arrive and created in batches of
+    ``USERS_BULK_BATCH_SIZE``, so passwords of a batch are hashed in
+    parallel. Each result line carries the input ``line`` number and the
+    status the single-user endpoint would have returned; a final line
+    summarizes the import. Importing needs a session token, and records past
+    ``USERS_BULK_MAX_LINES`` are not read: the first one is reported as
+    ``too_many_lines`` and the import stops there.
+    """
+
+    batch_size = current_app.config["USERS_BULK_BATCH_SIZE"]
+    max_bytes = current_app.config["USERS_BULK_MAX_LINE_BYTES"]
+    max_lines = current_app.config["USERS_BULK_MAX_LINES"]
+    mode = current_app.config["VALIDATION_MODE"]
+    dumps = current_app.json.dumps_bytes
+    stream = request.stream
+
+    def parse(number, line):
+        if line is None:
+            return number, None, {"status": 413, "error": "line_too_long"}
+        try:
+            return number, load_user_create(json.loads(line), mode), None
+        except ValidationError as ve:
+            error = {"status": 400, "error": "validation_error", "details": ve.messages}
+            return number, None, error
+        except ValueError:
+            return number, None, {"status": 400, "error": "invalid_json"}
+
+    def flush(batch, totals):
+        created = iter(create_users([data for _, data, _ in batch if data]))
+        out = []
+        for number, data, error in batch:
+            result = {"line": number}
+            if data:
+                user, code = next(created)
+                if user is not None:
+                    result.update(status=201, user=user)
+                else:
+                    result.update(status=409, error=code)
+            else:
+                result.update(error)
+            totals["created" if result["status"] == 201 else "failed"] += 1
+            out.append(dumps(result) + b"\n")
+        return b"".join(out)
+
+    def generate():
+        totals = {"created": 0, "failed": 0}
+        batch = []
+        for count, (number, line) in enumerate(_ndjson_lines(stream, max_bytes)):
+            if count == max_lines:
+                batch.append((number, None, {"status": 413, "error": "too_many_lines"}))
+                break
+            batch.append(parse(number, line))
+            if len(batch) >= batch_size:
+                yield flush(batch, totals)
+                batch = []
+        if batch:
+            yield flush(batch, totals)
+        yield dumps({"summary": totals}) + b"\n"
+
+    return Response(
+        stream_with_context(generate()), mimetype="application/x-ndjson"
+    )
+
+
+@users_bp.get("/export")
+def export_users_route():
+    """Stream every user as NDJSON, one public record per line.
+
+    Users are read in id order, ``USERS_EXPORT_CHUNK`` at a time, so memory
+    use does not grow with the size of the registry.
+    """
+
+    chunk = current_app.config["USERS_EXPORT_CHUNK"]
+    dumps = current_app.json.dumps_bytes
+
+    def generate():
+        after_id = None
+        while True:
+            records, after_id = list_user_records(after_id=after_id, limit=chunk)
+            if records:
+                yield b"".join(
+                    dumps({name: record[name] for name in PUBLIC_USER_FIELDS}) + b"\n"
+                    for record in records
+                )
+            if after_id is None:
+                return
+
+    return Response(generate(), mimetype="application/x-ndjson")
 
 
 @users_bp.get("")
 def list_users_route():
-    return jsonify(list_users()), 200
+    try:
+        after_id, limit = parse_page_args(
+            "after_id",
+            current_app.config["USERS_PAGE_SIZE"],
+            current_app.config["USERS_PAGE_MAX"],
+        )
+        fields = parse_fields(PUBLIC_USER_FIELDS)
+    except PageArgsError as exc:
+        return jsonify({"error": "validation_error", "details": exc.details}), 400
+    # Read the version before the data: a concurrent write then only makes
+    # the tag older than the body, never newer.
+    version = collection_version("users")
+    cached = not_modified(version)
+    if cached is not None:
+        return cached
+    fields = tuple(fields or PUBLIC_USER_FIELDS)
+
+    def build():
+        records, next_cursor = list_user_records(after_id=after_id, limit=limit)
+        with stage("serialize"):
+            return current_app.json.dumps_records(records, fields), next_cursor
+
+    return cached_listing("users", version, (after_id, limit, fields), build)
+
+
+@users_bp.get("/search")
+def search_users_route():
+    prefix = (request.args.get("prefix") or "").strip()
+    try:
+        _, limit = parse_page_args(
+            None,
+            current_app.config["USERS_SEARCH_LIMIT"],
+            current_app.config["USERS_SEARCH_MAX"],
+        )
+        fields = parse_fields(PUBLIC_USER_FIELDS)
+        if not prefix or len(prefix) > MAX_PREFIX_LENGTH:
+            raise PageArgsError(
+                {"prefix": [f"Must be between 1 and {MAX_PREFIX_LENGTH} characters."]}
+            )
+    except PageArgsError as exc:
+        return jsonify({"error": "validation_error", "details": exc.details}), 400
+    version = collection_version("users")
+    cached = not_modified(version)
+    if cached is not None:
+        return cached
+    fields = tuple(fields or PUBLIC_USER_FIELDS)
+
+    def build():
+        records = search_user_records(prefix, limit)
+        with stage("serialize"):
+            return current_app.json.dumps_records(records, fields), None
+
+    key = ("search", prefix.casefold(), limit, fields)
+    return cached_listing("users", version, key, build)
 
 
 @users_bp.get("/<int:uid>")
 def get_user_route(uid: int):
-    user = get_user(uid)
-    return (jsonify({"error": "not_found"}), 404) if not user else (jsonify(user), 200)
+    body, status = user_result(get_user(uid))
+    return jsonify(body), status
 
 
 @users_bp.put("/<int:uid>")
+@require_auth(owner="uid")
 def update_user_route(uid: int):
     payload = request.get_json(silent=True) or {}
     try:
-        data = user_update_schema.load(payload)
-        user = update_user(uid, **data)
-        return (jsonify({"error": "not_found"}), 404) if not user else (jsonify(user), 200)
-    except ValidationError as ve:
-        return jsonify({"error": "validation_error", "details": ve.messages}), 400
-    except ValueError as ve:
-        if str(ve) == "email_already_exists":
-            return jsonify({"error": "email_already_exists"}), 409
-        raise
+        data = load_user_update(payload, current_app.config["VALIDATION_MODE"])
+        body, status = user_result(update_user(uid, **data))
+    except (ValidationError, ValueError) as exc:
+        body, status = user_write_error(exc)
+    return jsonify(body), status
 
 
 @users_bp.delete("/<int:uid>")
+@require_auth(owner="uid")
 def delete_user_route(uid: int):
     return ("", 204) if delete_user(uid) else (jsonify({"error": "not_found"}), 404)
@@ -1,28 +1,132 @@
 from __future__ import annotations
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, g, jsonify, request
 
-from ..store import create_post, list_posts
+from ..caching import cached_listing, not_modified
+from ..events import PostStream, last_event_id, post_publisher
+from ..metrics import stage
+from ..ratelimit import rate_limit
+from ..store import (
+    POST_FIELDS,
+    collection_version,
+    create_post,
+    get_user,
+    list_posts_page,
+    list_posts_since,
+    search_posts,
+)
+from ..search import fold
+from ..tokens import require_auth
+from ..views import post_author, post_error
+from .pagination import PageArgsError, parse_page_args
 
 wall_bp = Blueprint("wall_api", __name__, url_prefix="/api/wall")
 
+MAX_QUERY_LENGTH = 200
+
 
 @wall_bp.get("/posts")
 def list_posts_route():
-    return jsonify(list_posts()), 200
+    try:
+        before_id, limit = parse_page_args(
+            "before_id",
+            current_app.config["WALL_PAGE_SIZE"],
+            current_app.config["WALL_PAGE_MAX"],
+        )
+    except PageArgsError as exc:
+        return jsonify({"error": "validation_error", "details": exc.details}), 400
+    version = collection_version("posts")
+    cached = not_modified(version)
+    if cached is not None:
+        return cached
+
+    def build():
+        posts, next_cursor = list_posts_page(before_id=before_id, limit=limit)
+        with stage("serialize"):
+            return current_app.json.dumps_records(posts, POST_FIELDS), next_cursor
+
+    return cached_listing("posts", version, (before_id, limit), build)
+
+
+@wall_bp.get("/search")
+def search_posts_route():
+    query = (request.args.get("q") or "").strip()
+    try:
+        offset, limit = parse_page_args(
+            "offset",
+            current_app.config["WALL_PAGE_SIZE"],
+            current_app.config["WALL_PAGE_MAX"],
+        )
+        if not query or len(query) > MAX_QUERY_LENGTH:
+            raise PageArgsError(
+                {"q": [f"Must be between 1 and {MAX_QUERY_LENGTH} characters."]}
+            )
+    except PageArgsError as exc:
+        return jsonify({"error": "validation_error", "details": exc.details}), 400
+    offset = offset or 0
+    version = collection_version("posts")
+    cached = not_modified(version)
+    if cached is not None:
+        return cached
+
+    def build():
+        posts, next_offset = search_posts(query, offset=offset, limit=limit)
+        with stage("serialize"):
+            return current_app.json.dumps_records(posts, POST_FIELDS), next_offset
+
+    key = ("search", fold(query), offset, limit)
+    return cached_listing("posts", version, key, build)
 
 
 @wall_bp.post("/posts")
+@rate_limit(("ip", "RATE_LIMIT_POSTS_IP"), ("author", "RATE_LIMIT_POSTS_AUTHOR"))
+@require_auth(optional=True)
 def create_post_route():
     payload = request.get_json(silent=True) or {}
-    content = payload.get("content")
-    author = request.headers.get("X-Author")
+    user = get_user(g.auth_user_id) if g.auth_user_id is not None else None
+    author = post_author(request.headers.get("X-Author"), user)
 
     try:
-        post = create_post(content, author)
+        post = create_post(payload.get("content"), author)
     except ValueError as exc:
-        if str(exc) == "invalid_content":
-            return jsonify({"error": "invalid_content"}), 400
-        raise
+        body, status = post_error(exc)
+        return jsonify(body), status
 
     return jsonify(post), 201
+
+
+@wall_bp.get("/stream")
+def stream_posts_route():
+    try:
+        last_id = last_event_id(
+            request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+        )
+    except ValueError:
+        return jsonify({"error": "validation_error"}), 400
+
+    config = current_app.config
+    heartbeat = config["SSE_HEARTBEAT_SECONDS"]
+    backlog_limit = config["SSE_BACKLOG"]
+    stream = PostStream(last_id, current_app.json.dumps, config["SSE_RETRY_MS"])
+    # Subscribe before reading the backlog so no post falls in between.
+    subscription = post_publisher.subscribe()
+
+    def generate():
+        try:
+            yield stream.opening()
+            if last_id is not None:
+                yield from stream.backlog(list_posts_since(last_id, backlog_limit))
+            while not stream.ended and not subscription.overflowed:
+                frame = stream.frame(subscription.get(heartbeat))
+                if frame:
+                    yield frame
+        finally:
+            post_publisher.unsubscribe(subscription)
+
+    response = Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    response.call_on_close(lambda: post_publisher.unsubscribe(subscription))
+    return response
@@ -1,9 +1,39 @@
 from __future__ import annotations
 
-from marshmallow import Schema, fields, post_load, validates
+from functools import lru_cache
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
 
+from marshmallow import Schema, ValidationError, fields, post_load, validate, validates
+
+from . import validators
+from .metrics import timed
 from .validators import validate_name, validate_password
 
+VALIDATION_MODES = ("compiled", "marshmallow")
+
+# Messages produced by marshmallow's own machinery; the compiled loaders
+# reuse them verbatim so both modes return identical error payloads.
+MISSING_MESSAGE = fields.Field.default_error_messages["required"]
+NULL_MESSAGE = fields.Field.default_error_messages["null"]
+INVALID_STRING_MESSAGE = fields.String.default_error_messages["invalid"]
+INVALID_EMAIL_MESSAGE = fields.Email.default_error_messages["invalid"]
+UNKNOWN_MESSAGE = Schema._default_error_messages["unknown"]
+INVALID_INPUT_MESSAGE = Schema._default_error_messages["type"]
+
+
+def _field_check(check: Callable[[str], None], value: str) -> None:
+    """Run a :mod:`app.validators` helper inside a marshmallow hook.
+
+    The helpers raise :class:`app.validators.ValidationError`, a
+    ``ValueError`` that marshmallow does not collect; re-raise it as a field
+    error so it ends up in ``messages`` instead of escaping the load.
+    """
+
+    try:
+        check(value)
+    except validators.ValidationError as exc:
+        raise ValidationError(str(exc)) from exc
+
 
 class UserSchema(Schema):
     id = fields.Int(required=True, dump_only=True)
@@ -19,11 +49,11 @@ class UserCreateSchema(Schema):
 
     @validates("name")
     def _validate_name(self, value: str) -> None:
-        validate_name(value)
+        _field_check(validate_name, value)
 
     @validates("password")
     def _validate_password(self, value: str) -> None:
-        validate_password(value)
+        _field_check(validate_password, value)
 
 
 class UserUpdateSchema(Schema):
@@ -33,24 +63,137 @@ class UserUpdateSchema(Schema):
 
     @validates("name")
     def _validate_name(self, value: str) -> None:
-        validate_name(value)
+        _field_check(validate_name, value)
 
     @validates("password")
     def _validate_password(self, value: str) -> None:
-        validate_password(value)
+        _field_check(validate_password, value)
 
     @post_load
     def remove_empty(self, data: dict, **_: object) -> dict:
         return {key: value for key, value in data.items() if value is not None}
 
 
+_email_validator = validate.Email()
+
+
+@lru_cache(maxsize=4096)
+def is_valid_email_syntax(value: str) -> bool:
+    """Return whether :class:`marshmallow.fields.Email` would accept *value*.
+
+    Results are memoized: the regular expressions behind the check are the
+    dominant validation cost and clients tend to resubmit the same addresses.
+    """
+
+    try:
+        _email_validator(value)
+    except ValidationError:
+        return False
+    return True
+
+
+def _message_of(check: Callable[[str], None]) -> Callable[[str], Optional[str]]:
+    """Adapt a raising validator into one returning the error message."""
+
+    def run(value: str) -> Optional[str]:
+        try:
+            check(value)
+        except validators.ValidationError as exc:
+            return str(exc)
+        return None
+
+    return run
+
+
+def _check_email(value: str) -> Optional[str]:
+    return None if is_valid_email_syntax(value) else INVALID_EMAIL_MESSAGE
+
+
+class CompiledUserLoader:
+    """Precompiled equivalent of ``UserCreateSchema``/``UserUpdateSchema.load``.
+
+    The field table is resolved once, so loading a payload is a single pass
+    over three known keys with no schema introspection, hook dispatch or
+    error-store bookkeeping. Errors are raised as
+    :class:`marshmallow.ValidationError` with the same messages marshmallow
+    produces, so callers can switch between the two modes transparently.
+    """
+
+    # (field, message for non-string values, value check)
+    _fields: Tuple[Tuple[str, str, Callable[[str], Optional[str]]], ...] = (
+        ("name", INVALID_STRING_MESSAGE, _message_of(validate_name)),
+        ("email", INVALID_EMAIL_MESSAGE, _check_email),
+        ("password", INVALID_STRING_MESSAGE, _message_of(validate_password)),
+    )
+    _names = frozenset(field[0] for field in _fields)
+
+    def __init__(self, *, required: bool) -> None:
+        self.required = required
+
+    def load(self, payload: Any) -> Dict[str, str]:
+        if not isinstance(payload, Mapping):
+            raise ValidationError({"_schema": [INVALID_INPUT_MESSAGE]})
+        data: Dict[str, str] = {}
+        errors: Dict[str, list] = {}
+        for name, invalid_message, check in self._fields:
+            if name not in payload:
+                if self.required:
+                    errors[name] = [MISSING_MESSAGE]
+                continue
+            value = payload[name]
+            if value is None:
+                errors[name] = [NULL_MESSAGE]
+            elif not isinstance(value, str):
+                errors[name] = [invalid_message]
+            else:
+                message = check(value)
+                if message is None:
+                    data[name] = value
+                else:
+                    errors[name] = [message]
+        # Fast path: a payload made only of known, valid fields is done here.
+        if not errors and len(data) == len(payload):
+            return data
+        for key in payload:
+            if key not in self._names:
+                errors[key] = [UNKNOWN_MESSAGE]
+        raise ValidationError(errors, data=data)
+
+
 user_schema = UserSchema()
 users_schema = UserSchema(many=True)
 user_create_schema = UserCreateSchema()
 user_update_schema = UserUpdateSchema()
+compiled_user_create_loader = CompiledUserLoader(required=True)
+compiled_user_update_loader = CompiledUserLoader(required=False)
+
+
+@timed("validate")
+def load_user_create(payload: Any, mode: str = "compiled") -> Dict[str, str]:
+    """Validate a user creation payload with the loader selected by *mode*."""
+
+    if mode == "compiled":
+        return compiled_user_create_loader.load(payload)
+    return user_create_schema.load(payload)
+
+
+@timed("validate")
+def load_user_update(payload: Any, mode: str = "compiled") -> Dict[str, str]:
+    """Validate a user update payload with the loader selected by *mode*."""
+
+    if mode == "compiled":
+        return compiled_user_update_loader.load(payload)
+    return user_update_schema.load(payload)
 
 
 __all__ = [
+    "CompiledUserLoader",
+    "VALIDATION_MODES",
+    "compiled_user_create_loader",
+    "compiled_user_update_loader",
+    "is_valid_email_syntax",
+    "load_user_create",
+    "load_user_update",
     "UserSchema",
     "UserCreateSchema",
     "UserUpdateSchema",
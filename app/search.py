@@ -0,0 +1,347 @@
+"""In-memory search indexes: full-text over wall posts, prefixes over users."""
+
+from __future__ import annotations
+
+import heapq
+import math
+import re
+import sys
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+_TOKEN = re.compile(r"\w+")
+MAX_TOKEN_LENGTH = 40
+MAX_QUERY_TERMS = 8
+
+# BM25 parameters: term-frequency saturation and length normalisation.
+_K1 = 1.2
+_B = 0.75
+
+
+def _idf(count: int, frequency: int) -> float:
+    return math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+
+
+# Combining marks in the BMP, removed from NFKD-decomposed text.
+_STRIP_MARKS = {
+    cp: None for cp in range(0x300, 0x10000) if unicodedata.combining(chr(cp))
+}
+
+
+def fold(text: str) -> str:
+    """Lower-case *text* and strip accents, so ``Anónimo`` matches ``anonimo``."""
+
+    if text.isascii():
+        return text.lower()
+    return unicodedata.normalize("NFKD", text).translate(_STRIP_MARKS).casefold()
+
+
+@lru_cache(maxsize=1 << 16)
+def _fold_word(word: str) -> str:
+    return fold(word)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split *text* into folded word tokens, dropping implausibly long ones.
+
+    Words are split (in composed NFC form, where accented letters are word
+    characters) before folding, so folding common words is served from a
+    cache.
+    """
+
+    if not text.isascii():
+        text = unicodedata.normalize("NFC", text)
+    return [
+        _fold_word(word)
+        for word in _TOKEN.findall(text)
+        if len(word) <= MAX_TOKEN_LENGTH
+    ]
+
+
+class PostIndex:
+    """Inverted index over the newest *capacity* posts.
+
+    Each post's author and content are tokenized once when it is added; the
+    index keeps term postings (post id to term frequency) and the post
+    records themselves, so queries never touch the storage backend. Adding a
+    post beyond *capacity* evicts the oldest indexed post, mirroring how the
+    wall itself is bounded, so memory stays proportional to ``WALL_MAX_POSTS``.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._docs: Dict[int, Tuple[Dict[str, Any], Counter, int]] = {}
+        self._ids: List[int] = []
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, post: Dict[str, Any]) -> None:
+        tokens = tokenize(f"{post['author']} {post['content']}")
+        terms = Counter(tokens)
+        with self._lock:
+            pid = post["id"]
+            if pid in self._docs:
+                return
+            self._docs[pid] = (post, terms, len(tokens))
+            self._total_length += len(tokens)
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, {})[pid] = frequency
+            heapq.heappush(self._ids, pid)
+            self._evict()
+
+    def _evict(self) -> None:
+        while len(self._docs) > self.capacity:
+            pid = heapq.heappop(self._ids)
+            _, terms, length = self._docs.pop(pid)
+            self._total_length -= length
+            for term in terms:
+                postings = self._postings[term]
+                del postings[pid]
+                if not postings:
+                    del self._postings[term]
+
+    def rebuild(self, posts: Iterable[Dict[str, Any]]) -> None:
+        """Replace the index contents with *posts*."""
+
+        with self._lock:
+            self._clear()
+        for post in posts:
+            self.add(post)
+
+    def resize(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        with self._lock:
+            self.capacity = capacity
+            self._evict()
+
+    def search(
+        self, query: str, offset: int = 0, limit: int = 20
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Return posts matching every term of *query*, best first.
+
+        Matches are ranked with BM25, ties broken by recency. The second
+        element is the offset of the next page, or ``None`` on the last page.
+        """
+
+        terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+        if not terms:
+            return [], None
+        with self._lock:
+            lists = [self._postings.get(term) for term in terms]
+            if not all(lists):
+                return [], None
+            count = len(self._docs)
+            average = self._total_length / count
+            lists.sort(key=len)
+            weights = [_idf(count, len(postings)) for postings in lists]
+            scored = []
+            for pid in lists[0]:
+                score = 0.0
+                length = self._docs[pid][2]
+                norm = _K1 * (1 - _B + _B * length / average)
+                for postings, weight in zip(lists, weights):
+                    frequency = postings.get(pid)
+                    if frequency is None:
+                        break
+                    score += weight * frequency * (_K1 + 1) / (frequency + norm)
+                else:
+                    scored.append((score, pid))
+            best = heapq.nlargest(offset + limit + 1, scored)
+            page = [self._docs[pid][0] for _, pid in best[offset : offset + limit]]
+        more = len(best) > offset + limit
+        return page, offset + limit if more else None
+
+
+class _SortedStrings:
+    """Sorted set of strings kept in bounded blocks.
+
+    Inserting into or removing from one flat sorted list moves every later
+    element; splitting it into blocks of at most ``2 * _LOAD`` items bounds
+    that cost no matter how many strings are stored.
+    """
+
+    _LOAD = 512
+
+    def __init__(self, items: Iterable[str] = ()) -> None:
+        ordered = sorted(set(items))
+        load = self._LOAD
+        self._blocks: List[List[str]] = [
+            ordered[i : i + load] for i in range(0, len(ordered), load)
+        ]
+        self._maxes: List[str] = [block[-1] for block in self._blocks]
+
+    def add(self, item: str) -> None:
+        blocks, maxes = self._blocks, self._maxes
+        if not blocks:
+            blocks.append([item])
+            maxes.append(item)
+            return
+        pos = min(bisect_left(maxes, item), len(blocks) - 1)
+        block = blocks[pos]
+        index = bisect_left(block, item)
+        if index < len(block) and block[index] == item:
+            return
+        block.insert(index, item)
+        maxes[pos] = block[-1]
+        if len(block) > 2 * self._LOAD:
+            blocks.insert(pos + 1, block[self._LOAD :])
+            del block[self._LOAD :]
+            maxes.insert(pos, block[-1])
+
+    def discard(self, item: str) -> None:
+        blocks, maxes = self._blocks, self._maxes
+        pos = bisect_left(maxes, item)
+        if pos == len(blocks):
+            return
+        block = blocks[pos]
+        index = bisect_left(block, item)
+        if index == len(block) or block[index] != item:
+            return
+        del block[index]
+        if block:
+            maxes[pos] = block[-1]
+        else:
+            del blocks[pos]
+            del maxes[pos]
+
+    def iter_from(self, start: str) -> Iterator[str]:
+        """Yield the stored strings ``>= start`` in order."""
+
+        blocks = self._blocks
+        pos = bisect_left(self._maxes, start)
+        if pos == len(blocks):
+            return
+        block = blocks[pos]
+        yield from block[bisect_left(block, start) :]
+        for block in blocks[pos + 1 :]:
+            yield from block
+
+
+class UserPrefixIndex:
+    """Sorted index of folded user names and emails for prefix lookups.
+
+    Each user is indexed under its whole folded name, each name word and its
+    email. Distinct terms live in a block-sorted set and each term maps to
+    its user's id, or to a sorted ``array`` of ids once shared, so common
+    names are stored once however many users carry them. A lookup
+    binary-searches the first term at or after the prefix and walks terms
+    and ids in order until it has *limit* users, which costs the same for
+    ten users or a million; updates only touch the user's own terms.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.rebuild(())
+
+    def __len__(self) -> int:
+        return len(self._terms_by_uid)
+
+    @staticmethod
+    def _user_terms(user: Dict[str, Any]) -> Tuple[str, ...]:
+        # Names repeat across users, so their terms are interned; an email
+        # that is already folded reuses the stored string.
+        words = [sys.intern(word) for word in tokenize(user["name"])]
+        email = user["email"]
+        folded = fold(email)
+        if folded == email:
+            folded = email
+        return tuple(dict.fromkeys([sys.intern(" ".join(words)), *words, folded]))
+
+    def _remove(self, uid: int) -> None:
+        for term in self._terms_by_uid.pop(uid, ()):
+            ids = self._ids[term]
+            if isinstance(ids, int):
+                del self._ids[term]
+                self._terms.discard(term)
+                continue
+            del ids[bisect_left(ids, uid)]
+            if len(ids) == 1:
+                self._ids[term] = ids[0]
+
+    def put(self, user: Dict[str, Any]) -> None:
+        """Index *user*, replacing whatever was indexed for its id."""
+
+        uid = user["id"]
+        terms = self._user_terms(user)
+        with self._lock:
+            self._remove(uid)
+            for term in terms:
+                ids = self._ids.get(term)
+                if ids is None:
+                    self._ids[term] = uid
+                    self._terms.add(term)
+                elif isinstance(ids, int):
+                    self._ids[term] = array("q", sorted((ids, uid)))
+                elif ids[-1] < uid:
+                    ids.append(uid)
+                else:
+                    ids.insert(bisect_left(ids, uid), uid)
+            self._terms_by_uid[uid] = terms
+
+    def remove(self, uid: int) -> None:
+        with self._lock:
+            self._remove(uid)
+
+    def rebuild(self, users: Iterable[Dict[str, Any]]) -> None:
+        """Replace the index contents with *users*."""
+
+        terms_by_uid = {user["id"]: self._user_terms(user) for user in users}
+        grouped: Dict[str, List[int]] = {}
+        for uid, terms in terms_by_uid.items():
+            for term in terms:
+                grouped.setdefault(term, []).append(uid)
+        ids = {
+            term: uids[0] if len(uids) == 1 else array("q", sorted(uids))
+            for term, uids in grouped.items()
+        }
+        with self._lock:
+            self._terms_by_uid = terms_by_uid
+            self._ids: Dict[str, Union[int, array]] = ids
+            self._terms = _SortedStrings(ids)
+
+    def _scan(self, prefix: str, limit: int, found: Dict[int, None]) -> None:
+        for term in self._terms.iter_from(prefix):
+            if not term.startswith(prefix):
+                return
+            ids = self._ids[term]
+            for uid in (ids,) if isinstance(ids, int) else ids:
+                found[uid] = None
+                if len(found) >= limit:
+                    return
+
+    def search(self, prefix: str, limit: int) -> List[int]:
+        """Return up to *limit* ids of users with a term starting with *prefix*.
+
+        The prefix is matched as typed (folded) against names and emails, and
+        also with punctuation collapsed to single spaces, so ``"ana m"`` and
+        ``"ana-m"`` both find "Ana María". Ids come ordered by matching term.
+        """
+
+        found: Dict[int, None] = {}
+        if limit < 1:
+            return []
+        raw = fold(prefix).strip()
+        words = " ".join(tokenize(prefix))
+        with self._lock:
+            for candidate in dict.fromkeys((raw, words)):
+                if candidate and len(found) < limit:
+                    self._scan(candidate, limit, found)
+        return list(found)
+
+
+__all__ = ["MAX_QUERY_TERMS", "PostIndex", "UserPrefixIndex", "fold", "tokenize"]
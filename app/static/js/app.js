@@ -1,10 +1,17 @@
 async function api(path, opts = {}) {
+  const { body } = await apiResponse(path, opts);
+  return body;
+}
+
+async function apiResponse(path, opts = {}) {
   const config = {
     method: 'GET',
     ...opts,
   };
+  const token = getAuthUser()?.token;
   config.headers = {
     'Content-Type': 'application/json',
+    ...(token ? { Authorization: `Bearer ${token}` } : {}),
     ...(opts.headers || {}),
   };
   if (config.body && typeof config.body !== 'string') {
@@ -17,6 +24,9 @@ async function api(path, opts = {}) {
   } catch (_) {
     body = null;
   }
+  if (res.status === 401 && body?.error === 'invalid_token') {
+    clearAuthUser();
+  }
   if (!res.ok) {
     const message = (body && (body.error || body.message)) || `HTTP ${res.status}`;
     const error = new Error(message);
@@ -24,7 +34,7 @@ async function api(path, opts = {}) {
     error.body = body;
     throw error;
   }
-  return body;
+  return { body, headers: res.headers };
 }
 
 function showMessage(message, type = 'info') {
@@ -49,8 +59,12 @@ function errorMessageFrom(err) {
   if (code.includes('email_already_exists')) return 'Ese correo ya está registrado';
   if (code.includes('validation_error')) return 'Datos inválidos';
   if (code.includes('invalid_credentials')) return 'Credenciales inválidas';
+  if (code.includes('invalid_token')) return 'Tu sesión expiró, vuelve a iniciar sesión';
+  if (code.includes('authentication_required')) return 'Inicia sesión para continuar';
+  if (code.includes('forbidden')) return 'Solo puedes modificar tu propia cuenta';
   if (code.includes('invalid_content')) return 'El mensaje no puede estar vacío ni exceder 500 caracteres';
   if (code.includes('not_found')) return 'No encontrado';
+  if (code.includes('hashing_busy')) return 'Servidor ocupado, inténtalo de nuevo en unos segundos';
   return 'Error interno';
 }
 
@@ -138,7 +152,15 @@ async function loadUsers() {
   const tbody = document.querySelector('#users-tbody');
   if (!tbody) return;
   try {
-    const rows = await api('/api/users');
+    const rows = [];
+    let cursor = null;
+    do {
+      const query = new URLSearchParams({ fields: 'id,name,email', limit: '500' });
+      if (cursor) query.set('after_id', cursor);
+      const { body, headers } = await apiResponse(`/api/users?${query}`);
+      rows.push(...body);
+      cursor = headers.get('X-Next-Cursor');
+    } while (cursor);
     tbody.innerHTML = rows
       .map(
         (u) => `
@@ -204,35 +226,89 @@ function updateWallIdentity() {
   identity.innerHTML = `Publicarás como <strong>${escapeHtml(name)}</strong>`;
 }
 
+function renderWallPost(post) {
+  const timestamp = new Date(post.created_at || Date.now());
+  const formatted = `${timestamp.toLocaleString('es-ES', { timeZone: 'UTC' })} UTC`;
+  return `
+        <article class="wall-post" data-id="${escapeHtml(post.id)}">
+          <header>
+            <strong>${escapeHtml(post.author)}</strong>
+            <time datetime="${escapeHtml(post.created_at)}">${escapeHtml(formatted)}</time>
+          </header>
+          <p>${escapeHtml(post.content)}</p>
+        </article>`;
+}
+
+let wallStream = null;
+let wallLastId = null;
+let wallCursor = null;
+
+function setWallCursor(cursor) {
+  wallCursor = cursor;
+  const more = document.getElementById('wall-more');
+  if (more) more.hidden = !cursor;
+}
+
 async function loadWallPosts() {
   const container = document.getElementById('wall-posts');
   if (!container) return;
   try {
-    const posts = await api('/api/wall/posts');
+    const { body: posts, headers } = await apiResponse('/api/wall/posts');
+    setWallCursor(headers.get('X-Next-Cursor'));
     if (!Array.isArray(posts) || posts.length === 0) {
+      wallLastId = 0;
       container.innerHTML = '<p class="wall-empty">Aún no hay comentarios. ¡Sé el primero en escribir uno!</p>';
       return;
     }
-    container.innerHTML = posts
-      .map((post) => {
-        const timestamp = new Date(post.created_at || Date.now());
-        const formatted = `${timestamp.toLocaleString('es-ES', { timeZone: 'UTC' })} UTC`;
-        return `
-        <article class="wall-post">
-          <header>
-            <strong>${escapeHtml(post.author)}</strong>
-            <time datetime="${escapeHtml(post.created_at)}">${escapeHtml(formatted)}</time>
-          </header>
-          <p>${escapeHtml(post.content)}</p>
-        </article>`;
-      })
-      .join('');
+    wallLastId = posts[0].id;
+    container.innerHTML = posts.map(renderWallPost).join('');
   } catch (err) {
+    setWallCursor(null);
     container.innerHTML = '<p class="wall-empty error">No se pudieron cargar los comentarios.</p>';
     showMessage(errorMessageFrom(err), 'error');
   }
 }
 
+async function loadMoreWallPosts() {
+  const container = document.getElementById('wall-posts');
+  if (!container || !wallCursor) return;
+  try {
+    const query = new URLSearchParams({ before_id: wallCursor });
+    const { body: posts, headers } = await apiResponse(`/api/wall/posts?${query}`);
+    container.insertAdjacentHTML('beforeend', posts.map(renderWallPost).join(''));
+    setWallCursor(headers.get('X-Next-Cursor'));
+  } catch (err) {
+    showMessage(errorMessageFrom(err), 'error');
+  }
+}
+
+function prependWallPost(post) {
+  const container = document.getElementById('wall-posts');
+  if (!container || post.id <= (wallLastId || 0)) return;
+  wallLastId = post.id;
+  container.querySelector('.wall-empty')?.remove();
+  container.insertAdjacentHTML('afterbegin', renderWallPost(post));
+}
+
+function connectWallStream() {
+  if (!window.EventSource || wallStream) return;
+  const query = wallLastId === null ? '' : `?last_event_id=${wallLastId}`;
+  wallStream = new EventSource(`/api/wall/stream${query}`);
+  wallStream.addEventListener('post', (event) => {
+    prependWallPost(JSON.parse(event.data));
+  });
+  wallStream.addEventListener('reset', async () => {
+    wallStream.close();
+    wallStream = null;
+    await loadWallPosts();
+    connectWallStream();
+  });
+}
+
+function wallStreamIsLive() {
+  return wallStream !== null && wallStream.readyState === EventSource.OPEN;
+}
+
 function setupWallForm() {
   const form = document.getElementById('wall-form');
   if (!form) return;
@@ -250,10 +326,14 @@ function setupWallForm() {
       headers['X-Author'] = user.name;
     }
     try {
-      await api('/api/wall/posts', { method: 'POST', headers, body: { content } });
+      const post = await api('/api/wall/posts', { method: 'POST', headers, body: { content } });
       form.reset();
       updateWallIdentity();
-      await loadWallPosts();
+      if (wallStreamIsLive()) {
+        prependWallPost(post);
+      } else {
+        await loadWallPosts();
+      }
       showMessage('Comentario publicado', 'success');
     } catch (err) {
       showMessage(errorMessageFrom(err), 'error');
@@ -261,10 +341,12 @@ function setupWallForm() {
   });
 }
 
-function setupWallPage() {
+async function setupWallPage() {
   setupWallForm();
+  document.getElementById('wall-more')?.addEventListener('click', loadMoreWallPosts);
   updateWallIdentity();
-  loadWallPosts();
+  await loadWallPosts();
+  connectWallStream();
 }
 
 if (document.readyState === 'loading') {
@@ -0,0 +1,57 @@
+"""Storage backends behind the :mod:`app.store` API."""
+
+from __future__ import annotations
+
+from typing import Any, Mapping
+
+from .base import StorageBackend, normalize_email
+from .journal import JournaledMemoryBackend
+from .memory import MemoryBackend, PostRing
+from .records import PostRecord, UserRecord
+from .shared import SharedMemoryBackend
+from .sqlite import SQLiteBackend
+
+DEFAULT_MAX_POSTS = 10_000
+BACKENDS = ("memory", "sqlite", "shared")
+
+
+def create_backend(config: Mapping[str, Any]) -> StorageBackend:
+    """Instantiate the backend named by ``STORE_BACKEND`` in *config*."""
+
+    kind = config.get("STORE_BACKEND", "memory")
+    max_posts = int(config.get("WALL_MAX_POSTS", DEFAULT_MAX_POSTS))
+    if kind == "memory":
+        journal_dir = config.get("STORE_JOURNAL_DIR")
+        if not journal_dir:
+            return MemoryBackend(max_posts)
+        return JournaledMemoryBackend(
+            journal_dir,
+            max_posts,
+            fsync_interval=float(config.get("JOURNAL_FSYNC_INTERVAL", 0.05)),
+            snapshot_every=int(config.get("JOURNAL_SNAPSHOT_EVERY", 100_000)),
+        )
+    if kind == "sqlite":
+        return SQLiteBackend(config.get("SQLITE_PATH", "app.db"), max_posts)
+    if kind == "shared":
+        return SharedMemoryBackend(
+            config.get("SHARED_STORE_PATH", "/dev/shm/app-store"),
+            max_posts,
+            size=int(config.get("SHARED_STORE_SIZE", 256 << 20)),
+            max_users=int(config.get("SHARED_STORE_MAX_USERS", 1_000_000)),
+        )
+    raise ValueError(f"unknown store backend: {kind}")
+
+
+__all__ = [
+    "BACKENDS",
+    "JournaledMemoryBackend",
+    "MemoryBackend",
+    "PostRecord",
+    "PostRing",
+    "SQLiteBackend",
+    "SharedMemoryBackend",
+    "StorageBackend",
+    "UserRecord",
+    "create_backend",
+    "normalize_email",
+]
@@ -0,0 +1,160 @@
+"""Interface implemented by every storage backend."""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+Record = Mapping[str, Any]
+Page = Tuple[List[Record], Optional[int]]
+COLLECTIONS = ("users", "posts")
+#: Number of user writes a multiprocess backend remembers for catch-up.
+CHANGE_LOG_SIZE = 4096
+
+
+class Version(NamedTuple):
+    """Change marker for one collection.
+
+    ``counter`` increases on every mutation of the collection. ``epoch``
+    identifies the backend's lifetime: counters restart with a new epoch, so
+    ``(epoch, counter)`` never repeats for different contents.
+    """
+
+    epoch: str
+    counter: int
+    modified: float
+
+    @property
+    def tag(self) -> str:
+        return f"{self.epoch}-{self.counter}"
+
+
+def normalize_email(email: str) -> str:
+    """Return the key used to compare emails case-insensitively."""
+
+    key = email.casefold()
+    # Most emails are already lower case: index them by the stored string
+    # rather than keeping a second, identical copy per user.
+    return email if key == email else key
+
+
+class StorageBackend(ABC):
+    """Persistence for user and post records.
+
+    Backends deal only in stored records: user records include
+    ``password_hash`` and the facade in :mod:`app.store` is responsible for
+    hashing, content validation and building public views. Email uniqueness
+    is case-insensitive and enforced atomically by the backend, which raises
+    ``ValueError("email_already_exists")`` on conflict.
+
+    Records are read-only mappings whose ``created_at`` is an ISO 8601
+    string; backends receive creation times as integer epoch seconds and
+    may store them in whatever form is most compact.
+    """
+
+    name = "abstract"
+    #: Whether other processes may write the same records. The store then
+    #: resynchronises its per-process state from :meth:`version` and keeps
+    #: session cutoffs in the backend.
+    multiprocess = False
+
+    def __init__(self, max_posts: int) -> None:
+        self.max_posts = max_posts
+
+    # Users -----------------------------------------------------------------
+
+    @abstractmethod
+    def insert_user(
+        self, name: str, email: str, password_hash: str, created_at: int
+    ) -> Record:
+        """Store a new user and return its record, including the new id."""
+
+    @abstractmethod
+    def get_user(self, uid: int) -> Optional[Record]:
+        """Return the user record for *uid*, or ``None``."""
+
+    @abstractmethod
+    def get_user_by_email(self, email: str) -> Optional[Record]:
+        """Return the user whose email matches *email* ignoring case."""
+
+    @abstractmethod
+    def update_user(self, uid: int, changes: Dict[str, Any]) -> Optional[Record]:
+        """Apply *changes* to user *uid* and return the updated record."""
+
+    @abstractmethod
+    def delete_user(self, uid: int) -> bool:
+        """Remove user *uid*; return ``False`` when it does not exist."""
+
+    @abstractmethod
+    def list_users(self, after_id: Optional[int], limit: Optional[int]) -> Page:
+        """Return users with ``id > after_id`` in id order and the next cursor."""
+
+    # Posts -----------------------------------------------------------------
+
+    @abstractmethod
+    def insert_post(self, author: str, content: str, created_at: int) -> Record:
+        """Append a post, evicting the oldest beyond ``max_posts``."""
+
+    @abstractmethod
+    def list_posts(self, before_id: Optional[int], limit: Optional[int]) -> Page:
+        """Return posts with ``id < before_id`` newest first and the next cursor."""
+
+    # Versions --------------------------------------------------------------
+
+    @abstractmethod
+    def version(self, collection: str) -> Version:
+        """Return the current :class:`Version` of ``users`` or ``posts``."""
+
+    @abstractmethod
+    def count(self, collection: str) -> int:
+        """Return how many records ``users`` or ``posts`` currently holds."""
+
+    def changed_users(self, since: int) -> Optional[List[int]]:
+        """Return the ids written since the ``users`` counter was *since*.
+
+        Ids come in write order and ``0`` stands for a reset. ``None`` means
+        the change log, which holds the last :data:`CHANGE_LOG_SIZE` writes,
+        no longer reaches back that far. Only :attr:`multiprocess` backends
+        keep the log.
+        """
+
+        raise NotImplementedError
+
+    # Sessions --------------------------------------------------------------
+
+    def revoke_sessions(self, uid: Optional[int], cutoff: int) -> None:
+        """Invalidate tokens of *uid*, or of everyone, issued up to *cutoff*.
+
+        *cutoff* is in epoch milliseconds. Only :attr:`multiprocess` backends
+        need to keep cutoffs; the token manager holds them itself otherwise.
+        """
+
+        raise NotImplementedError
+
+    def session_cutoff(self, uid: int) -> int:
+        """Return the latest cutoff recorded for *uid* or everyone, else -1."""
+
+        raise NotImplementedError
+
+    # Lifecycle -------------------------------------------------------------
+
+    @abstractmethod
+    def reset(self) -> None:
+        """Remove every user and post and restart id allocation."""
+
+    def set_max_posts(self, max_posts: int) -> None:
+        self.max_posts = max_posts
+
+    def close(self) -> None:
+        """Release any resources held by the backend."""
+
+
+__all__ = [
+    "CHANGE_LOG_SIZE",
+    "COLLECTIONS",
+    "Page",
+    "Record",
+    "StorageBackend",
+    "Version",
+    "normalize_email",
+]
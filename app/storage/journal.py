@@ -0,0 +1,295 @@
+"""Write-ahead journal and compacted snapshots for :class:`MemoryBackend`.
+
+Every mutation is appended as one JSON line to ``journal-<gen>.ndjson``.
+Lines are buffered and a background thread flushes and ``fsync``s them in
+batches every ``fsync_interval`` seconds. At most that window of writes can
+be lost in a crash, and each write costs only a buffered append. After
+``snapshot_every`` mutations the backend rotates to a new journal generation
+and writes ``snapshot-<gen>.ndjson`` in the background. Files from older
+generations are then deleted. Records are written with ``created_at`` as
+integer epoch seconds; ISO strings left by older files are still accepted.
+
+On startup the newest complete snapshot is loaded and the journals of its
+generation and later are replayed. A torn final line, left by a crash
+mid-write, is ignored and cut from the journal that new writes go to, so
+they do not end up glued to it.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from .base import Record
+from .memory import MemoryBackend, PostRing
+from .records import PostRecord, UserRecord
+
+SNAPSHOT_PREFIX = "snapshot-"
+JOURNAL_PREFIX = "journal-"
+SUFFIX = ".ndjson"
+
+
+def _stored(record: Any) -> Dict[str, Any]:
+    if isinstance(record, (UserRecord, PostRecord)):
+        return record.stored()
+    raise TypeError(f"cannot journal {type(record).__name__}")
+
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_stored)
+
+
+def _encode(entry: Dict[str, Any]) -> bytes:
+    return _ENCODER.encode(entry).encode() + b"\n"
+
+
+def _generation(path: Path, prefix: str) -> int:
+    return int(path.name[len(prefix) : -len(SUFFIX)])
+
+
+def _files(directory: Path, prefix: str) -> List[Tuple[int, Path]]:
+    return sorted(
+        (_generation(path, prefix), path)
+        for path in directory.glob(f"{prefix}*{SUFFIX}")
+    )
+
+
+def _read_lines(path: Path, *, repair: bool = False) -> Iterator[Dict[str, Any]]:
+    """Yield the entries of *path* up to its first torn line.
+
+    With *repair*, the file is then truncated after the last entry read and
+    ends with a newline, ready to be appended to.
+    """
+
+    offset = 0
+    with path.open("rb") as handle:
+        for line in handle:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            offset += len(line)
+            yield entry
+    if not repair:
+        return
+    with path.open("r+b") as handle:
+        handle.truncate(offset)
+        handle.seek(max(offset - 1, 0))
+        if offset and handle.read(1) != b"\n":
+            handle.write(b"\n")
+        handle.flush()
+        os.fsync(handle.fileno())
+
+
+class Journal:
+    """Append-only NDJSON log with batched, periodic ``fsync``."""
+
+    def __init__(self, path: Path, fsync_interval: float) -> None:
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._handle: IO[bytes] = path.open("ab", buffering=1 << 20)
+        self._dirty = False
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if fsync_interval > 0:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="journal-fsync", daemon=True
+            )
+            self._flusher.start()
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        data = _encode(entry)
+        with self._lock:
+            self._handle.write(data)
+            self._dirty = True
+        if self._flusher is None:
+            self.sync()
+
+    def sync(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            self._handle.flush()
+            self._dirty = False
+            fileno = self._handle.fileno()
+        os.fsync(fileno)
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.fsync_interval):
+            self.sync()
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.sync()
+        self._handle.close()
+
+
+class JournaledMemoryBackend(MemoryBackend):
+    """:class:`MemoryBackend` whose mutations survive a restart."""
+
+    name = "memory+journal"
+
+    def __init__(
+        self,
+        directory: str,
+        max_posts: int,
+        *,
+        fsync_interval: float = 0.05,
+        snapshot_every: int = 100_000,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+        self._journal: Optional[Journal] = None
+        self._generation = 0
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_thread: Optional[threading.Thread] = None
+        super().__init__(max_posts)
+        self._recover()
+        self._open_journal(self._generation)
+        atexit.register(self.close)
+
+    # Journal ---------------------------------------------------------------
+
+    def _log(self, op: str, record: Record) -> None:
+        if self._journal is None:
+            return
+        self._journal.append({"op": op, "rec": record})
+        # User and post writes hold different locks, so the counter has its own.
+        with self._pending_lock:
+            self._pending += 1
+            if self._pending < self.snapshot_every:
+                return
+            if not self._snapshot_lock.acquire(blocking=False):
+                return
+            self._pending = 0
+        self._snapshot_thread = threading.Thread(
+            target=self._snapshot_locked, name="journal-snapshot", daemon=True
+        )
+        self._snapshot_thread.start()
+
+    def _open_journal(self, generation: int) -> None:
+        path = self.directory / f"{JOURNAL_PREFIX}{generation:08d}{SUFFIX}"
+        self._journal = Journal(path, self.fsync_interval)
+
+    def snapshot(self) -> None:
+        """Write a compacted snapshot now and drop superseded files."""
+
+        self._snapshot_lock.acquire()
+        self._snapshot_locked()
+
+    def _snapshot_locked(self) -> None:
+        try:
+            with self._users_lock, self._posts_lock:
+                generation = self._generation + 1
+                previous = self._journal
+                self._open_journal(generation)
+                self._generation = generation
+                users = list(self.users.values())
+                posts = list(self.posts)
+                header = {
+                    "generation": generation,
+                    "next_user_id": self.next_user_id,
+                    "next_post_id": self.posts.next_id,
+                }
+            previous.close()
+            self._write_snapshot(generation, header, users, posts)
+            self._prune(generation)
+        finally:
+            self._snapshot_lock.release()
+
+    def _write_snapshot(
+        self,
+        generation: int,
+        header: Dict[str, Any],
+        users: List[Record],
+        posts: List[Record],
+    ) -> None:
+        final = self.directory / f"{SNAPSHOT_PREFIX}{generation:08d}{SUFFIX}"
+        partial = final.with_suffix(".tmp")
+        with partial.open("wb") as handle:
+            handle.write(_encode(header))
+            for user in users:
+                handle.write(_encode({"op": "user", "rec": user}))
+            for post in reversed(posts):
+                handle.write(_encode({"op": "post", "rec": post}))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(partial, final)
+
+    def _prune(self, generation: int) -> None:
+        for prefix in (SNAPSHOT_PREFIX, JOURNAL_PREFIX):
+            for gen, path in _files(self.directory, prefix):
+                if gen < generation:
+                    path.unlink(missing_ok=True)
+
+    # Recovery --------------------------------------------------------------
+
+    def _recover(self) -> None:
+        state = {"next_user_id": 1, "next_post_id": 1}
+        base = 0
+        snapshots = _files(self.directory, SNAPSHOT_PREFIX)
+        if snapshots:
+            base, path = snapshots[-1]
+            entries = _read_lines(path)
+            header = next(entries)
+            state["next_user_id"] = header["next_user_id"]
+            state["next_post_id"] = header["next_post_id"]
+            self._replay(entries, state)
+        generation = base
+        journals = [
+            (gen, path)
+            for gen, path in _files(self.directory, JOURNAL_PREFIX)
+            if gen >= base
+        ]
+        for gen, path in journals:
+            # The last journal is reopened for appending below.
+            repair = gen == journals[-1][0]
+            self._replay(_read_lines(path, repair=repair), state)
+            generation = gen
+        self._generation = generation
+        self.rebuild_user_indexes()
+        self.next_user_id = max(self.next_user_id, state["next_user_id"])
+        if not len(self.posts):
+            self.posts.first_id = self.posts.next_id = state["next_post_id"]
+
+    def _replay(self, entries: Iterator[Dict[str, Any]], state: Dict[str, int]) -> None:
+        users, posts = self.users, self.posts
+        for entry in entries:
+            op, record = entry["op"], entry["rec"]
+            if op == "user":
+                users[record["id"]] = UserRecord.from_stored(record)
+                state["next_user_id"] = max(state["next_user_id"], record["id"] + 1)
+            elif op == "delete_user":
+                users.pop(record["id"], None)
+            elif op == "post":
+                if not len(posts):
+                    posts.first_id = posts.next_id = record["id"]
+                posts.append(PostRecord.from_stored(record))
+                state["next_post_id"] = record["id"] + 1
+            elif op == "reset":
+                users.clear()
+                posts = self.posts = PostRing(self.max_posts)
+                state["next_user_id"] = state["next_post_id"] = 1
+
+    # Lifecycle -------------------------------------------------------------
+
+    def close(self) -> None:
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        atexit.unregister(self.close)
+
+
+__all__ = ["Journal", "JournaledMemoryBackend"]
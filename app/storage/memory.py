@@ -0,0 +1,239 @@
+"""In-process storage backend built on dicts and a ring buffer."""
+
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterator, List, Optional
+
+from .base import COLLECTIONS, Page, Record, StorageBackend, Version, normalize_email
+from .records import PostRecord, UserRecord
+
+
+class PostRing:
+    """Fixed-capacity, append-only log of wall posts addressed by post id.
+
+    Post ids are contiguous, so the slot of a post is ``id % capacity`` and a
+    page of posts can be read without touching any other entry. Once the
+    buffer is full each append evicts the oldest post.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._slots: List[Optional[PostRecord]] = [None] * capacity
+        self.first_id = 1
+        self.next_id = 1
+
+    def __len__(self) -> int:
+        return self.next_id - self.first_id
+
+    def __iter__(self) -> Iterator[PostRecord]:
+        """Iterate over the retained posts from newest to oldest."""
+
+        for pid in range(self.next_id - 1, self.first_id - 1, -1):
+            yield self._slots[pid % self.capacity]
+
+    def append(self, post: PostRecord) -> Optional[PostRecord]:
+        """Store *post* and return the evicted post, if any."""
+
+        if post.id != self.next_id:
+            raise ValueError("post ids must be contiguous")
+        slot = post.id % self.capacity
+        evicted = None
+        if len(self) == self.capacity:
+            evicted = self._slots[slot]
+            self.first_id += 1
+        # Publish the slot before advancing next_id so lock-free readers never
+        # see an id whose slot has not been written yet.
+        self._slots[slot] = post
+        self.next_id += 1
+        return evicted
+
+    def get(self, pid: int) -> Optional[PostRecord]:
+        if not self.first_id <= pid < self.next_id:
+            return None
+        post = self._slots[pid % self.capacity]
+        return post if post is not None and post.id == pid else None
+
+    def page_before(
+        self, before_id: Optional[int], limit: Optional[int]
+    ) -> List[PostRecord]:
+        """Return up to *limit* posts with ``id < before_id``, newest first.
+
+        Slots overwritten by a concurrent append are skipped, so readers never
+        need to take the writer lock.
+        """
+
+        top = self.next_id if before_id is None else min(before_id, self.next_id)
+        bottom = self.first_id if limit is None else max(self.first_id, top - limit)
+        slots, capacity = self._slots, self.capacity
+        page = []
+        for pid in range(top - 1, bottom - 1, -1):
+            post = slots[pid % capacity]
+            if post is not None and post.id == pid:
+                page.append(post)
+        return page
+
+    def resized(self, capacity: int) -> "PostRing":
+        """Return a new ring with *capacity* holding the newest retained posts."""
+
+        ring = PostRing(capacity)
+        keep = list(self)[:capacity]
+        start = keep[-1].id if keep else self.next_id
+        ring.first_id = ring.next_id = start
+        for post in reversed(keep):
+            ring.append(post)
+        return ring
+
+
+class MemoryBackend(StorageBackend):
+    """Users and wall posts held in process memory.
+
+    Writers to a collection serialise on that collection's lock; readers
+    never lock. They rely on records being replaced rather than mutated
+    (copy-on-write) and on the GIL making single ``dict``/``list`` operations
+    atomic, so a reader always sees either the old or the new version of a
+    record. Records are :class:`UserRecord` and :class:`PostRecord` instances
+    rather than dicts, which roughly halves the memory held per record.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_posts: int) -> None:
+        super().__init__(max_posts)
+        self._users_lock = threading.Lock()
+        self._posts_lock = threading.Lock()
+        epoch = uuid.uuid4().hex[:12]
+        self._versions = {name: Version(epoch, 0, time.time()) for name in COLLECTIONS}
+        self.reset()
+
+    def reset(self) -> None:
+        with self._users_lock, self._posts_lock:
+            self.users: Dict[int, UserRecord] = {}
+            self.user_ids: List[int] = []
+            self.email_index: Dict[str, int] = {}
+            self.next_user_id = 1
+            self.posts = PostRing(self.max_posts)
+            self._bump("users")
+            self._bump("posts")
+            self._log("reset", {})
+
+    def _log(self, op: str, record: Record) -> None:
+        """Hook called inside the writer lock after every mutation."""
+
+    def _bump(self, collection: str) -> None:
+        current = self._versions[collection]
+        self._versions[collection] = current._replace(
+            counter=current.counter + 1, modified=time.time()
+        )
+
+    def version(self, collection: str) -> Version:
+        return self._versions[collection]
+
+    def count(self, collection: str) -> int:
+        return len(self.users if collection == "users" else self.posts)
+
+    def set_max_posts(self, max_posts: int) -> None:
+        with self._posts_lock:
+            if max_posts != self.max_posts:
+                self.max_posts = max_posts
+                self.posts = self.posts.resized(max_posts)
+                self._bump("posts")
+
+    def rebuild_user_indexes(self) -> None:
+        """Recompute ids, the email index and the id sequence from ``users``."""
+
+        with self._users_lock:
+            self.user_ids = sorted(self.users)
+            self.email_index = {
+                normalize_email(user.email): uid for uid, user in self.users.items()
+            }
+            self.next_user_id = (self.user_ids[-1] if self.user_ids else 0) + 1
+
+    # Users -----------------------------------------------------------------
+
+    def insert_user(
+        self, name: str, email: str, password_hash: str, created_at: int
+    ) -> Record:
+        key = normalize_email(email)
+        with self._users_lock:
+            if key in self.email_index:
+                raise ValueError("email_already_exists")
+            uid = self.next_user_id
+            self.next_user_id += 1
+            user = UserRecord(uid, name, email, password_hash, created_at)
+            self.users[uid] = user
+            self.user_ids.append(uid)
+            self.email_index[key] = uid
+            self._bump("users")
+            self._log("user", user)
+        return user
+
+    def get_user(self, uid: int) -> Optional[Record]:
+        return self.users.get(uid)
+
+    def get_user_by_email(self, email: str) -> Optional[Record]:
+        uid = self.email_index.get(normalize_email(email))
+        return None if uid is None else self.users.get(uid)
+
+    def update_user(self, uid: int, changes: Dict[str, Any]) -> Optional[Record]:
+        with self._users_lock:
+            user = self.users.get(uid)
+            if not user:
+                return None
+            email = changes.get("email")
+            if email:
+                key = normalize_email(email)
+                if self.email_index.get(key, uid) != uid:
+                    raise ValueError("email_already_exists")
+            updated = user.replace(changes)
+            self.users[uid] = updated
+            if email:
+                self.email_index.pop(normalize_email(user.email), None)
+                self.email_index[key] = uid
+            self._bump("users")
+            self._log("user", updated)
+        return updated
+
+    def delete_user(self, uid: int) -> bool:
+        with self._users_lock:
+            user = self.users.pop(uid, None)
+            if user is None:
+                return False
+            del self.user_ids[bisect_left(self.user_ids, uid)]
+            self.email_index.pop(normalize_email(user.email), None)
+            self._bump("users")
+            self._log("delete_user", {"id": uid})
+        return True
+
+    def list_users(self, after_id: Optional[int], limit: Optional[int]) -> Page:
+        user_ids, users = self.user_ids, self.users
+        start = 0 if after_id is None else bisect_right(user_ids, after_id)
+        stop = len(user_ids) if limit is None else start + limit
+        page_ids = user_ids[start:stop]
+        has_more = start + len(page_ids) < len(user_ids)
+        records = [user for user in map(users.get, page_ids) if user is not None]
+        return records, page_ids[-1] if page_ids and has_more else None
+
+    # Posts -----------------------------------------------------------------
+
+    def insert_post(self, author: str, content: str, created_at: int) -> Record:
+        with self._posts_lock:
+            post = PostRecord(self.posts.next_id, author, content, created_at)
+            self.posts.append(post)
+            self._bump("posts")
+            self._log("post", post)
+        return post
+
+    def list_posts(self, before_id: Optional[int], limit: Optional[int]) -> Page:
+        ring = self.posts
+        posts = ring.page_before(before_id, limit)
+        has_more = bool(posts) and posts[-1].id > ring.first_id
+        return posts, posts[-1].id if has_more else None
+
+
+__all__ = ["MemoryBackend", "PostRing"]
@@ -0,0 +1,158 @@
+"""Compact record classes used by the in-memory backends.
+
+A stored user or post as a ``dict`` carries a hash table and repeats its
+keys in every record; with millions of records that overhead dominates the
+actual data. :class:`UserRecord` and :class:`PostRecord` keep each field in
+a ``__slots__`` entry instead and store the creation time as integer epoch
+seconds, which is formatted as ISO 8601 only when the record is read
+through its mapping interface (``record["created_at"]``) or serialized.
+
+Both classes are read-only :class:`~collections.abc.Mapping` views over the
+same public keys the dict records had, so callers, projections and JSON
+encoding keep working unchanged. Records are never mutated once stored:
+updates build a new record with :meth:`UserRecord.replace`.
+"""
+
+from __future__ import annotations
+
+import time
+from calendar import timegm
+from collections.abc import Mapping
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Dict, FrozenSet, Iterator, List, Sequence, Tuple, Union
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+@lru_cache(maxsize=4096)
+def format_timestamp(seconds: int) -> str:
+    """Return *seconds* since the epoch as ``YYYY-MM-DDTHH:MM:SSZ`` (UTC)."""
+
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(seconds))
+
+
+def parse_timestamp(value: Union[int, str]) -> int:
+    """Return epoch seconds for an integer or a :data:`TIMESTAMP_FORMAT` string."""
+
+    if isinstance(value, int):
+        return value
+    return timegm(time.strptime(value, TIMESTAMP_FORMAT))
+
+
+class _SlotRecord(Mapping):
+    """Read-only mapping over ``__slots__`` with a formatted ``created_at``."""
+
+    __slots__ = ()
+    _keys: Tuple[str, ...] = ()
+    _attributes: FrozenSet[str] = frozenset()
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._attributes:
+            return getattr(self, key)
+        if key == "created_at":
+            return format_timestamp(self.created)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    @classmethod
+    def column(cls, records: Sequence["_SlotRecord"], key: str) -> List[Any]:
+        """Return the *key* value of every record, read straight from its slots."""
+
+        if key in cls._attributes:
+            return list(map(attrgetter(key), records))
+        if key == "created_at":
+            return list(map(format_timestamp, map(attrgetter("created"), records)))
+        raise KeyError(key)
+
+    def stored(self) -> Dict[str, Any]:
+        """Return the fields as a dict with ``created_at`` left as an integer."""
+
+        values = {key: getattr(self, key) for key in self._keys[:-1]}
+        values["created_at"] = self.created
+        return values
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the record as the equivalent plain ``dict``."""
+
+        values = self.stored()
+        values["created_at"] = format_timestamp(self.created)
+        return values
+
+
+class UserRecord(_SlotRecord):
+    """Stored user: ``id``, ``name``, ``email``, ``password_hash``, ``created``."""
+
+    __slots__ = ("id", "name", "email", "password_hash", "created")
+    _keys = ("id", "name", "email", "password_hash", "created_at")
+    _attributes = frozenset(_keys[:-1])
+
+    def __init__(
+        self, id: int, name: str, email: str, password_hash: str, created: int
+    ) -> None:
+        self.id = id
+        self.name = name
+        self.email = email
+        self.password_hash = password_hash
+        self.created = created
+
+    @classmethod
+    def from_stored(cls, values: Mapping) -> "UserRecord":
+        return cls(
+            values["id"],
+            values["name"],
+            values["email"],
+            values["password_hash"],
+            parse_timestamp(values["created_at"]),
+        )
+
+    def replace(self, changes: Mapping) -> "UserRecord":
+        """Return a copy with *changes* (``name``/``email``/``password_hash``)."""
+
+        return UserRecord(
+            self.id,
+            changes.get("name", self.name),
+            changes.get("email", self.email),
+            changes.get("password_hash", self.password_hash),
+            self.created,
+        )
+
+
+class PostRecord(_SlotRecord):
+    """Stored wall post: ``id``, ``author``, ``content``, ``created``."""
+
+    __slots__ = ("id", "author", "content", "created")
+    _keys = ("id", "author", "content", "created_at")
+    _attributes = frozenset(_keys[:-1])
+
+    def __init__(self, id: int, author: str, content: str, created: int) -> None:
+        self.id = id
+        self.author = author
+        self.content = content
+        self.created = created
+
+    @classmethod
+    def from_stored(cls, values: Mapping) -> "PostRecord":
+        return cls(
+            values["id"],
+            values["author"],
+            values["content"],
+            parse_timestamp(values["created_at"]),
+        )
+
+
+__all__ = [
+    "PostRecord",
+    "TIMESTAMP_FORMAT",
+    "UserRecord",
+    "format_timestamp",
+    "parse_timestamp",
+]
@@ -0,0 +1,643 @@
+"""Storage backend in a memory-mapped file shared by worker processes.
+
+Every worker of a prefork server opens the same file (by default under
+``/dev/shm``, i.e. plain shared memory) and maps it, so all of them see the
+same users and posts. The segment is laid out as::
+
+    header | user index | email table | post ring | cutoffs | changes | heap
+
+* The **user index** maps a user id straight to the heap offset of its
+  current record (``0`` when deleted), so ids are looked up by position.
+* The **email table** is an open-addressing hash table of
+  ``(hash, user id)`` pairs over normalised emails, giving O(1) duplicate
+  checks and logins.
+* The **post ring** holds the heap offsets of the newest ``max_posts``
+  posts, addressed by ``id % capacity`` like :class:`~.memory.PostRing`.
+* The **session cutoffs** hold, per user id, the time in ms before which
+  that user's tokens are revoked; the header holds the one for everyone.
+* The **change log** is a ring of the user ids written by the last
+  ``CHANGE_LOG_SIZE`` writes, addressed by ``users_counter % size``, so
+  other processes can update their indexes by id.
+* The **record heap** stores encoded records, appended at ``heap_end``.
+  Updates append a new version and repoint the index; when the heap runs
+  out, live records are compacted to its start.
+
+Writers serialise on an ``flock`` of the file plus a thread lock, since
+``flock`` is shared by the threads of a process. The lock is taken on a
+descriptor each process opens itself: a forked child inherits its parent's
+open file description, and ``flock`` would not exclude the two. Readers
+never lock: the
+header holds a sequence counter that a writer makes odd while it mutates
+the segment and even again afterwards, and a reader retries if the counter
+was odd or changed while it copied a record out (a seqlock). Reads thus
+run in parallel in every process, at the cost of assuming stores become
+visible in program order, as they do on x86-64.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+try:  # pragma: no cover - depends on the platform
+    import fcntl
+except ImportError:  # pragma: no cover - depends on the platform
+    fcntl = None
+
+from .base import (
+    CHANGE_LOG_SIZE,
+    COLLECTIONS,
+    Page,
+    Record,
+    StorageBackend,
+    Version,
+    normalize_email,
+)
+from .records import PostRecord, UserRecord
+
+MAGIC = b"APPSHM02"
+HEADER_SIZE = 4096
+DEFAULT_SIZE = 256 << 20
+DEFAULT_MAX_USERS = 1_000_000
+TOMBSTONE = 2**64 - 1
+
+_SEQ_OFFSET = 8
+_FIELDS = (
+    ("epoch", "16s"),
+    ("users_counter", "Q"),
+    ("users_modified", "d"),
+    ("posts_counter", "Q"),
+    ("posts_modified", "d"),
+    ("next_user_id", "Q"),
+    ("user_count", "Q"),
+    ("post_first_id", "Q"),
+    ("post_next_id", "Q"),
+    ("heap_end", "Q"),
+    ("email_used", "Q"),
+    ("max_users", "Q"),
+    ("email_slots", "Q"),
+    ("post_capacity", "Q"),
+    ("max_posts", "Q"),
+    ("size", "Q"),
+    ("sessions_cutoff", "Q"),
+)
+
+
+def _field_layout() -> Dict[str, Tuple[struct.Struct, int]]:
+    layout, offset = {}, _SEQ_OFFSET + 8
+    for name, code in _FIELDS:
+        packer = struct.Struct("<" + code)
+        layout[name] = (packer, offset)
+        offset += packer.size
+    return layout
+
+
+_LAYOUT = _field_layout()
+_SEQ = struct.Struct("<Q")
+_USER = struct.Struct("<QqIII")
+_POST = struct.Struct("<QqII")
+_TORN = object()
+_TORN_ERRORS = (struct.error, ValueError, IndexError, UnicodeDecodeError)
+
+T = TypeVar("T")
+
+_reopen_lock = threading.Lock()
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _email_hash(key: str) -> int:
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class SharedMemoryBackend(StorageBackend):
+    """Users and wall posts in an ``mmap``-ed file shared across processes."""
+
+    name = "shared"
+    multiprocess = True
+
+    def __init__(
+        self,
+        path: str,
+        max_posts: int,
+        *,
+        size: int = DEFAULT_SIZE,
+        max_users: int = DEFAULT_MAX_USERS,
+    ) -> None:
+        if fcntl is None:  # pragma: no cover - depends on the platform
+            raise RuntimeError("the shared store needs fcntl.flock (POSIX only)")
+        super().__init__(max_posts)
+        self.path = path
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._pid = os.getpid()
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.pread(self._fd, len(MAGIC), 0) != MAGIC:
+                self._format(size, max_users, max_posts)
+            self._mmap = mmap.mmap(self._fd, 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map_regions()
+        # An existing segment keeps the geometry it was created with.
+        self.max_posts = self._get("max_posts")
+
+    # Layout ----------------------------------------------------------------
+
+    def _format(self, size: int, max_users: int, max_posts: int) -> None:
+        email_slots = 1 << (2 * max_users - 1).bit_length()
+        heap_start = self._heap_start(max_users, email_slots, max_posts)
+        if size < heap_start + (64 << 10):
+            raise ValueError("shared store size is too small for its capacity")
+        os.ftruncate(self._fd, 0)
+        os.ftruncate(self._fd, size)
+        with mmap.mmap(self._fd, size) as segment:
+            now = time.time()
+            values = {
+                "epoch": uuid.uuid4().hex[:12].encode(),
+                "users_modified": now,
+                "posts_modified": now,
+                "next_user_id": 1,
+                "post_first_id": 1,
+                "post_next_id": 1,
+                "heap_end": heap_start,
+                "max_users": max_users,
+                "email_slots": email_slots,
+                "post_capacity": max_posts,
+                "max_posts": max_posts,
+                "size": size,
+            }
+            for name, value in values.items():
+                packer, offset = _LAYOUT[name]
+                packer.pack_into(segment, offset, value)
+            segment[: len(MAGIC)] = MAGIC
+            segment.flush()
+
+    @staticmethod
+    def _heap_start(max_users: int, email_slots: int, post_capacity: int) -> int:
+        index_size = (max_users + 1) * 8
+        return _align(
+            HEADER_SIZE
+            + 2 * index_size
+            + email_slots * 16
+            + post_capacity * 8
+            + CHANGE_LOG_SIZE * 8
+        )
+
+    def _map_regions(self) -> None:
+        max_users = self._get("max_users")
+        email_slots = self._get("email_slots")
+        post_capacity = self._get("post_capacity")
+        view = memoryview(self._mmap)
+        users_at = HEADER_SIZE
+        emails_at = users_at + (max_users + 1) * 8
+        posts_at = emails_at + email_slots * 16
+        cutoffs_at = posts_at + post_capacity * 8
+        changes_at = cutoffs_at + (max_users + 1) * 8
+        heap_at = changes_at + CHANGE_LOG_SIZE * 8
+        self._regions = [(users_at, emails_at), (emails_at, posts_at)]
+        self._regions += [(posts_at, cutoffs_at), (cutoffs_at, changes_at)]
+        self._regions.append((changes_at, heap_at))
+        self._views = [view[start:end].cast("Q") for start, end in self._regions]
+        self._user_index, self._emails, self._ring = self._views[:3]
+        self._cutoffs, self._changes = self._views[3:]
+        view.release()
+        self._max_users = max_users
+        self._email_mask = email_slots - 1
+        self._post_capacity = post_capacity
+        self._heap_at = self._heap_start(max_users, email_slots, post_capacity)
+        self._size = self._get("size")
+
+    def _clear(self, region: int) -> None:
+        start, end = self._regions[region]
+        self._mmap[start:end] = bytes(end - start)
+
+    def _get(self, name: str) -> Any:
+        packer, offset = _LAYOUT[name]
+        return packer.unpack_from(self._mmap, offset)[0]
+
+    def _set(self, name: str, value: Any) -> None:
+        packer, offset = _LAYOUT[name]
+        packer.pack_into(self._mmap, offset, value)
+
+    # Concurrency -----------------------------------------------------------
+
+    def _seq(self) -> int:
+        return _SEQ.unpack_from(self._mmap, _SEQ_OFFSET)[0]
+
+    def _lock_file(self) -> int:
+        """Return a descriptor of the file opened by the calling process.
+
+        After a fork the inherited descriptor shares its lock with the
+        parent, so the child opens the file again, and replaces the thread
+        lock, which another thread of the parent may have held at the fork.
+        """
+
+        if self._pid != os.getpid():
+            with _reopen_lock:
+                if self._pid != os.getpid():
+                    fd = os.open(self.path, os.O_RDWR)
+                    os.close(self._fd)
+                    self._fd = fd
+                    self._lock = threading.Lock()
+                    self._pid = os.getpid()
+        return self._fd
+
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        fd = self._lock_file()
+        with self._lock:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                _SEQ.pack_into(self._mmap, _SEQ_OFFSET, self._seq() + 1)
+                try:
+                    yield
+                finally:
+                    _SEQ.pack_into(self._mmap, _SEQ_OFFSET, self._seq() + 1)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def _read(self, func: Callable[[], T]) -> T:
+        spins = 0
+        while True:
+            before = self._seq()
+            if not before & 1:
+                try:
+                    result = func()
+                except _TORN_ERRORS:
+                    result = _TORN
+                if result is not _TORN and self._seq() == before:
+                    return result
+            spins += 1
+            if spins % 10_000 == 0:
+                self._repair_abandoned_write()
+            time.sleep(0)
+
+    def _repair_abandoned_write(self) -> None:
+        # An odd counter with nobody holding the lock means a writer process
+        # died mid-write; readers would otherwise spin forever.
+        fd = self._lock_file()
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return
+            if self._seq() & 1:
+                _SEQ.pack_into(self._mmap, _SEQ_OFFSET, self._seq() + 1)
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            self._lock.release()
+
+    def _bump(self, collection: str, uid: int = 0) -> None:
+        counter = f"{collection}_counter"
+        value = self._get(counter) + 1
+        self._set(counter, value)
+        self._set(f"{collection}_modified", time.time())
+        if collection == "users":
+            self._changes[value % CHANGE_LOG_SIZE] = uid
+
+    # Records ---------------------------------------------------------------
+
+    def _text(self, start: int, length: int) -> str:
+        return str(self._mmap[start : start + length], "utf-8")
+
+    def _user_at(self, offset: int) -> UserRecord:
+        uid, created, name_len, email_len, hash_len = _USER.unpack_from(
+            self._mmap, offset
+        )
+        start = offset + _USER.size
+        name = self._text(start, name_len)
+        email = self._text(start + name_len, email_len)
+        password_hash = self._text(start + name_len + email_len, hash_len)
+        return UserRecord(uid, name, email, password_hash, created)
+
+    def _post_at(self, offset: int) -> PostRecord:
+        pid, created, author_len, content_len = _POST.unpack_from(self._mmap, offset)
+        start = offset + _POST.size
+        author = self._text(start, author_len)
+        content = self._text(start + author_len, content_len)
+        return PostRecord(pid, author, content, created)
+
+    def _record_size(self, offset: int, is_user: bool) -> int:
+        if is_user:
+            lengths = _USER.unpack_from(self._mmap, offset)[2:]
+            return _align(_USER.size + sum(lengths))
+        lengths = _POST.unpack_from(self._mmap, offset)[2:]
+        return _align(_POST.size + sum(lengths))
+
+    def _append(self, packer: struct.Struct, head: Tuple, *texts: str) -> int:
+        encoded = [text.encode() for text in texts]
+        size = _align(packer.size + sum(map(len, encoded)))
+        offset = self._get("heap_end")
+        if offset + size > self._size:
+            self._compact()
+            offset = self._get("heap_end")
+            if offset + size > self._size:
+                raise RuntimeError("shared store segment is full")
+        packer.pack_into(self._mmap, offset, *head, *map(len, encoded))
+        position = offset + packer.size
+        for data in encoded:
+            self._mmap[position : position + len(data)] = data
+            position += len(data)
+        self._set("heap_end", offset + size)
+        return offset
+
+    def _live_records(self) -> List[Tuple[int, int, bool]]:
+        """Return ``(offset, slot, is_user)`` of every reachable record."""
+
+        live = []
+        user_index, ring = self._user_index, self._ring
+        for uid in range(1, self._get("next_user_id")):
+            if user_index[uid]:
+                live.append((user_index[uid], uid, True))
+        capacity = self._post_capacity
+        for pid in range(self._get("post_first_id"), self._get("post_next_id")):
+            live.append((ring[pid % capacity], pid % capacity, False))
+        return live
+
+    def _compact(self) -> None:
+        """Slide live records to the start of the heap, in offset order."""
+
+        target = self._heap_at
+        for offset, slot, is_user in sorted(self._live_records()):
+            size = self._record_size(offset, is_user)
+            if offset != target:
+                self._mmap.move(target, offset, size)
+                if is_user:
+                    self._user_index[slot] = target
+                else:
+                    self._ring[slot] = target
+            target += size
+        self._set("heap_end", target)
+
+    # Email table -----------------------------------------------------------
+
+    def _find_email(self, key: str) -> Tuple[int, int]:
+        """Return ``(slot, uid)`` of *key*, or a free slot and 0 when absent."""
+
+        emails, mask = self._emails, self._email_mask
+        digest = _email_hash(key)
+        slot, free = digest & mask, -1
+        while True:
+            uid = emails[2 * slot + 1]
+            if uid == 0:
+                return (slot if free < 0 else free), 0
+            if uid == TOMBSTONE:
+                if free < 0:
+                    free = slot
+            elif emails[2 * slot] == digest:
+                email = self._user_at(self._user_index[uid]).email
+                if normalize_email(email) == key:
+                    return slot, uid
+            slot = (slot + 1) & mask
+
+    def _add_email(self, key: str, uid: int) -> None:
+        if (self._get("email_used") + 1) * 4 > (self._email_mask + 1) * 3:
+            self._rebuild_emails()
+        slot, _ = self._find_email(key)
+        if self._emails[2 * slot + 1] == 0:
+            self._set("email_used", self._get("email_used") + 1)
+        self._emails[2 * slot] = _email_hash(key)
+        self._emails[2 * slot + 1] = uid
+
+    def _drop_email(self, key: str) -> None:
+        slot, uid = self._find_email(key)
+        if uid:
+            self._emails[2 * slot + 1] = TOMBSTONE
+
+    def _rebuild_emails(self) -> None:
+        """Clear tombstones by reinserting the emails of live users."""
+
+        self._clear(1)
+        self._set("email_used", 0)
+        for uid in range(1, self._get("next_user_id")):
+            if self._user_index[uid]:
+                key = normalize_email(self._user_at(self._user_index[uid]).email)
+                self._add_email(key, uid)
+
+    # Users -----------------------------------------------------------------
+
+    def insert_user(
+        self, name: str, email: str, password_hash: str, created_at: int
+    ) -> Record:
+        key = normalize_email(email)
+        with self._writing():
+            if self._find_email(key)[1]:
+                raise ValueError("email_already_exists")
+            uid = self._get("next_user_id")
+            if uid > self._max_users:
+                raise RuntimeError("shared store has no room for more users")
+            offset = self._append(_USER, (uid, created_at), name, email, password_hash)
+            self._user_index[uid] = offset
+            self._set("next_user_id", uid + 1)
+            self._set("user_count", self._get("user_count") + 1)
+            self._add_email(key, uid)
+            self._bump("users", uid)
+        return UserRecord(uid, name, email, password_hash, created_at)
+
+    def _get_user(self, uid: int) -> Optional[UserRecord]:
+        if not 0 < uid <= self._max_users:
+            return None
+        offset = self._user_index[uid]
+        return self._user_at(offset) if offset else None
+
+    def get_user(self, uid: int) -> Optional[Record]:
+        return self._read(lambda: self._get_user(uid))
+
+    def get_user_by_email(self, email: str) -> Optional[Record]:
+        key = normalize_email(email)
+
+        def lookup() -> Optional[UserRecord]:
+            uid = self._find_email(key)[1]
+            return self._get_user(uid) if uid else None
+
+        return self._read(lookup)
+
+    def update_user(self, uid: int, changes: Dict[str, Any]) -> Optional[Record]:
+        with self._writing():
+            user = self._get_user(uid)
+            if user is None:
+                return None
+            updated = user.replace(changes)
+            old_key = normalize_email(user.email)
+            new_key = normalize_email(updated.email)
+            if new_key != old_key and self._find_email(new_key)[1]:
+                raise ValueError("email_already_exists")
+            self._user_index[uid] = self._append(
+                _USER,
+                (uid, updated.created),
+                updated.name,
+                updated.email,
+                updated.password_hash,
+            )
+            if new_key != old_key:
+                self._drop_email(old_key)
+                self._add_email(new_key, uid)
+            self._bump("users", uid)
+        return updated
+
+    def delete_user(self, uid: int) -> bool:
+        with self._writing():
+            user = self._get_user(uid)
+            if user is None:
+                return False
+            self._drop_email(normalize_email(user.email))
+            self._user_index[uid] = 0
+            self._set("user_count", self._get("user_count") - 1)
+            self._bump("users", uid)
+        return True
+
+    def list_users(self, after_id: Optional[int], limit: Optional[int]) -> Page:
+        if limit == 0:
+            return [], None
+
+        def scan() -> Page:
+            user_index = self._user_index
+            stop = self._get("next_user_id")
+            records: List[Record] = []
+            for uid in range(max(after_id or 0, 0) + 1, stop):
+                offset = user_index[uid]
+                if not offset:
+                    continue
+                if limit is not None and len(records) == limit:
+                    return records, records[-1]["id"]
+                records.append(self._user_at(offset))
+            return records, None
+
+        return self._read(scan)
+
+    # Posts -----------------------------------------------------------------
+
+    def insert_post(self, author: str, content: str, created_at: int) -> Record:
+        with self._writing():
+            pid = self._get("post_next_id")
+            self._ring[pid % self._post_capacity] = self._append(
+                _POST, (pid, created_at), author, content
+            )
+            self._set("post_next_id", pid + 1)
+            if pid + 1 - self._get("post_first_id") > self._get("max_posts"):
+                self._set("post_first_id", pid + 1 - self._get("max_posts"))
+            self._bump("posts")
+        return PostRecord(pid, author, content, created_at)
+
+    def list_posts(self, before_id: Optional[int], limit: Optional[int]) -> Page:
+        def scan() -> Page:
+            first, top = self._get("post_first_id"), self._get("post_next_id")
+            if before_id is not None:
+                top = min(before_id, top)
+            bottom = first if limit is None else max(first, top - limit)
+            ring, capacity = self._ring, self._post_capacity
+            posts = [
+                self._post_at(ring[pid % capacity])
+                for pid in range(top - 1, bottom - 1, -1)
+            ]
+            has_more = bool(posts) and posts[-1].id > first
+            return posts, posts[-1].id if has_more else None
+
+        return self._read(scan)
+
+    # Versions --------------------------------------------------------------
+
+    def version(self, collection: str) -> Version:
+        def read() -> Version:
+            epoch = self._get("epoch").rstrip(b"\0").decode()
+            return Version(
+                epoch,
+                self._get(f"{collection}_counter"),
+                self._get(f"{collection}_modified"),
+            )
+
+        return self._read(read)
+
+    def changed_users(self, since: int) -> Optional[List[int]]:
+        def read() -> Optional[List[int]]:
+            counter = self._get("users_counter")
+            if counter - since > CHANGE_LOG_SIZE:
+                return None
+            changes = self._changes
+            return [
+                changes[value % CHANGE_LOG_SIZE]
+                for value in range(since + 1, counter + 1)
+            ]
+
+        return self._read(read)
+
+    def count(self, collection: str) -> int:
+        if collection == "users":
+            return self._read(lambda: self._get("user_count"))
+        return self._read(
+            lambda: self._get("post_next_id") - self._get("post_first_id")
+        )
+
+    # Sessions --------------------------------------------------------------
+
+    def revoke_sessions(self, uid: Optional[int], cutoff: int) -> None:
+        with self._writing():
+            if uid is None:
+                cutoff = max(self._get("sessions_cutoff"), cutoff)
+                self._set("sessions_cutoff", cutoff)
+            elif 0 < uid <= self._max_users:
+                self._cutoffs[uid] = max(self._cutoffs[uid], cutoff)
+
+    def session_cutoff(self, uid: int) -> int:
+        def read() -> int:
+            cutoff = self._get("sessions_cutoff")
+            if 0 < uid <= self._max_users:
+                cutoff = max(cutoff, self._cutoffs[uid])
+            return cutoff or -1
+
+        return self._read(read)
+
+    # Lifecycle -------------------------------------------------------------
+
+    def reset(self) -> None:
+        with self._writing():
+            for region in range(len(self._regions)):
+                self._clear(region)
+            for name in ("next_user_id", "post_first_id", "post_next_id"):
+                self._set(name, 1)
+            self._set("user_count", 0)
+            self._set("email_used", 0)
+            self._set("heap_end", self._heap_at)
+            for collection in COLLECTIONS:
+                self._bump(collection)
+
+    def set_max_posts(self, max_posts: int) -> None:
+        if max_posts > self._post_capacity:
+            raise ValueError(
+                f"max_posts exceeds the segment's capacity of {self._post_capacity}"
+            )
+        with self._writing():
+            self.max_posts = max_posts
+            if max_posts == self._get("max_posts"):
+                return
+            self._set("max_posts", max_posts)
+            top = self._get("post_next_id")
+            if top - self._get("post_first_id") > max_posts:
+                self._set("post_first_id", top - max_posts)
+            self._bump("posts")
+
+    def close(self) -> None:
+        if self._fd < 0:
+            return
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._mmap.close()
+        os.close(self._fd)
+        self._fd = -1
+
+
+__all__ = ["SharedMemoryBackend"]
@@ -0,0 +1,366 @@
+"""SQLite storage backend running in WAL mode.
+
+Each thread gets its own connection, so concurrent requests never share a
+cursor; it is closed when the thread exits. WAL lets readers proceed while
+a writer commits, and because SQLite arbitrates the locking, several worker
+processes can point at the same database file. All statements are
+constant, parameterised SQL, so every connection's statement cache keeps
+them prepared.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from typing import Any, Dict, List, Optional
+
+from .base import (
+    CHANGE_LOG_SIZE,
+    COLLECTIONS,
+    Page,
+    Record,
+    StorageBackend,
+    Version,
+    normalize_email,
+)
+from .records import format_timestamp
+
+# SQLite's lower() only folds ASCII, so email uniqueness is enforced on a
+# key computed with normalize_email, like the in-memory email indexes.
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        email TEXT NOT NULL,
+        email_key TEXT NOT NULL UNIQUE,
+        password_hash TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS posts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        author TEXT NOT NULL,
+        content TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS collection_versions (
+        collection TEXT PRIMARY KEY,
+        epoch TEXT NOT NULL,
+        counter INTEGER NOT NULL,
+        modified REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_changes (
+        counter INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS session_cutoffs (
+        user_id INTEGER PRIMARY KEY,
+        cutoff INTEGER NOT NULL
+    )
+    """,
+)
+
+USER_COLUMNS = "id, name, email, password_hash, created_at"
+POST_COLUMNS = "id, author, content, created_at"
+
+SELECT_USER = f"SELECT {USER_COLUMNS} FROM users WHERE id = ?"
+SELECT_USER_BY_EMAIL = f"SELECT {USER_COLUMNS} FROM users WHERE email_key = ?"
+SELECT_USERS_AFTER = (
+    f"SELECT {USER_COLUMNS} FROM users WHERE id > ? ORDER BY id LIMIT ?"
+)
+INSERT_USER = (
+    "INSERT INTO users (name, email, password_hash, created_at, email_key)"
+    " VALUES (?, ?, ?, ?, ?)"
+)
+DELETE_USER = "DELETE FROM users WHERE id = ?"
+SELECT_POSTS_BEFORE = (
+    f"SELECT {POST_COLUMNS} FROM posts WHERE id < ? ORDER BY id DESC LIMIT ?"
+)
+INSERT_POST = "INSERT INTO posts (author, content, created_at) VALUES (?, ?, ?)"
+TRIM_POSTS = "DELETE FROM posts WHERE id <= ?"
+INIT_VERSION = (
+    "INSERT OR IGNORE INTO collection_versions (collection, epoch, counter, modified)"
+    " VALUES (?, ?, 0, ?)"
+)
+BUMP_VERSION = (
+    "UPDATE collection_versions SET counter = counter + 1, modified = ?"
+    " WHERE collection = ?"
+)
+SELECT_VERSION = (
+    "SELECT epoch, counter, modified FROM collection_versions WHERE collection = ?"
+)
+# Each users bump logs the id it wrote (0 for a reset) under the new counter.
+LOG_USER_CHANGE = (
+    "INSERT INTO user_changes (counter, user_id)"
+    " SELECT counter, ? FROM collection_versions WHERE collection = 'users'"
+)
+PRUNE_USER_CHANGES = (
+    "DELETE FROM user_changes WHERE counter <= "
+    "(SELECT counter FROM collection_versions WHERE collection = 'users') - ?"
+)
+SELECT_USER_CHANGES = (
+    "SELECT counter, user_id FROM user_changes WHERE counter > ? ORDER BY counter"
+)
+# User id 0 holds the cutoff that applies to every user.
+REVOKE_SESSIONS = (
+    "INSERT INTO session_cutoffs (user_id, cutoff) VALUES (?, ?)"
+    " ON CONFLICT (user_id) DO UPDATE SET cutoff = MAX(cutoff, excluded.cutoff)"
+)
+PRUNE_SESSION_CUTOFFS = (
+    "DELETE FROM session_cutoffs WHERE user_id != 0 AND cutoff <= ?"
+)
+SELECT_SESSION_CUTOFF = (
+    "SELECT MAX(cutoff) FROM session_cutoffs WHERE user_id IN (0, ?)"
+)
+COUNT_RECORDS = {
+    collection: f"SELECT COUNT(*) FROM {collection}" for collection in COLLECTIONS
+}
+UPDATABLE_USER_COLUMNS = ("name", "email", "email_key", "password_hash")
+
+_NO_LIMIT = -1
+_MAX_ID = 2**63 - 1
+
+
+class _ThreadConnection:
+    """A thread's connection, held through the backend's thread-local.
+
+    Connections cannot be weakly referenced, so the backend tracks these
+    holders instead; when the thread exits, the thread-local drops its
+    holder and a finalizer closes the connection.
+    """
+
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+
+class SQLiteBackend(StorageBackend):
+    """Users and wall posts persisted in a SQLite database file."""
+
+    name = "sqlite"
+    multiprocess = True
+
+    def __init__(self, path: str, max_posts: int, timeout: float = 5.0) -> None:
+        super().__init__(max_posts)
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections: "weakref.WeakSet[_ThreadConnection]" = weakref.WeakSet()
+        self._connections_lock = threading.Lock()
+        with self._transaction() as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+            epoch = uuid.uuid4().hex[:12]
+            for collection in COLLECTIONS:
+                conn.execute(INIT_VERSION, (collection, epoch, time.time()))
+
+    def _connection(self) -> sqlite3.Connection:
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,
+                check_same_thread=False,
+                cached_statements=64,
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            holder = self._local.holder = _ThreadConnection(conn)
+            weakref.finalize(holder, conn.close)
+            with self._connections_lock:
+                self._connections.add(holder)
+        return holder.conn
+
+    def _transaction(self) -> "_Transaction":
+        return _Transaction(self._connection())
+
+    @staticmethod
+    def _record(row: Optional[sqlite3.Row]) -> Optional[Record]:
+        return None if row is None else dict(row)
+
+    # Users -----------------------------------------------------------------
+
+    def insert_user(
+        self, name: str, email: str, password_hash: str, created_at: int
+    ) -> Record:
+        # Timestamps stay ISO text in the table so existing databases load.
+        created_at = format_timestamp(created_at)
+        try:
+            with self._transaction() as conn:
+                cursor = conn.execute(
+                    INSERT_USER,
+                    (name, email, password_hash, created_at, normalize_email(email)),
+                )
+                _bump(conn, "users", cursor.lastrowid)
+        except sqlite3.IntegrityError as exc:
+            raise ValueError("email_already_exists") from exc
+        return {
+            "id": cursor.lastrowid,
+            "name": name,
+            "email": email,
+            "password_hash": password_hash,
+            "created_at": created_at,
+        }
+
+    def get_user(self, uid: int) -> Optional[Record]:
+        row = self._connection().execute(SELECT_USER, (uid,)).fetchone()
+        return self._record(row)
+
+    def get_user_by_email(self, email: str) -> Optional[Record]:
+        key = normalize_email(email)
+        row = self._connection().execute(SELECT_USER_BY_EMAIL, (key,)).fetchone()
+        return self._record(row)
+
+    def update_user(self, uid: int, changes: Dict[str, Any]) -> Optional[Record]:
+        changes = dict(changes)
+        if "email" in changes:
+            changes["email_key"] = normalize_email(changes["email"])
+        columns = [name for name in UPDATABLE_USER_COLUMNS if name in changes]
+        try:
+            with self._transaction() as conn:
+                if columns:
+                    assignments = ", ".join(f"{name} = ?" for name in columns)
+                    updated = conn.execute(
+                        f"UPDATE users SET {assignments} WHERE id = ?",
+                        [changes[name] for name in columns] + [uid],
+                    )
+                    if updated.rowcount:
+                        _bump(conn, "users", uid)
+                return self._record(conn.execute(SELECT_USER, (uid,)).fetchone())
+        except sqlite3.IntegrityError as exc:
+            raise ValueError("email_already_exists") from exc
+
+    def delete_user(self, uid: int) -> bool:
+        with self._transaction() as conn:
+            deleted = conn.execute(DELETE_USER, (uid,)).rowcount > 0
+            if deleted:
+                _bump(conn, "users", uid)
+        return deleted
+
+    def list_users(self, after_id: Optional[int], limit: Optional[int]) -> Page:
+        fetch = _NO_LIMIT if limit is None else limit + 1
+        cursor = self._connection().execute(SELECT_USERS_AFTER, (after_id or 0, fetch))
+        return _page(cursor.fetchall(), limit)
+
+    # Posts -----------------------------------------------------------------
+
+    def insert_post(self, author: str, content: str, created_at: int) -> Record:
+        created_at = format_timestamp(created_at)
+        with self._transaction() as conn:
+            pid = conn.execute(INSERT_POST, (author, content, created_at)).lastrowid
+            conn.execute(TRIM_POSTS, (pid - self.max_posts,))
+            _bump(conn, "posts")
+        return {
+            "id": pid,
+            "author": author,
+            "content": content,
+            "created_at": created_at,
+        }
+
+    def list_posts(self, before_id: Optional[int], limit: Optional[int]) -> Page:
+        fetch = _NO_LIMIT if limit is None else limit + 1
+        top = _MAX_ID if before_id is None else before_id
+        cursor = self._connection().execute(SELECT_POSTS_BEFORE, (top, fetch))
+        return _page(cursor.fetchall(), limit)
+
+    # Versions --------------------------------------------------------------
+
+    def version(self, collection: str) -> Version:
+        row = self._connection().execute(SELECT_VERSION, (collection,)).fetchone()
+        return Version(*row)
+
+    def changed_users(self, since: int) -> Optional[List[int]]:
+        rows = self._connection().execute(SELECT_USER_CHANGES, (since,)).fetchall()
+        if rows and rows[0][0] != since + 1:
+            return None
+        return [uid for _, uid in rows]
+
+    def count(self, collection: str) -> int:
+        return self._connection().execute(COUNT_RECORDS[collection]).fetchone()[0]
+
+    # Sessions --------------------------------------------------------------
+
+    def revoke_sessions(self, uid: Optional[int], cutoff: int) -> None:
+        with self._transaction() as conn:
+            conn.execute(REVOKE_SESSIONS, (uid or 0, cutoff))
+            if uid is None:
+                conn.execute(PRUNE_SESSION_CUTOFFS, (cutoff,))
+
+    def session_cutoff(self, uid: int) -> int:
+        row = self._connection().execute(SELECT_SESSION_CUTOFF, (uid,)).fetchone()
+        return -1 if row[0] is None else row[0]
+
+    # Lifecycle -------------------------------------------------------------
+
+    def reset(self) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM users")
+            conn.execute("DELETE FROM posts")
+            conn.execute("DELETE FROM sqlite_sequence")
+            for collection in COLLECTIONS:
+                _bump(conn, collection)
+
+    def set_max_posts(self, max_posts: int) -> None:
+        super().set_max_posts(max_posts)
+        with self._transaction() as conn:
+            trimmed = conn.execute(
+                "DELETE FROM posts WHERE id <= (SELECT MAX(id) FROM posts) - ?",
+                (max_posts,),
+            )
+            if trimmed.rowcount:
+                _bump(conn, "posts")
+
+    def close(self) -> None:
+        with self._connections_lock:
+            holders = list(self._connections)
+            self._connections.clear()
+        for holder in holders:
+            holder.conn.close()
+        self._local = threading.local()
+
+
+class _Transaction:
+    """Run the enclosed statements in one ``BEGIN IMMEDIATE`` transaction."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def _bump(conn: sqlite3.Connection, collection: str, uid: int = 0) -> None:
+    conn.execute(BUMP_VERSION, (time.time(), collection))
+    if collection == "users":
+        conn.execute(LOG_USER_CHANGE, (uid,))
+        conn.execute(PRUNE_USER_CHANGES, (CHANGE_LOG_SIZE,))
+
+
+def _page(rows: List[sqlite3.Row], limit: Optional[int]) -> Page:
+    records = [dict(row) for row in rows]
+    if limit is not None and len(records) > limit:
+        del records[limit:]
+        return records, records[-1]["id"]
+    return records, None
+
+
+__all__ = ["SQLiteBackend"]
@@ -1,70 +1,671 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
 
-from werkzeug.security import check_password_hash, generate_password_hash
+from .caching import response_cache
+from .events import post_publisher
+from .hashing import (
+    HashingBusyError,
+    hash_password,
+    hash_password_async,
+    hash_passwords,
+    password_needs_rehash,
+    verify_password,
+    verify_password_async,
+)
+from .metrics import timed
+from .profiling import run_in_thread
+from .search import PostIndex, UserPrefixIndex
+from .storage import (
+    DEFAULT_MAX_POSTS,
+    MemoryBackend,
+    StorageBackend,
+    create_backend,
+    normalize_email,
+)
+from .storage.base import Record, Version
+from .tokens import session_tokens
 
-USERS: Dict[int, Dict[str, Any]] = {}
-NEXT_ID: int = 1
-POSTS: List[Dict[str, Any]] = []
-NEXT_POST_ID: int = 1
+PUBLIC_USER_FIELDS = ("id", "name", "email", "created_at")
+POST_FIELDS = ("id", "author", "content", "created_at")
+
+T = TypeVar("T")
+# Records read per backend call when catching up with other processes.
+SYNC_PAGE_SIZE = 1000
+
+
+def _public_user(
+    user: Mapping[str, Any], fields: Optional[Iterable[str]] = None
+) -> Dict[str, Any]:
+    if fields is None:
+        return {k: v for k, v in user.items() if k != "password_hash"}
+    return {k: user[k] for k in fields}
+
+
+class Store:
+    """Users and wall posts on top of a pluggable :class:`StorageBackend`.
+
+    The store hashes passwords, validates post content and builds public
+    views; the backend only persists records and enforces email uniqueness.
+    Hashing runs before the backend is touched, so no backend lock is held
+    for the duration of PBKDF2.
+
+    The search and prefix indexes live in this process. With a
+    :attr:`~StorageBackend.multiprocess` backend, other processes write too:
+    the store remembers the collection version each index reflects and,
+    before a search, catches up on writes it did not make itself: posts by
+    id, users from the backend's change log. Only when the log no longer
+    reaches back far enough is an index rebuilt, off the locks that writes
+    and searches take. The post stream and session cutoffs are kept in
+    step through the backend as well (see :meth:`_follow_posts` and
+    :meth:`TokenManager.share_cutoffs`).
+    """
+
+    def __init__(
+        self,
+        backend: Optional[StorageBackend] = None,
+        *,
+        max_posts: int = DEFAULT_MAX_POSTS,
+    ) -> None:
+        self.backend = backend if backend is not None else MemoryBackend(max_posts)
+        self.search_index = PostIndex(self.backend.max_posts)
+        self.user_index = UserPrefixIndex()
+        # Collection -> version its index reflects, to spot foreign writes.
+        self._indexed: Dict[str, Version] = {}
+        # Every post up to this id is in the search index.
+        self._indexed_post_id = 0
+        self._sync_lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+        self._followed: Optional[Version] = None
+        self._published_id = 0
+        self._rebuild_indexes()
+
+    def _rebuild_indexes(self) -> None:
+        self._reindex_users()
+        self._reindex_posts()
+
+    def _all_users(self) -> Iterator[Record]:
+        # Pages keep each backend read short: on the shared backend a read
+        # retries whenever another process writes during it.
+        after: Optional[int] = None
+        while True:
+            users, after = self.backend.list_users(after, SYNC_PAGE_SIZE)
+            yield from users
+            if after is None:
+                return
+
+    def _reindex_users(self) -> None:
+        # Read the version first: a write landing during the rebuild then
+        # leaves it behind, and the next sync applies it from the change log.
+        version = self.backend.version("users")
+        self.user_index.rebuild(self._all_users())
+        with self._sync_lock:
+            self._indexed["users"] = version
+
+    def _reindex_posts(self) -> None:
+        version = self.backend.version("posts")
+        posts, _ = self.backend.list_posts(None, self.backend.max_posts)
+        self.search_index.rebuild(reversed(posts))
+        with self._sync_lock:
+            self._indexed["posts"] = version
+            self._indexed_post_id = posts[0]["id"] if posts else 0
+
+    def _rebuild(self, reindex: Callable[[], None]) -> None:
+        # One rebuild at a time; other searches use the current index.
+        if self._rebuild_lock.acquire(blocking=False):
+            try:
+                reindex()
+            finally:
+                self._rebuild_lock.release()
+
+    def _sync_index(self, collection: str) -> None:
+        """Catch the index of *collection* up with other processes' writes."""
+
+        if not self.backend.multiprocess:
+            return
+        version = self.backend.version(collection)
+        indexed = self._indexed.get(collection)
+        if version == indexed:
+            return
+        if indexed is None or indexed.epoch != version.epoch:
+            self._rebuild(
+                self._reindex_users if collection == "users" else self._reindex_posts
+            )
+        elif collection == "users":
+            self._sync_users(indexed, version)
+        else:
+            self._sync_posts(indexed, version)
+
+    def _sync_users(self, indexed: Version, version: Version) -> None:
+        changed = self.backend.changed_users(indexed.counter)
+        if changed is None or 0 in changed:  # log overrun, or a reset
+            self._rebuild(self._reindex_users)
+            return
+        with self._sync_lock:
+            for uid in dict.fromkeys(changed):
+                user = self.backend.get_user(uid)
+                if user is None:
+                    self.user_index.remove(uid)
+                else:
+                    self.user_index.put(user)
+            if self._indexed.get("users") == indexed:
+                self._indexed["users"] = version
+
+    def _sync_posts(self, indexed: Version, version: Version) -> None:
+        known = self._indexed_post_id
+        page, cursor = self.backend.list_posts(None, SYNC_PAGE_SIZE)
+        if (page[0]["id"] if page else 0) < known:  # ids restarted after a reset
+            self._rebuild(self._reindex_posts)
+            return
+        newer: List[Record] = []
+        while True:
+            newer += [post for post in page if post["id"] > known]
+            if cursor is None or cursor <= known + 1:
+                break
+            if len(newer) >= self.search_index.capacity:
+                break
+            page, cursor = self.backend.list_posts(cursor, SYNC_PAGE_SIZE)
+        with self._sync_lock:
+            for post in reversed(newer):
+                self.search_index.add(post)
+            if newer and self._indexed_post_id == known:
+                self._indexed_post_id = newer[0]["id"]
+            if self._indexed.get("posts") == indexed:
+                self._indexed["posts"] = version
+
+    def _write(self, collection: str, func: Callable[..., T], *args: Any) -> T:
+        """Call the backend mutation *func*, tracking the version it produces.
+
+        With a multiprocess backend, local writes are serialised so that a
+        counter one past the indexed version can only be this write's; any
+        other change leaves the index behind for :meth:`_sync_index`. A
+        falsy result means nothing was written.
+        """
+
+        if not self.backend.multiprocess:
+            return func(*args)
+        with self._sync_lock:
+            before = self.backend.version(collection)
+            result = func(*args)
+            if result and self._indexed.get(collection) == before:
+                after = self.backend.version(collection)
+                if after[:2] == (before.epoch, before.counter + 1):
+                    self._indexed[collection] = after
+                    if collection == "posts":
+                        self._indexed_post_id = result["id"]
+        return result
+
+    def _follow_posts(self, publish: bool = True) -> None:
+        """Publish posts added since the last call, by any process.
+
+        Multiprocess backends publish through here rather than straight from
+        :meth:`create_post`, so local and foreign posts go out in id order.
+        With *publish* false the cursor only catches up.
+        """
+
+        with self._publish_lock:
+            version = self.backend.version("posts")
+            if version == self._followed:
+                return
+            self._followed = version
+            posts, _ = self.backend.list_posts(None, post_publisher.queue_size)
+            if not posts or posts[0]["id"] < self._published_id:
+                self._published_id = 0  # ids restarted after a reset
+            newer = [post for post in posts if post["id"] > self._published_id]
+            if newer:
+                self._published_id = newer[0]["id"]
+            if publish:
+                for post in reversed(newer):
+                    post_publisher.publish(post)
+
+    def use_backend(self, backend: StorageBackend) -> StorageBackend:
+        """Switch to *backend*, reindex its records and return the previous one."""
+
+        previous, self.backend = self.backend, backend
+        self.search_index.resize(backend.max_posts)
+        self._indexed.clear()
+        self._rebuild_indexes()
+        if backend.multiprocess:
+            self._followed = None
+            self._follow_posts(publish=False)
+        session_tokens.share_cutoffs(backend if backend.multiprocess else None)
+        post_publisher.follow(self._follow_posts if backend.multiprocess else None)
+        response_cache.invalidate("users")
+        response_cache.invalidate("posts")
+        return previous
+
+    def set_max_posts(self, max_posts: int) -> None:
+        self.backend.set_max_posts(max_posts)
+        self.search_index.resize(max_posts)
+
+    def reset(self) -> None:
+        with self._sync_lock:
+            self.backend.reset()
+            self.search_index.rebuild(())
+            self.user_index.rebuild(())
+            self._indexed.clear()
+            self._indexed_post_id = 0
+        self._published_id = 0
+        # Ids start over, so tokens of the old users must not carry over.
+        session_tokens.revoke_all()
+        response_cache.invalidate("users")
+        response_cache.invalidate("posts")
+
+    # Users -----------------------------------------------------------------
+
+    @timed("store.create_user")
+    def create_user(self, name: str, email: str, password: str) -> Dict[str, Any]:
+        self._reject_registered(email)
+        return self._insert_user(name, email, hash_password(password))
+
+    @timed("store.create_user")
+    async def create_user_async(
+        self, name: str, email: str, password: str
+    ) -> Dict[str, Any]:
+        """Like :meth:`create_user`, awaiting the hash instead of blocking.
+
+        Backend calls run on a worker thread too: a SQLite write may wait on
+        the database lock for up to its busy timeout.
+        """
+
+        await run_in_thread(self._reject_registered, email)
+        password_hash = await hash_password_async(password)
+        return await run_in_thread(self._insert_user, name, email, password_hash)
+
+    def _reject_registered(self, email: str) -> None:
+        # Cheap optimistic check so duplicates are rejected before hashing.
+        if self.backend.get_user_by_email(email) is not None:
+            raise ValueError("email_already_exists")
+
+    def _insert_user(self, name: str, email: str, password_hash: str) -> Dict[str, Any]:
+        user = self._write(
+            "users",
+            self.backend.insert_user,
+            name,
+            email,
+            password_hash,
+            int(time.time()),
+        )
+        self.user_index.put(user)
+        response_cache.invalidate("users")
+        return _public_user(user)
+
+    @timed("store.create_users")
+    def create_users(
+        self, entries: Sequence[Mapping[str, str]]
+    ) -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+        """Create one user per entry, hashing all passwords in parallel.
+
+        Returns a ``(user, error)`` pair per entry, in order. Entries whose
+        email is already registered, or repeated earlier in *entries*, fail
+        with ``"email_already_exists"`` before their password is hashed.
+        """
+
+        results: List[Tuple[Optional[Dict[str, Any]], Optional[str]]] = [
+            (None, "email_already_exists")
+        ] * len(entries)
+        seen = set()
+        pending = []
+        for index, entry in enumerate(entries):
+            key = normalize_email(entry["email"])
+            if key in seen or self.backend.get_user_by_email(entry["email"]):
+                continue
+            seen.add(key)
+            pending.append(index)
+        hashes = hash_passwords([entries[index]["password"] for index in pending])
+        created_at = int(time.time())
+        for index, password_hash in zip(pending, hashes):
+            entry = entries[index]
+            try:
+                user = self._write(
+                    "users",
+                    self.backend.insert_user,
+                    entry["name"],
+                    entry["email"],
+                    password_hash,
+                    created_at,
+                )
+            except ValueError as exc:
+                results[index] = (None, str(exc))
+            else:
+                self.user_index.put(user)
+                results[index] = (_public_user(user), None)
+        if pending:
+            response_cache.invalidate("users")
+        return results
+
+    @timed("store.list_users_page")
+    def list_users_page(
+        self,
+        *,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        users, next_cursor = self.backend.list_users(after_id, limit)
+        return [_public_user(user, fields) for user in users], next_cursor
+
+    @timed("store.list_user_records")
+    def list_user_records(
+        self, *, after_id: Optional[int] = None, limit: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        return self.backend.list_users(after_id, limit)
+
+    @timed("store.search_users")
+    def search_user_records(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        self._sync_index("users")
+        records = map(self.backend.get_user, self.user_index.search(prefix, limit))
+        # An id deleted between the index lookup and the read is skipped.
+        return [record for record in records if record is not None]
+
+    @timed("store.get_user")
+    def get_user(self, uid: int) -> Optional[Dict[str, Any]]:
+        user = self.backend.get_user(uid)
+        return None if not user else _public_user(user)
+
+    @timed("store.find_user_by_email")
+    def find_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        return self.backend.get_user_by_email(email)
+
+    @timed("store.authenticate_user")
+    def authenticate_user(self, email: str, password: str) -> Optional[Dict[str, Any]]:
+        user = self.backend.get_user_by_email(email)
+        if not user:
+            return None
+        if not verify_password(user["password_hash"], password):
+            return None
+        if password_needs_rehash(user["password_hash"]):
+            try:
+                self._replace_hash(user, hash_password(password))
+            except HashingBusyError:
+                pass  # Keep the old hash; the next login tries again.
+        return _public_user(user)
+
+    @timed("store.authenticate_user")
+    async def authenticate_user_async(
+        self, email: str, password: str
+    ) -> Optional[Dict[str, Any]]:
+        user = await run_in_thread(self.backend.get_user_by_email, email)
+        if not user:
+            return None
+        if not await verify_password_async(user["password_hash"], password):
+            return None
+        if password_needs_rehash(user["password_hash"]):
+            try:
+                password_hash = await hash_password_async(password)
+                await run_in_thread(self._replace_hash, user, password_hash)
+            except HashingBusyError:
+                pass  # Keep the old hash; the next login tries again.
+        return _public_user(user)
+
+    @timed("store.rehash_password")
+    def _replace_hash(self, user: Mapping[str, Any], password_hash: str) -> None:
+        """Store *password_hash*, made with the current parameters, for *user*.
+
+        The password itself is unchanged, so sessions are not revoked. A
+        password changed since *user* was read wins over the rehash.
+        """
+
+        current = self.backend.get_user(user["id"])
+        if current is not None and current["password_hash"] == user["password_hash"]:
+            self._write(
+                "users",
+                self.backend.update_user,
+                user["id"],
+                {"password_hash": password_hash},
+            )
+
+    @timed("store.update_user")
+    def update_user(
+        self,
+        uid: int,
+        *,
+        name: str | None = None,
+        email: str | None = None,
+        password: str | None = None,
+    ) -> Optional[Dict[str, Any]]:
+        if self.backend.get_user(uid) is None:
+            return None
+        password_hash = hash_password(password) if password else None
+        return self._apply_update(uid, name, email, password_hash)
+
+    @timed("store.update_user")
+    async def update_user_async(
+        self,
+        uid: int,
+        *,
+        name: str | None = None,
+        email: str | None = None,
+        password: str | None = None,
+    ) -> Optional[Dict[str, Any]]:
+        if await run_in_thread(self.backend.get_user, uid) is None:
+            return None
+        password_hash = await hash_password_async(password) if password else None
+        return await run_in_thread(
+            self._apply_update, uid, name, email, password_hash
+        )
+
+    def _apply_update(
+        self,
+        uid: int,
+        name: Optional[str],
+        email: Optional[str],
+        password_hash: Optional[str],
+    ) -> Optional[Dict[str, Any]]:
+        changes: Dict[str, Any] = {}
+        if name:
+            changes["name"] = name
+        if email:
+            changes["email"] = email
+        if password_hash:
+            changes["password_hash"] = password_hash
+        user = self._write("users", self.backend.update_user, uid, changes)
+        if user and ("name" in changes or "email" in changes):
+            self.user_index.put(user)
+        if user and "password_hash" in changes:
+            session_tokens.revoke_user(uid)
+        response_cache.invalidate("users")
+        return None if not user else _public_user(user)
+
+    @timed("store.delete_user")
+    def delete_user(self, uid: int) -> bool:
+        deleted = self._write("users", self.backend.delete_user, uid)
+        if deleted:
+            self.user_index.remove(uid)
+            session_tokens.revoke_user(uid)
+            response_cache.invalidate("users")
+        return deleted
+
+    # Posts -----------------------------------------------------------------
+
+    @timed("store.create_post")
+    def create_post(self, content: str, author: Optional[str]) -> Dict[str, Any]:
+        text = (content or "").strip()
+        if not text:
+            raise ValueError("invalid_content")
+        if len(text) > 500:
+            raise ValueError("invalid_content")
+        author = (author or "").strip() or "Anónimo"
+        post = self._write(
+            "posts", self.backend.insert_post, author, text, int(time.time())
+        )
+        self.search_index.add(post)
+        response_cache.invalidate("posts")
+        if self.backend.multiprocess:
+            self._follow_posts()
+        else:
+            post_publisher.publish(post)
+        return post
+
+    @timed("store.list_posts_page")
+    def list_posts_page(
+        self, *, before_id: Optional[int] = None, limit: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        return self.backend.list_posts(before_id, limit)
+
+    @timed("store.search_posts")
+    def search_posts(
+        self, query: str, *, offset: int = 0, limit: int = 20
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        self._sync_index("posts")
+        return self.search_index.search(query, offset, limit)
+
+    @timed("store.list_posts_since")
+    def list_posts_since(
+        self, after_id: int, limit: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Return posts with ``id > after_id`` oldest first.
+
+        ``None`` means more than *limit* posts are newer than *after_id*, so
+        the caller cannot catch up incrementally and should reload instead.
+        """
+
+        posts, _ = self.backend.list_posts(None, limit + 1)
+        newer = [post for post in posts if post["id"] > after_id]
+        if len(newer) > limit:
+            return None
+        newer.reverse()
+        return newer
+
+    def collection_version(self, collection: str) -> Version:
+        return self.backend.version(collection)
+
+    def collection_size(self, collection: str) -> int:
+        return self.backend.count(collection)
+
+
+_store = Store()
+_backend_settings: Tuple[Any, ...] = ("memory", None)
+
+
+def get_store() -> Store:
+    """Return the process-wide store used by the module-level helpers."""
+
+    return _store
 
 
 def reset_store() -> None:
-    global USERS, NEXT_ID, POSTS, NEXT_POST_ID
-    USERS = {}
-    NEXT_ID = 1
-    POSTS = []
-    NEXT_POST_ID = 1
+    _store.reset()
+
+
+def configure_store(config: Mapping[str, Any]) -> None:
+    """Select and configure the storage backend from *config*.
 
+    ``STORE_BACKEND`` picks the implementation (``memory``, optionally
+    journaled to ``STORE_JOURNAL_DIR``, ``sqlite`` with ``SQLITE_PATH`` or
+    ``shared`` with ``SHARED_STORE_PATH``) and ``WALL_MAX_POSTS`` bounds the
+    wall. The current backend is kept when those settings have not changed.
+    """
 
-def _public_user(user: Dict[str, Any]) -> Dict[str, Any]:
-    return {k: v for k, v in user.items() if k != "password_hash"}
+    global _backend_settings
+    kind = config.get("STORE_BACKEND", "memory")
+    if kind == "sqlite":
+        settings: Tuple[Any, ...] = (kind, config.get("SQLITE_PATH"))
+    elif kind == "shared":
+        settings = (kind, config.get("SHARED_STORE_PATH"))
+    else:
+        settings = (kind, config.get("STORE_JOURNAL_DIR") or None)
+    if settings != _backend_settings:
+        _store.use_backend(create_backend(config)).close()
+        _backend_settings = settings
+    else:
+        _store.set_max_posts(int(config.get("WALL_MAX_POSTS", DEFAULT_MAX_POSTS)))
 
 
 def create_user(name: str, email: str, password: str) -> Dict[str, Any]:
-    global NEXT_ID, USERS
-    for existing in USERS.values():
-        if existing["email"].lower() == email.lower():
-            raise ValueError("email_already_exists")
-    uid = NEXT_ID
-    NEXT_ID += 1
-    user = {
-        "id": uid,
-        "name": name,
-        "email": email,
-        "password_hash": generate_password_hash(password),
-        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
-    }
-    USERS[uid] = user
-    return _public_user(user)
+    return _store.create_user(name, email, password)
+
+
+async def create_user_async(name: str, email: str, password: str) -> Dict[str, Any]:
+    return await _store.create_user_async(name, email, password)
+
+
+def create_users(
+    entries: Sequence[Mapping[str, str]]
+) -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    return _store.create_users(entries)
+
+
+def list_users(
+    *,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Iterable[str]] = None,
+) -> list[Dict[str, Any]]:
+    return list_users_page(after_id=after_id, limit=limit, fields=fields)[0]
+
+
+def list_users_page(
+    *,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    fields: Optional[Iterable[str]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """Return up to *limit* users with ``id > after_id`` and the next cursor.
+
+    Users are ordered by id. The cursor is the id of the last returned user
+    when more users follow, otherwise ``None``. Only the requested slice of
+    ids is visited, so the cost is bounded by *limit* rather than the size
+    of the registry.
+    """
+
+    return _store.list_users_page(after_id=after_id, limit=limit, fields=fields)
+
+
+def list_user_records(
+    *, after_id: Optional[int] = None, limit: Optional[int] = None
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """Like :func:`list_users_page` but return the stored records unchanged.
+
+    Stored records include ``password_hash``; callers must project them onto
+    :data:`PUBLIC_USER_FIELDS` before exposing them.
+    """
+
+    return _store.list_user_records(after_id=after_id, limit=limit)
 
 
-def list_users() -> list[Dict[str, Any]]:
-    return [_public_user(user) for user in USERS.values()]
+def search_user_records(prefix: str, limit: int) -> List[Dict[str, Any]]:
+    """Return up to *limit* stored users whose name or email starts with *prefix*.
+
+    Matching ignores case and accents and also applies to each word of the
+    name. Like :func:`list_user_records`, the records include
+    ``password_hash`` and must be projected before being exposed.
+    """
+
+    return _store.search_user_records(prefix, limit)
 
 
 def get_user(uid: int):
-    user = USERS.get(uid)
-    return None if not user else _public_user(user)
+    return _store.get_user(uid)
 
 
 def _find_user_by_email(email: str) -> Optional[Dict[str, Any]]:
-    lowered = email.lower()
-    for user in USERS.values():
-        if user["email"].lower() == lowered:
-            return user
-    return None
+    return _store.find_user_by_email(email)
 
 
 def authenticate_user(email: str, password: str) -> Optional[Dict[str, Any]]:
-    user = _find_user_by_email(email)
-    if not user:
-        return None
-    if not check_password_hash(user["password_hash"], password):
-        return None
-    return _public_user(user)
+    return _store.authenticate_user(email, password)
+
+
+async def authenticate_user_async(
+    email: str, password: str
+) -> Optional[Dict[str, Any]]:
+    return await _store.authenticate_user_async(email, password)
 
 
 def update_user(
@@ -74,63 +675,97 @@ def update_user(
     email: str | None = None,
     password: str | None = None,
 ):
-    user = USERS.get(uid)
-    if not user:
-        return None
-    if email and any(
-        other["email"].lower() == email.lower() and other_id != uid
-        for other_id, other in USERS.items()
-    ):
-        raise ValueError("email_already_exists")
-    if name:
-        user["name"] = name
-    if email:
-        user["email"] = email
-    if password:
-        user["password_hash"] = generate_password_hash(password)
-    return _public_user(user)
+    return _store.update_user(uid, name=name, email=email, password=password)
+
+
+async def update_user_async(
+    uid: int,
+    *,
+    name: str | None = None,
+    email: str | None = None,
+    password: str | None = None,
+):
+    return await _store.update_user_async(
+        uid, name=name, email=email, password=password
+    )
 
 
 def delete_user(uid: int) -> bool:
-    return USERS.pop(uid, None) is not None
+    return _store.delete_user(uid)
 
 
 def create_post(content: str, author: Optional[str]) -> Dict[str, Any]:
-    global NEXT_POST_ID, POSTS
-    text = (content or "").strip()
-    if not text:
-        raise ValueError("invalid_content")
-    if len(text) > 500:
-        raise ValueError("invalid_content")
-    post = {
-        "id": NEXT_POST_ID,
-        "author": (author or "").strip() or "Anónimo",
-        "content": text,
-        "created_at": datetime.now(timezone.utc)
-        .isoformat(timespec="seconds")
-        .replace("+00:00", "Z"),
-    }
-    NEXT_POST_ID += 1
-    POSTS.append(post)
-    return post
-
-
-def list_posts() -> List[Dict[str, Any]]:
-    return list(reversed(POSTS))
+    return _store.create_post(content, author)
+
+
+def list_posts(
+    *, before_id: Optional[int] = None, limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    return list_posts_page(before_id=before_id, limit=limit)[0]
+
+
+def list_posts_page(
+    *, before_id: Optional[int] = None, limit: Optional[int] = None
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """Return up to *limit* posts older than *before_id*, newest first.
+
+    The second element is the cursor for the next (older) page, or ``None``
+    when the oldest retained post has been returned.
+    """
+
+    return _store.list_posts_page(before_id=before_id, limit=limit)
+
+
+def search_posts(
+    query: str, *, offset: int = 0, limit: int = 20
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """Return wall posts matching every word of *query*, best match first.
+
+    Matching ignores case and accents. Only retained posts are searchable;
+    the second element is the offset of the next page, or ``None``.
+    """
+
+    return _store.search_posts(query, offset=offset, limit=limit)
+
+
+def list_posts_since(after_id: int, limit: int) -> Optional[List[Dict[str, Any]]]:
+    return _store.list_posts_since(after_id, limit)
+
+
+def collection_version(collection: str) -> Version:
+    """Return the change marker of ``users`` or ``posts``.
+
+    Every mutation of a collection bumps its counter, so an unchanged
+    version guarantees unchanged listings.
+    """
+
+    return _store.collection_version(collection)
 
 
 __all__ = [
+    "collection_version",
     "create_user",
+    "create_user_async",
+    "create_users",
     "delete_user",
+    "get_store",
     "get_user",
+    "list_user_records",
     "list_users",
+    "list_users_page",
     "reset_store",
+    "search_user_records",
     "update_user",
+    "update_user_async",
     "authenticate_user",
+    "authenticate_user_async",
+    "configure_store",
     "create_post",
     "list_posts",
-    "USERS",
-    "NEXT_ID",
-    "POSTS",
-    "NEXT_POST_ID",
+    "list_posts_page",
+    "list_posts_since",
+    "search_posts",
+    "POST_FIELDS",
+    "PUBLIC_USER_FIELDS",
+    "Store",
 ]
@@ -0,0 +1,251 @@
+"""Signed, short-lived session tokens for the API.
+
+``POST /api/auth/login`` answers with a token signed with ``SECRET_KEY``
+(itsdangerous, HMAC-SHA1 over ``[user id, issued-at ms]``); clients send it
+back as ``Authorization: Bearer <token>`` instead of their password. Views
+decorated with :func:`require_auth` resolve the token to a user id.
+
+Checking a signature is cheap but not free, so recently verified tokens are
+kept in a bounded LRU and a repeated token costs one dict lookup. Both
+paths consult the revocation cutoffs: deleting a user or changing their
+password records "tokens issued before now are invalid" for that id, and
+resetting the store does the same for every id. Cutoffs older than the
+token lifetime can no longer reject anything and are pruned as new ones
+are added. Caches and cutoffs are per process; when the storage backend is
+shared by several processes, cutoffs are also written to and checked
+against it (see :meth:`TokenManager.share_cutoffs`), so a revocation in one
+worker applies in all of them.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Mapping, Optional, Protocol, Tuple
+
+from flask import Flask, current_app, g, jsonify, request
+from itsdangerous import BadSignature, URLSafeSerializer
+
+SALT = "auth-token"
+
+
+class InvalidTokenError(ValueError):
+    """Raised for tokens that are malformed, forged, expired or revoked."""
+
+
+class CutoffStore(Protocol):
+    """Revocation cutoffs kept where every process can see them."""
+
+    def revoke_sessions(self, uid: Optional[int], cutoff: int) -> None:
+        ...
+
+    def session_cutoff(self, uid: int) -> int:
+        ...
+
+
+class TokenManager:
+    """Issue and verify session tokens, remembering recent verifications."""
+
+    def __init__(
+        self,
+        secret_key: str = "change-me",
+        max_age: float = 3600,
+        cache_size: int = 10_000,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._verified: "OrderedDict[str, Tuple[int, int]]" = OrderedDict()
+        self._revoked: Dict[int, int] = {}
+        self._revoked_all = -1
+        self._shared: Optional[CutoffStore] = None
+        self.configure(secret_key, max_age, cache_size)
+
+    def configure(self, secret_key: str, max_age: float, cache_size: int) -> None:
+        with self._lock:
+            self._serializer = URLSafeSerializer(secret_key, salt=SALT)
+            self.max_age = max_age
+            self.cache_size = cache_size
+            self._verified.clear()
+
+    def share_cutoffs(self, store: Optional[CutoffStore]) -> None:
+        """Also record cutoffs in *store* and honour those found there.
+
+        Pass ``None`` to go back to cutoffs of this process only.
+        """
+
+        with self._lock:
+            self._shared = store
+            self._verified.clear()
+
+    @property
+    def shares_cutoffs(self) -> bool:
+        """Whether checks read cutoffs from a store shared across processes."""
+
+        return self._shared is not None
+
+    def _now_ms(self) -> int:
+        return int(self._clock() * 1000)
+
+    def _cutoff(self, uid: int) -> int:
+        cutoff = max(self._revoked_all, self._revoked.get(uid, -1))
+        shared = self._shared
+        if shared is not None:
+            cutoff = max(cutoff, shared.session_cutoff(uid))
+        return cutoff
+
+    def issue(self, uid: int) -> str:
+        # Never stamp a token at or before a cutoff recorded in the same ms.
+        cutoff = self._cutoff(uid)
+        issued = max(self._now_ms(), cutoff + 1)
+        return self._serializer.dumps([uid, issued])
+
+    def verify(self, token: str) -> int:
+        """Return the user id *token* was issued for.
+
+        Raises :class:`InvalidTokenError` when it cannot be trusted.
+        """
+
+        now = self._now_ms()
+        with self._lock:
+            entry = self._verified.get(token)
+            if entry is not None:
+                self._verified.move_to_end(token)
+        if entry is None:
+            try:
+                uid, issued = self._serializer.loads(token)
+            except (BadSignature, TypeError, ValueError) as exc:
+                raise InvalidTokenError("invalid_token") from exc
+            entry = (uid, issued)
+            with self._lock:
+                self._verified[token] = entry
+                while len(self._verified) > self.cache_size:
+                    self._verified.popitem(last=False)
+        uid, issued = entry
+        if now - issued > self.max_age * 1000 or self._is_revoked(uid, issued):
+            with self._lock:
+                self._verified.pop(token, None)
+            raise InvalidTokenError("invalid_token")
+        return uid
+
+    def _is_revoked(self, uid: int, issued: int) -> bool:
+        return issued <= self._cutoff(uid)
+
+    def revoke_user(self, uid: int) -> None:
+        """Invalidate every token issued so far for *uid*."""
+
+        now = self._now_ms()
+        with self._lock:
+            self._revoked.pop(uid, None)
+            self._revoked[uid] = now
+            horizon = now - self.max_age * 1000
+            while self._revoked:
+                oldest = next(iter(self._revoked))
+                if self._revoked[oldest] >= horizon:
+                    break
+                del self._revoked[oldest]
+            shared = self._shared
+        if shared is not None:
+            shared.revoke_sessions(uid, now)
+
+    def revoke_all(self) -> None:
+        """Invalidate every token issued so far, for every user."""
+
+        now = self._now_ms()
+        with self._lock:
+            self._revoked_all = now
+            self._revoked.clear()
+            self._verified.clear()
+            shared = self._shared
+        if shared is not None:
+            shared.revoke_sessions(None, now)
+
+
+session_tokens = TokenManager()
+
+
+def parse_bearer(header: Optional[str]) -> Optional[str]:
+    """Return the token of an ``Authorization: Bearer`` *header*, if any."""
+
+    scheme, _, token = (header or "").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return token.strip()
+
+
+def _bearer_token() -> Optional[str]:
+    return parse_bearer(request.headers.get("Authorization"))
+
+
+def _unauthorized(error: str):
+    response = jsonify({"error": error})
+    response.headers["WWW-Authenticate"] = "Bearer"
+    return response, 401
+
+
+def require_auth(
+    *, owner: Optional[str] = None, optional: bool = False, required: bool = False
+) -> Callable:
+    """Resolve the bearer token of the request into ``g.auth_user_id``.
+
+    A token that fails verification is always answered with ``401``. A
+    missing token is accepted (``g.auth_user_id`` is ``None``) when
+    *optional* is set or ``AUTH_REQUIRED`` is off, unless *required* is set.
+    With *owner*, the view argument of that name must match the
+    authenticated id, else ``403``.
+    """
+
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(*args: Any, **kwargs: Any):
+            token = _bearer_token()
+            g.auth_user_id = None
+            if token is not None:
+                try:
+                    g.auth_user_id = session_tokens.verify(token)
+                except InvalidTokenError:
+                    return _unauthorized("invalid_token")
+            elif not optional and (
+                required or current_app.config.get("AUTH_REQUIRED", False)
+            ):
+                return _unauthorized("authentication_required")
+            if (
+                owner is not None
+                and g.auth_user_id is not None
+                and kwargs.get(owner) != g.auth_user_id
+            ):
+                return jsonify({"error": "forbidden"}), 403
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def configure_tokens(config: Mapping[str, Any]) -> TokenManager:
+    """Apply ``SECRET_KEY``, ``AUTH_TOKEN_MAX_AGE`` and ``AUTH_TOKEN_CACHE_SIZE``."""
+
+    session_tokens.configure(
+        config["SECRET_KEY"],
+        float(config.get("AUTH_TOKEN_MAX_AGE", 3600)),
+        int(config.get("AUTH_TOKEN_CACHE_SIZE", 10_000)),
+    )
+    return session_tokens
+
+
+def init_app(app: Flask) -> None:
+    configure_tokens(app.config)
+
+
+__all__ = [
+    "CutoffStore",
+    "InvalidTokenError",
+    "TokenManager",
+    "configure_tokens",
+    "init_app",
+    "parse_bearer",
+    "require_auth",
+    "session_tokens",
+]
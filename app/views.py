@@ -0,0 +1,77 @@
+"""View logic shared by the Flask blueprints and the ASGI views.
+
+The blueprints in :mod:`app.routes` and :class:`app.asgi.AsyncAPI` serve the
+same routes and differ only in how they wait for the store. What a route
+reads from the request body and how it answers the store's result live here,
+so both servers respond alike. Results are ``(payload, status)`` pairs of a
+JSON response.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from marshmallow import ValidationError
+
+Result = Tuple[Dict[str, Any], int]
+
+NOT_FOUND: Result = ({"error": "not_found"}, 404)
+
+
+def login_credentials(payload: Any) -> Optional[Tuple[str, str]]:
+    """Return ``(email, password)`` from a login body, ``None`` if incomplete."""
+
+    payload = payload if isinstance(payload, dict) else {}
+    email = (payload.get("email") or "").strip()
+    password = payload.get("password") or ""
+    if not email or not password:
+        return None
+    return email, password
+
+
+def login_result(user: Dict[str, Any], token: str, config: Mapping) -> Result:
+    expires_in = int(config.get("AUTH_TOKEN_MAX_AGE", 3600))
+    return {**user, "token": token, "expires_in": expires_in}, 200
+
+
+def user_result(user: Optional[Dict[str, Any]], status: int = 200) -> Result:
+    return NOT_FOUND if not user else (user, status)
+
+
+def user_write_error(exc: Exception) -> Result:
+    """Answer a failed user create or update; other errors are re-raised."""
+
+    if isinstance(exc, ValidationError):
+        return {"error": "validation_error", "details": exc.messages}, 400
+    if isinstance(exc, ValueError) and str(exc) == "email_already_exists":
+        return {"error": "email_already_exists"}, 409
+    raise exc
+
+
+def post_author(header: Optional[str], user: Optional[Mapping]) -> Optional[str]:
+    """Return the author of a new post.
+
+    A signed-in author cannot be impersonated through the ``X-Author`` header.
+    """
+
+    return header if user is None else user["name"]
+
+
+def post_error(exc: ValueError) -> Result:
+    """Answer a rejected post; other errors are re-raised."""
+
+    if str(exc) == "invalid_content":
+        return {"error": "invalid_content"}, 400
+    raise exc
+
+
+__all__ = [
+    "NOT_FOUND",
+    "Result",
+    "login_credentials",
+    "login_result",
+    "post_author",
+    "post_error",
+    "user_result",
+    "user_write_error",
+]
@@ -0,0 +1 @@
+"""Standalone performance benchmarks for the user registry service."""
@@ -0,0 +1,171 @@
+"""Compare the sync Flask app with the ASGI app under a mixed workload.
+
+Run with ``python -m benchmarks.bench_asgi [clients]``. Both apps are driven
+in process, without sockets: ``clients`` concurrent clients each send a
+sequence of requests, one in ten a login (a full-cost PBKDF2 check), one in
+ten a wall post and the rest user lookups. The sync app runs on a pool of
+``SERVER_THREADS`` threads, like a threaded WSGI server; the ASGI app runs
+every request as a task on one event loop. Latency is measured from the
+moment a client sends a request, so it includes queueing for a thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from werkzeug.test import EnvironBuilder
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import hashing  # noqa: E402
+from app.asgi import create_asgi_app  # noqa: E402
+from app.store import create_user, reset_store  # noqa: E402
+
+DEFAULT_CLIENTS = 64
+REQUESTS_PER_CLIENT = 40
+SERVER_THREADS = 8
+USERS = 50
+HASH_METHOD = "pbkdf2:sha256:200000"
+
+Request = Tuple[str, str, str, object]
+Timings = Dict[str, List[float]]
+
+
+def workload(client: int) -> List[Request]:
+    requests: List[Request] = []
+    for n in range(REQUESTS_PER_CLIENT):
+        uid = (client + n) % USERS + 1
+        if n % 10 == 0:
+            body = {"email": f"user{uid}@example.com", "password": "Secret123"}
+            requests.append(("login", "POST", "/api/auth/login", body))
+        elif n % 10 == 5:
+            body = {"content": f"post {client}-{n}"}
+            requests.append(("post", "POST", "/api/wall/posts", body))
+        else:
+            requests.append(("read", "GET", f"/api/users/{uid}", None))
+    return requests
+
+
+def seed() -> None:
+    reset_store()
+    for n in range(1, USERS + 1):
+        create_user(f"User {n}", f"user{n}@example.com", "Secret123")
+
+
+def run_sync(app, clients: int) -> Tuple[float, Timings]:
+    server = ThreadPoolExecutor(max_workers=SERVER_THREADS)
+    timings: Timings = {"login": [], "post": [], "read": []}
+    lock = threading.Lock()
+
+    def handle(method: str, path: str, body: object) -> int:
+        environ = EnvironBuilder(method=method, path=path, json=body).get_environ()
+        status = []
+        result = app(environ, lambda s, h, e=None: status.append(s))
+        b"".join(result)
+        getattr(result, "close", lambda: None)()
+        return int(status[0].split()[0])
+
+    def client(index: int) -> None:
+        for kind, method, path, body in workload(index):
+            started = time.perf_counter()
+            server.submit(handle, method, path, body).result()
+            with lock:
+                timings[kind].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    return elapsed, timings
+
+
+async def _asgi_request(app, method: str, path: str, body: object) -> int:
+    data = json.dumps(body).encode() if body is not None else b""
+    headers = [(b"content-type", b"application/json")] if body is not None else []
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "query_string": b"",
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 5000),
+        "server": ("bench", 80),
+    }
+    messages = [{"type": "http.request", "body": data, "more_body": False}]
+    status = []
+
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+async def _run_async(app, clients: int) -> Tuple[float, Timings]:
+    timings: Timings = {"login": [], "post": [], "read": []}
+
+    async def client(index: int) -> None:
+        for kind, method, path, body in workload(index):
+            started = time.perf_counter()
+            await _asgi_request(app, method, path, body)
+            timings[kind].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    return time.perf_counter() - started, timings
+
+
+def _percentile(samples: List[float], q: int) -> float:
+    return statistics.quantiles(samples, n=100)[q - 1] * 1000 if samples else 0.0
+
+
+def report(name: str, elapsed: float, timings: Timings) -> None:
+    total = sum(map(len, timings.values()))
+    print(
+        f"{name:>6} {total / elapsed:>9.0f}"
+        f" {_percentile(timings['read'], 50):>9.1f}"
+        f" {_percentile(timings['read'], 99):>9.1f}"
+        f" {_percentile(timings['login'], 50):>9.1f}"
+        f" {_percentile(timings['login'], 99):>9.1f}"
+    )
+
+
+def main(argv: List[str]) -> None:
+    clients = int(argv[0]) if argv else DEFAULT_CLIENTS
+    asgi_app = create_asgi_app()
+    asgi_app.config.update(RATE_LIMIT_ENABLED=False, METRICS_ENABLED=False)
+    hashing.configure_hashing(
+        {"PASSWORD_HASH_METHOD": HASH_METHOD, "HASH_QUEUE_DEPTH": 10_000}
+    )
+    seed()
+
+    print(f"{clients} clients x {REQUESTS_PER_CLIENT} requests")
+    print(
+        f"{'app':>6} {'req/s':>9} {'read p50':>9} {'read p99':>9}"
+        f" {'login p50':>9} {'login p99':>9}  (ms)"
+    )
+    report("sync", *run_sync(asgi_app.flask_app, clients))
+    report("asgi", *asyncio.run(_run_async(asgi_app, clients)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,79 @@
+"""Measure email lookup cost for registration and login as the registry grows.
+
+Run with ``python -m benchmarks.bench_email_index [sizes...]``. The registry is
+populated directly (bypassing PBKDF2) so the timings isolate the duplicate
+check done by ``create_user`` and the lookup done by ``authenticate_user``.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import store  # noqa: E402
+from app.storage import UserRecord  # noqa: E402
+from benchmarks.common import CREATED, PLACEHOLDER_HASH  # noqa: E402
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+ROUNDS = 2_000
+
+
+def populate(size: int) -> None:
+    store.reset_store()
+    backend = store.get_store().backend
+    for uid in range(1, size + 1):
+        backend.users[uid] = UserRecord(
+            uid, f"User {uid}", f"User{uid}@Example.com", PLACEHOLDER_HASH, CREATED
+        )
+    backend.rebuild_user_indexes()
+
+
+def time_per_call(func, rounds: int = ROUNDS) -> float:
+    start = time.perf_counter()
+    for i in range(rounds):
+        func(i)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def bench(size: int) -> dict[str, float]:
+    populate(size)
+    step = max(size // ROUNDS, 1)
+
+    def duplicate_registration(i: int) -> None:
+        try:
+            store.create_user("Dup", f"user{(i * step) % size + 1}@example.COM", "x")
+        except ValueError:
+            pass
+
+    def login_hit(i: int) -> None:
+        store._find_user_by_email(f"USER{(i * step) % size + 1}@example.com")
+
+    def login_miss(i: int) -> None:
+        store.authenticate_user(f"missing{i}@example.com", "x")
+
+    return {
+        "duplicate_registration_us": time_per_call(duplicate_registration),
+        "login_lookup_hit_us": time_per_call(login_hit),
+        "login_lookup_miss_us": time_per_call(login_miss),
+    }
+
+
+def main(argv: list[str]) -> None:
+    sizes = [int(arg) for arg in argv] or list(DEFAULT_SIZES)
+    print(f"{'users':>10} {'dup check':>12} {'login hit':>12} {'login miss':>12}")
+    for size in sizes:
+        result = bench(size)
+        print(
+            f"{size:>10} "
+            f"{result['duplicate_registration_us']:>10.2f}us "
+            f"{result['login_lookup_hit_us']:>10.2f}us "
+            f"{result['login_lookup_miss_us']:>10.2f}us"
+        )
+    store.reset_store()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,76 @@
+"""Measure journal write overhead and recovery time for the memory backend.
+
+Run with ``python -m benchmarks.bench_journal [records]`` (default 1,000,000
+users and as many posts). The benchmark reports insert throughput with and
+without the journal, the cost of a compacted snapshot, and how long startup
+takes to replay a snapshot plus a journal tail of 10% of the records.
+"""
+
+from __future__ import annotations
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.storage import JournaledMemoryBackend, MemoryBackend  # noqa: E402
+from benchmarks.common import CREATED, PLACEHOLDER_HASH  # noqa: E402
+
+DEFAULT_RECORDS = 1_000_000
+
+
+def fill(backend, start: int, stop: int) -> float:
+    began = time.perf_counter()
+    for n in range(start, stop):
+        backend.insert_user(
+            f"User {n}", f"user{n}@example.com", PLACEHOLDER_HASH, CREATED
+        )
+        backend.insert_post(f"User {n}", f"Mensaje número {n}", CREATED)
+    return time.perf_counter() - began
+
+
+def directory_size(path: Path) -> int:
+    return sum(item.stat().st_size for item in path.iterdir())
+
+
+def main(argv: list[str]) -> None:
+    records = int(argv[0]) if argv else DEFAULT_RECORDS
+    tail = records // 10
+
+    plain = fill(MemoryBackend(max_posts=records), 0, records)
+    print(f"memory only     : {2 * records / plain:>12,.0f} writes/s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        backend = JournaledMemoryBackend(
+            tmp, max_posts=records, snapshot_every=records * 10
+        )
+        journaled = fill(backend, 0, records - tail)
+        started = time.perf_counter()
+        backend.snapshot()
+        snapshot = time.perf_counter() - started
+        journaled += fill(backend, records - tail, records)
+        backend.close()
+        print(
+            f"journaled       : {2 * records / journaled:>12,.0f} writes/s "
+            f"({journaled / plain - 1:+.0%} overhead)"
+        )
+        print(f"snapshot        : {snapshot:>12.2f} s")
+        print(f"on-disk size    : {directory_size(directory) / 1e6:>12.1f} MB")
+
+        started = time.perf_counter()
+        recovered = JournaledMemoryBackend(tmp, max_posts=records)
+        recovery = time.perf_counter() - started
+        users = len(recovered.users)
+        posts = len(recovered.posts)
+        recovered.close()
+        print(
+            f"recovery        : {recovery:>12.2f} s "
+            f"({users:,} users, {posts:,} posts)"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
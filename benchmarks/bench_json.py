@@ -0,0 +1,51 @@
+"""Compare listing throughput with the JSON fast path on and off.
+
+Run with ``python -m benchmarks.bench_json [seconds]``. The app is driven
+in-process through ``test_client`` with the response cache disabled, so each
+request pays for reading and serializing a full page of users or posts.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+
+from app import create_app
+from app.store import reset_store
+from benchmarks.common import seed_posts, seed_users
+
+ENDPOINTS = ("/api/users?limit=100", "/api/wall/posts?limit=100")
+
+
+def requests_per_second(client, path: str, seconds: float) -> float:
+    count = 0
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    while time.perf_counter() < deadline:
+        client.get(path)
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def main(argv: list[str]) -> None:
+    seconds = float(argv[0]) if argv else 3.0
+    results = {}
+    for fast in (False, True):
+        app = create_app(testing=True)
+        app.config["RESPONSE_CACHE_ENABLED"] = False
+        app.json.fast_path = fast
+        reset_store()
+        seed_users(1_000)
+        seed_posts(1_000)
+        client = app.test_client()
+        for path in ENDPOINTS:
+            results[(path, fast)] = requests_per_second(client, path, seconds)
+
+    print(f"{'endpoint':<28} {'stdlib req/s':>14} {'fast req/s':>12} {'speedup':>8}")
+    for path in ENDPOINTS:
+        slow, fast = results[(path, False)], results[(path, True)]
+        print(f"{path:<28} {slow:>14.0f} {fast:>12.0f} {fast / slow:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
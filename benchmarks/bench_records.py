@@ -0,0 +1,106 @@
+"""Measure memory held per stored user and post, dicts versus slotted records.
+
+Run with ``python -m benchmarks.bench_records [count]`` (default 100000).
+"Before" rebuilds the layout the memory backend used to keep: one ``dict``
+per record with a freshly formatted ISO ``created_at`` string, as the store
+produced on every insert. "After" inserts the same data through
+:class:`~app.storage.MemoryBackend`, which keeps :class:`UserRecord` and
+:class:`PostRecord` instances with integer timestamps. Sizes come from
+``tracemalloc`` and include the names, emails and contents themselves and,
+for users, the id list and email index the backend keeps alongside.
+"""
+
+from __future__ import annotations
+
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, List, Tuple
+
+from app.storage import MemoryBackend
+from benchmarks.common import CREATED, PLACEHOLDER_HASH
+
+DEFAULT_COUNT = 100_000
+
+
+def _iso(seconds: int) -> str:
+    moment = datetime.fromtimestamp(seconds, timezone.utc)
+    return moment.isoformat(timespec="seconds").replace("+00:00", "Z")
+
+
+def measure(build: Callable[[], object], count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del kept
+    return used / count
+
+
+def dict_users(count: int) -> Tuple[dict, List[int], dict]:
+    users = {
+        n: {
+            "id": n,
+            "name": f"User {n}",
+            "email": f"user{n}@example.com",
+            "password_hash": PLACEHOLDER_HASH,
+            "created_at": _iso(CREATED + n % 60),
+        }
+        for n in range(1, count + 1)
+    }
+    email_index = {user["email"].casefold(): n for n, user in users.items()}
+    return users, list(users), email_index
+
+
+def dict_posts(count: int) -> List[dict]:
+    return [
+        {
+            "id": n,
+            "author": f"User {n}",
+            "content": f"Mensaje número {n} del muro",
+            "created_at": _iso(CREATED + n % 60),
+        }
+        for n in range(1, count + 1)
+    ]
+
+
+def record_users(count: int) -> MemoryBackend:
+    backend = MemoryBackend(1)
+    for n in range(1, count + 1):
+        backend.insert_user(
+            f"User {n}", f"user{n}@example.com", PLACEHOLDER_HASH, CREATED + n % 60
+        )
+    return backend
+
+
+def record_posts(count: int) -> MemoryBackend:
+    backend = MemoryBackend(count)
+    for n in range(1, count + 1):
+        backend.insert_post(f"User {n}", f"Mensaje número {n} del muro", CREATED)
+    return backend
+
+
+def main(argv: List[str]) -> None:
+    count = int(argv[0]) if argv else DEFAULT_COUNT
+    started = time.perf_counter()
+    rows = [
+        ("user", measure(lambda: dict_users(count), count)),
+        ("user", measure(lambda: record_users(count), count)),
+        ("post", measure(lambda: dict_posts(count), count)),
+        ("post", measure(lambda: record_posts(count), count)),
+    ]
+    print(f"records: {count}")
+    print(f"{'kind':>6} {'dict B':>10} {'record B':>10} {'saved':>8}")
+    for (kind, before), (_, after) in zip(rows[::2], rows[1::2]):
+        saved = 1 - after / before
+        print(f"{kind:>6} {before:10.0f} {after:10.0f} {saved:8.0%}")
+    print(f"elapsed: {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
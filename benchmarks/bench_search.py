@@ -0,0 +1,61 @@
+"""Compare wall search through the inverted index with a linear scan.
+
+Run with ``python -m benchmarks.bench_search [posts]``. The scan folds and
+tokenizes every retained post per query, which is what a filter over the
+wall would cost without the index.
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import time
+
+from app.search import PostIndex, tokenize
+
+WORDS = (
+    "examen práctica unidad flask python muro comentario mañana tarea grupo "
+    "profesor proyecto entrega código servidor prueba canción niño anónimo"
+).split()
+QUERIES = ("python", "examen flask", "anonimo", "cancion nino", "entrega")
+
+
+def make_posts(count: int):
+    rng = random.Random(7)
+    for n in range(1, count + 1):
+        content = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 30)))
+        yield {"id": n, "author": "Anónimo", "content": content}
+
+
+def scan(posts, query: str, limit: int):
+    terms = set(tokenize(query))
+    hits = [p for p in posts if terms <= set(tokenize(f"{p['author']} {p['content']}"))]
+    return hits[:limit]
+
+
+def per_query_ms(search, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for query in QUERIES:
+            search(query)
+    return (time.perf_counter() - started) / (rounds * len(QUERIES)) * 1000
+
+
+def main(argv: list[str]) -> None:
+    count = int(argv[0]) if argv else 10_000
+    posts = list(make_posts(count))
+    index = PostIndex(count)
+    started = time.perf_counter()
+    for post in posts:
+        index.add(post)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    indexed = per_query_ms(lambda q: index.search(q, 0, 50), 20)
+    scanned = per_query_ms(lambda q: scan(posts, q, 50), 1)
+    print(f"posts: {count}  index build: {build_ms:.0f} ms")
+    print(f"linear scan: {scanned:8.2f} ms/query")
+    print(f"index:       {indexed:8.2f} ms/query  ({scanned / indexed:.0f}x)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,93 @@
+"""Report read throughput of the shared-memory store as workers are added.
+
+Run with ``python -m benchmarks.bench_shared_store [workers...]``. One
+segment is seeded with users and posts; then each run forks that many
+processes, which map the same segment and loop over email lookups, id
+lookups and wall pages for a fixed time. Reads take no lock, so on a
+machine with enough cores the total should grow close to linearly with the
+worker count (it cannot on a single core, where workers only time-share).
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.storage import SharedMemoryBackend  # noqa: E402
+from benchmarks.common import CREATED, PLACEHOLDER_HASH  # noqa: E402
+
+DEFAULT_WORKERS = (1, 2, 4, 8)
+USERS = 100_000
+POSTS = 10_000
+SECONDS = 2.0
+
+
+def _segment_dir() -> str:
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+def seed(path: str) -> None:
+    backend = SharedMemoryBackend(path, POSTS, max_users=USERS)
+    backend.reset()
+    for n in range(USERS):
+        backend.insert_user(
+            f"User {n}", f"user{n}@example.com", PLACEHOLDER_HASH, CREATED
+        )
+    for n in range(POSTS):
+        backend.insert_post(f"User {n}", f"Mensaje número {n} del muro", CREATED)
+    backend.close()
+
+
+def _reader(path: str, start: float, results) -> None:
+    backend = SharedMemoryBackend(path, POSTS, max_users=USERS)
+    while time.time() < start:
+        time.sleep(0.001)
+    deadline = time.perf_counter() + SECONDS
+    ops = 0
+    while time.perf_counter() < deadline:
+        n = ops % USERS
+        backend.get_user_by_email(f"USER{n}@example.com")
+        backend.get_user(n + 1)
+        backend.list_posts(None, 20)
+        ops += 3
+    backend.close()
+    results.put(ops)
+
+
+def run(path: str, workers: int) -> float:
+    results = multiprocessing.Queue()
+    start = time.time() + 0.2
+    processes = [
+        multiprocessing.Process(target=_reader, args=(path, start, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    total = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    return total / SECONDS
+
+
+def main(argv: list[str]) -> None:
+    counts = [int(arg) for arg in argv] or list(DEFAULT_WORKERS)
+    path = os.path.join(_segment_dir(), f"bench-shared-{os.getpid()}")
+    try:
+        seed(path)
+        print(f"cores: {os.cpu_count()}")
+        print(f"{'workers':>8} {'reads/s':>12} {'per worker':>12}")
+        for count in counts:
+            rate = run(path, count)
+            print(f"{count:>8} {rate:>12.0f} {rate / count:>12.0f}")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,71 @@
+"""Report store throughput under contention as the thread count grows.
+
+Run with ``python -m benchmarks.bench_store_concurrency [threads...]``. Each
+thread performs a mix of registrations, lookups, page reads and wall posts
+against one shared :class:`app.store.Store`; the run fails loudly if any
+duplicate id or email is observed afterwards.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import hashing  # noqa: E402
+from app.store import Store  # noqa: E402
+
+DEFAULT_THREADS = (1, 2, 4, 8, 16)
+OPS_PER_THREAD = 2_000
+
+
+def run(thread_count: int) -> float:
+    store = Store()
+    barrier = threading.Barrier(thread_count + 1)
+
+    def worker(index: int) -> None:
+        barrier.wait()
+        for n in range(OPS_PER_THREAD):
+            op = n % 4
+            if op == 0:
+                try:
+                    store.create_user("Bench", f"u{n % 500}@example.com", "Secret123")
+                except ValueError:
+                    pass
+            elif op == 1:
+                store.find_user_by_email(f"U{n % 500}@example.com")
+            elif op == 2:
+                store.list_users_page(after_id=n % 100, limit=20)
+            else:
+                store.create_post(f"post {n}", f"t{index}")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(thread_count)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    users, _ = store.list_users_page()
+    emails = [user["email"].lower() for user in users]
+    ids = [user["id"] for user in users]
+    if len(set(emails)) != len(emails) or len(set(ids)) != len(ids):
+        raise SystemExit(f"duplicate users detected with {thread_count} threads")
+    return thread_count * OPS_PER_THREAD / elapsed
+
+
+def main(argv: list[str]) -> None:
+    hashing.configure_hashing({"PASSWORD_HASH_METHOD": "pbkdf2:sha256:1"})
+    counts = [int(arg) for arg in argv] or list(DEFAULT_THREADS)
+    print(f"{'threads':>8} {'ops/s':>12}")
+    for count in counts:
+        print(f"{count:>8} {run(count):>12.0f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,51 @@
+"""Measure user prefix search latency on a large registry.
+
+Run with ``python -m benchmarks.bench_user_search [users]`` (default one
+million). Users are indexed directly, without PBKDF2 or a backend, so the
+numbers isolate the index: one bulk build, then lookups of top-10 matches
+for prefixes of varying selectivity, then single-user updates.
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import time
+
+from app.search import UserPrefixIndex
+
+FIRST = "Ana José María Mario Lucía Carlos Sofía Diego Valentina Andrés".split()
+LAST = "López García Martínez Rodríguez Pérez Sánchez Ramírez Torres Flores".split()
+PREFIXES = ("a", "an", "mar", "lucia", "gar", "user12345", "zz")
+
+
+def make_users(count: int):
+    rng = random.Random(3)
+    for uid in range(1, count + 1):
+        name = f"{rng.choice(FIRST)} {rng.choice(LAST)} {rng.choice(LAST)}"
+        yield {"id": uid, "name": name, "email": f"user{uid}@example.com"}
+
+
+def main(argv: list[str]) -> None:
+    count = int(argv[0]) if argv else 1_000_000
+    index = UserPrefixIndex()
+    started = time.perf_counter()
+    index.rebuild(make_users(count))
+    print(f"users: {count}  build: {time.perf_counter() - started:.1f} s")
+
+    rounds = 2_000
+    for prefix in PREFIXES:
+        started = time.perf_counter()
+        for _ in range(rounds):
+            hits = index.search(prefix, 10)
+        elapsed = (time.perf_counter() - started) / rounds * 1e6
+        print(f"search {prefix!r:<12} {len(hits):>3} hits  {elapsed:8.1f} µs")
+
+    started = time.perf_counter()
+    for uid in range(1, 201):
+        index.put({"id": uid, "name": "Renamed Person", "email": f"r{uid}@example.com"})
+    print(f"update: {(time.perf_counter() - started) / 200 * 1e6:.1f} µs per user")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
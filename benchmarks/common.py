@@ -0,0 +1,31 @@
+"""Helpers shared by the benchmark scripts."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.store import get_store  # noqa: E402
+
+CREATED = 1704067200  # 2024-01-01T00:00:00Z
+PLACEHOLDER_HASH = "pbkdf2:sha256:1$salt$0"
+
+
+def seed_users(count: int) -> None:
+    """Insert *count* users straight into the backend, skipping PBKDF2."""
+
+    backend = get_store().backend
+    for n in range(count):
+        backend.insert_user(
+            f"User {n}", f"user{n}@example.com", PLACEHOLDER_HASH, CREATED
+        )
+
+
+def seed_posts(count: int) -> None:
+    """Append *count* wall posts straight into the backend."""
+
+    backend = get_store().backend
+    for n in range(count):
+        backend.insert_post(f"User {n}", f"Mensaje número {n} del muro", CREATED)
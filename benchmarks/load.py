@@ -0,0 +1,319 @@
+"""Load test every API blueprint and the page routes.
+
+Run with ``python -m benchmarks.load`` (or ``make bench``). Each endpoint is
+driven twice:
+
+* ``inprocess``: sequential requests through Flask's ``test_client``, which
+  measures the cost of the application code alone;
+* ``server``: a threaded Werkzeug WSGI server on a local port hammered by
+  ``--concurrency`` client threads over real HTTP.
+
+Latency percentiles (p50/p95/p99) and throughput are printed per endpoint and
+saved as JSON under ``benchmarks/results/``. Pass ``--compare <file>`` to
+print the change against an earlier run, e.g. one taken on another commit.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import logging
+import platform
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from http.client import HTTPConnection
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from werkzeug.serving import make_server
+
+from app import create_app
+from app.store import create_user, reset_store
+from benchmarks.common import seed_posts, seed_users
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+MODES = ("inprocess", "server")
+PASSWORD = "secreto123"
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    name: str
+    method: str
+    path: str
+    # Called with a unique sequence number; returns the JSON body to send.
+    body: Optional[Callable[[int], Dict[str, Any]]] = None
+    headers: Optional[Dict[str, str]] = None
+
+
+ENDPOINTS = (
+    Endpoint("health", "GET", "/api/health"),
+    Endpoint("users.list", "GET", "/api/users?limit=100"),
+    Endpoint("users.get", "GET", "/api/users/1"),
+    Endpoint(
+        "users.create",
+        "POST",
+        "/api/users",
+        lambda n: {
+            "name": "Bench",
+            "email": f"bench{n}@example.com",
+            "password": PASSWORD,
+        },
+    ),
+    Endpoint("users.update", "PUT", "/api/users/1", lambda n: {"name": f"Renamed {n}"}),
+    Endpoint(
+        "auth.login",
+        "POST",
+        "/api/auth/login",
+        lambda n: {"email": "login@example.com", "password": PASSWORD},
+    ),
+    Endpoint("wall.list", "GET", "/api/wall/posts?limit=50"),
+    Endpoint(
+        "wall.create",
+        "POST",
+        "/api/wall/posts",
+        lambda n: {"content": f"Mensaje de carga {n}"},
+        {"X-Author": "bench"},
+    ),
+    Endpoint("pages.index", "GET", "/"),
+    Endpoint("pages.users", "GET", "/users"),
+    Endpoint("pages.muro", "GET", "/muro"),
+)
+
+
+@dataclass
+class Result:
+    mode: str
+    endpoint: str
+    requests: int
+    errors: int
+    seconds: float
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(
+    mode: str, endpoint: Endpoint, latencies: List[float], errors: int, seconds: float
+) -> Result:
+    ordered = sorted(latencies)
+    return Result(
+        mode=mode,
+        endpoint=endpoint.name,
+        requests=len(ordered),
+        errors=errors,
+        seconds=round(seconds, 4),
+        rps=round(len(ordered) / seconds, 1),
+        p50_ms=round(percentile(ordered, 0.50) * 1000, 3),
+        p95_ms=round(percentile(ordered, 0.95) * 1000, 3),
+        p99_ms=round(percentile(ordered, 0.99) * 1000, 3),
+        max_ms=round(ordered[-1] * 1000, 3),
+    )
+
+
+def prepare(app, users: int, posts: int) -> None:
+    """Reset the store and load the benchmark dataset."""
+
+    with app.app_context():
+        reset_store()
+        create_user("Login", "login@example.com", PASSWORD)
+        seed_users(users)
+        seed_posts(posts)
+
+
+def run_inprocess(app, endpoint: Endpoint, count: int, sequence) -> Result:
+    client = app.test_client()
+    latencies: List[float] = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(count):
+        body = endpoint.body(next(sequence)) if endpoint.body else None
+        t0 = time.perf_counter()
+        response = client.open(
+            endpoint.path, method=endpoint.method, json=body, headers=endpoint.headers
+        )
+        latencies.append(time.perf_counter() - t0)
+        errors += response.status_code >= 400
+    return summarize(
+        "inprocess", endpoint, latencies, errors, time.perf_counter() - started
+    )
+
+
+def run_server(
+    port: int, endpoint: Endpoint, count: int, concurrency: int, sequence
+) -> Result:
+    lock = threading.Lock()
+    latencies: List[float] = []
+    errors = 0
+
+    def worker(share: int) -> None:
+        nonlocal errors
+        local: List[float] = []
+        failed = 0
+        for _ in range(share):
+            headers = dict(endpoint.headers or {})
+            payload = None
+            if endpoint.body:
+                with lock:
+                    n = next(sequence)
+                payload = json.dumps(endpoint.body(n))
+                headers["Content-Type"] = "application/json"
+            t0 = time.perf_counter()
+            conn = HTTPConnection("127.0.0.1", port, timeout=30)
+            try:
+                conn.request(endpoint.method, endpoint.path, payload, headers)
+                response = conn.getresponse()
+                response.read()
+                failed += response.status >= 400
+            except OSError:
+                failed += 1
+            finally:
+                conn.close()
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    base, extra = divmod(count, concurrency)
+    shares = [base + (i < extra) for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, shares))
+    elapsed = time.perf_counter() - started
+    return summarize("server", endpoint, latencies, errors, elapsed)
+
+
+def benchmark(args: argparse.Namespace) -> List[Result]:
+    app = create_app(testing=True)
+    selected = [e for e in ENDPOINTS if not args.only or e.name in args.only]
+    sequence = itertools.count()
+    results: List[Result] = []
+
+    if "inprocess" in args.modes:
+        prepare(app, args.users, args.posts)
+        for endpoint in selected:
+            results.append(run_inprocess(app, endpoint, args.requests, sequence))
+
+    if "server" in args.modes:
+        prepare(app, args.users, args.posts)
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            for endpoint in selected:
+                results.append(
+                    run_server(
+                        server.port, endpoint, args.requests, args.concurrency, sequence
+                    )
+                )
+        finally:
+            server.shutdown()
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def save(results: List[Result], args: argparse.Namespace) -> Path:
+    commit = git_commit()
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = Path(args.output) if args.output else RESULTS_DIR / f"{stamp}-{commit}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document = {
+        "meta": {
+            "commit": commit,
+            "timestamp": stamp,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "users": args.users,
+            "posts": args.posts,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "results": [asdict(result) for result in results],
+    }
+    path.write_text(json.dumps(document, indent=2) + "\n", encoding="utf-8")
+    return path
+
+
+def report(results: List[Result], baseline: Optional[Dict[str, Any]] = None) -> None:
+    previous = {}
+    if baseline:
+        previous = {(r["mode"], r["endpoint"]): r for r in baseline["results"]}
+    header = (
+        f"{'mode':<10} {'endpoint':<14} {'req/s':>9} {'p50 ms':>8} "
+        f"{'p95 ms':>8} {'p99 ms':>8} {'errors':>6}"
+    )
+    print(header + ("  Δp50     Δreq/s" if previous else ""))
+    for r in results:
+        line = (
+            f"{r.mode:<10} {r.endpoint:<14} {r.rps:>9.1f} {r.p50_ms:>8.3f} "
+            f"{r.p95_ms:>8.3f} {r.p99_ms:>8.3f} {r.errors:>6}"
+        )
+        old = previous.get((r.mode, r.endpoint))
+        if old:
+            line += (
+                f"  {(r.p50_ms / old['p50_ms'] - 1) * 100:+6.1f}%"
+                f"  {(r.rps / old['rps'] - 1) * 100:+6.1f}%"
+            )
+        print(line)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000, help="seeded users")
+    parser.add_argument("--posts", type=int, default=1_000, help="seeded wall posts")
+    parser.add_argument(
+        "--requests", type=int, default=500, help="requests per endpoint and mode"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="client threads in server mode"
+    )
+    parser.add_argument(
+        "--modes", nargs="+", choices=MODES, default=list(MODES), metavar="MODE"
+    )
+    parser.add_argument(
+        "--only", nargs="+", metavar="ENDPOINT", help="endpoint names to run"
+    )
+    parser.add_argument("--output", help="where to write the JSON results")
+    parser.add_argument("--compare", help="earlier JSON results to diff against")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    results = benchmark(args)
+    baseline = None
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+    report(results, baseline)
+    print(f"\nresults saved to {save(results, args)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import json
+
 
 def test_create_user_ok(client):
     rv = client.post(
@@ -69,3 +71,243 @@ def test_delete_user_success(client):
     assert rv.status_code == 204
     rv_follow = client.get(f"/api/users/{created['id']}")
     assert rv_follow.status_code == 404
+
+
+def _seed_users(client, count):
+    for i in range(count):
+        client.post(
+            "/api/users",
+            json={
+                "name": f"User {i}",
+                "email": f"u{i}@test.com",
+                "password": "secreto123",
+            },
+        )
+
+
+def test_list_users_cursor_pagination(client):
+    _seed_users(client, 5)
+
+    first = client.get("/api/users?limit=2")
+    assert first.status_code == 200
+    assert [u["email"] for u in first.get_json()] == ["u0@test.com", "u1@test.com"]
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get(f"/api/users?limit=2&after_id={cursor}")
+    assert [u["email"] for u in second.get_json()] == ["u2@test.com", "u3@test.com"]
+
+    last = client.get(f"/api/users?limit=2&after_id={second.headers['X-Next-Cursor']}")
+    assert [u["email"] for u in last.get_json()] == ["u4@test.com"]
+    assert "X-Next-Cursor" not in last.headers
+
+
+def test_list_users_cursor_skips_deleted(client):
+    _seed_users(client, 3)
+    client.delete("/api/users/2")
+
+    rv = client.get("/api/users?after_id=1")
+
+    assert [u["id"] for u in rv.get_json()] == [3]
+
+
+def test_list_users_field_projection(client):
+    _seed_users(client, 1)
+
+    rv = client.get("/api/users?fields=id,name")
+
+    assert rv.get_json() == [{"id": 1, "name": "User 0"}]
+
+
+def test_list_users_rejects_bad_paging_args(client):
+    assert client.get("/api/users?limit=0").status_code == 400
+    assert client.get("/api/users?limit=abc").status_code == 400
+    assert client.get("/api/users?limit=100000").status_code == 400
+    rv = client.get("/api/users?fields=id,password_hash")
+    assert rv.status_code == 400
+    assert "fields" in rv.get_json()["details"]
+
+
+def _user_line(name, email, password="secreto123"):
+    return json.dumps({"name": name, "email": email, "password": password})
+
+
+def _ndjson(rv):
+    return [json.loads(line) for line in rv.get_data().splitlines()]
+
+
+def _bearer(client, email, password="secreto123"):
+    rv = client.post("/api/auth/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {rv.get_json()['token']}"}
+
+
+def _importer(client):
+    client.post(
+        "/api/users",
+        json={"name": "Admin", "email": "admin@test.com", "password": "secreto123"},
+    )
+    return _bearer(client, "admin@test.com")
+
+
+def test_bulk_import_reports_each_line(app, client):
+    app.config["USERS_BULK_BATCH_SIZE"] = 2
+    client.post(
+        "/api/users",
+        json={"name": "Ana", "email": "ana@test.com", "password": "secreto123"},
+    )
+    body = "\n".join(
+        [
+            _user_line("Ben", "ben@test.com"),
+            "{not json",
+            _user_line("Ana", "ANA@test.com"),
+            "",
+            _user_line("C", "c@test.com"),
+            _user_line("Dan", "ben@test.com"),
+        ]
+    )
+
+    rv = client.post(
+        "/api/users/bulk",
+        data=body,
+        content_type="application/x-ndjson",
+        headers=_bearer(client, "ana@test.com"),
+    )
+
+    assert rv.status_code == 200
+    assert rv.mimetype == "application/x-ndjson"
+    results = _ndjson(rv)
+    assert [(r.get("line"), r.get("status")) for r in results[:-1]] == [
+        (1, 201),
+        (2, 400),
+        (3, 409),
+        (5, 400),
+        (6, 409),
+    ]
+    assert results[0]["user"]["email"] == "ben@test.com"
+    assert results[1]["error"] == "invalid_json"
+    assert results[3]["details"] == {
+        "name": ["Name must be between 2 and 80 characters long."]
+    }
+    assert results[-1] == {"summary": {"created": 1, "failed": 4}}
+    assert [u["email"] for u in client.get("/api/users").get_json()] == [
+        "ana@test.com",
+        "ben@test.com",
+    ]
+
+
+def test_bulk_import_rejects_oversized_lines(app, client):
+    app.config["USERS_BULK_MAX_LINE_BYTES"] = 100
+    oversized = _user_line("Ana", "ana@test.com", "x" * 250)
+    valid = _user_line("Ben", "ben@test.com")
+
+    headers = _importer(client)
+
+    rv = client.post(
+        "/api/users/bulk", data=f"{oversized}\n{valid}\n", headers=headers
+    )
+
+    results = _ndjson(rv)
+    assert results[0] == {"line": 1, "status": 413, "error": "line_too_long"}
+    assert results[1]["line"] == 2 and results[1]["status"] == 201
+
+
+def test_bulk_import_requires_a_token(client):
+    rv = client.post("/api/users/bulk", data=_user_line("Ben", "ben@test.com"))
+
+    assert rv.status_code == 401
+    assert rv.get_json() == {"error": "authentication_required"}
+    assert client.get("/api/users").get_json() == []
+
+
+def test_bulk_import_stops_at_the_line_cap(app, client):
+    app.config["USERS_BULK_MAX_LINES"] = 2
+    headers = _importer(client)
+    body = "\n".join(_user_line(f"User {n}", f"u{n}@test.com") for n in range(4))
+
+    results = _ndjson(client.post("/api/users/bulk", data=body, headers=headers))
+
+    assert [(r.get("line"), r.get("status")) for r in results[:-1]] == [
+        (1, 201),
+        (2, 201),
+        (3, 413),
+    ]
+    assert results[2]["error"] == "too_many_lines"
+    assert results[-1] == {"summary": {"created": 2, "failed": 1}}
+
+
+def test_bulk_import_is_rate_limited_per_user(app, client):
+    app.config.update(RATE_LIMIT_ENABLED=True, RATE_LIMIT_BULK_USER="1/hour")
+    headers = _importer(client)
+
+    first = client.post("/api/users/bulk", data="", headers=headers)
+    second = client.post("/api/users/bulk", data="", headers=headers)
+
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert "Retry-After" in second.headers
+
+
+def test_export_streams_all_users(app, client):
+    app.config["USERS_EXPORT_CHUNK"] = 2
+    _seed_users(client, 5)
+
+    rv = client.get("/api/users/export")
+
+    assert rv.status_code == 200
+    assert rv.is_streamed
+    users = _ndjson(rv)
+    assert [u["id"] for u in users] == [1, 2, 3, 4, 5]
+    assert set(users[0]) == {"id", "name", "email", "created_at"}
+
+
+def test_search_users_by_name_word_and_email_prefix(client):
+    for name, email in [
+        ("Ana María López", "ana@test.com"),
+        ("Mario Ruiz", "mruiz@test.com"),
+        ("Zoe", "maria.z@test.com"),
+    ]:
+        client.post(
+            "/api/users", json={"name": name, "email": email, "password": "secreto123"}
+        )
+
+    def emails(query):
+        rv = client.get(f"/api/users/search?{query}")
+        assert rv.status_code == 200
+        return [u["email"] for u in rv.get_json()]
+
+    assert emails("prefix=MARI") == [
+        "ana@test.com",
+        "maria.z@test.com",
+        "mruiz@test.com",
+    ]
+    assert emails("prefix=ana m") == ["ana@test.com"]
+    assert emails("prefix=lopez") == ["ana@test.com"]
+    assert emails("prefix=mruiz@") == ["mruiz@test.com"]
+    assert emails("prefix=mari&limit=1") == ["ana@test.com"]
+    assert emails("prefix=nadie") == []
+    rv = client.get("/api/users/search?prefix=zo&fields=id,name")
+    assert rv.get_json() == [{"id": 3, "name": "Zoe"}]
+
+
+def test_search_users_follows_updates_and_deletes(client):
+    created = client.post(
+        "/api/users",
+        json={"name": "Ana", "email": "ana@test.com", "password": "secreto123"},
+    ).get_json()
+
+    client.put(f"/api/users/{created['id']}", json={"name": "Beatriz"})
+    assert client.get("/api/users/search?prefix=ana").get_json()[0]["name"] == "Beatriz"
+    assert client.get("/api/users/search?prefix=bea").get_json()[0]["id"] == 1
+
+    client.put(f"/api/users/{created['id']}", json={"email": "bea@test.com"})
+    assert client.get("/api/users/search?prefix=ana").get_json() == []
+
+    client.delete(f"/api/users/{created['id']}")
+    assert client.get("/api/users/search?prefix=bea").get_json() == []
+
+
+def test_search_users_validates_arguments(client):
+    assert client.get("/api/users/search").status_code == 400
+    assert client.get("/api/users/search?prefix=" + "a" * 101).status_code == 400
+    assert client.get("/api/users/search?prefix=a&limit=51").status_code == 400
+    rv = client.get("/api/users/search?prefix=a&fields=password_hash")
+    assert rv.status_code == 400
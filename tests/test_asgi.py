@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from app.asgi import create_asgi_app
+from app.events import post_publisher
+from app.metrics import metrics
+from app.store import create_post
+
+
+@pytest.fixture()
+def asgi_app():
+    return create_asgi_app(testing=True)
+
+
+def _scope(method, path, headers=(), query=b""):
+    return {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "query_string": query,
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers],
+        "client": ("127.0.0.1", 5000),
+        "server": ("testserver", 80),
+    }
+
+
+async def _request(app, method, path, body=None, headers=()):
+    headers = list(headers)
+    data = b""
+    if body is not None:
+        data = json.dumps(body).encode()
+        headers.append(("Content-Type", "application/json"))
+    messages = [{"type": "http.request", "body": data, "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    await app(_scope(method, path, headers), receive, send)
+    start = sent[0]
+    raw = b"".join(message.get("body", b"") for message in sent[1:])
+    headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    payload = json.loads(raw) if raw and "json" in headers["content-type"] else raw
+    return start["status"], headers, payload
+
+
+def call(app, method, path, body=None, headers=()):
+    return asyncio.run(_request(app, method, path, body, headers))
+
+
+def _register_and_login(app):
+    user = {"name": "Ana", "email": "ana@test.com", "password": "Secreto123"}
+    status, _, created = call(app, "POST", "/api/users", user)
+    assert status == 201
+    _, _, login = call(
+        app,
+        "POST",
+        "/api/auth/login",
+        {"email": "ANA@test.com", "password": "Secreto123"},
+    )
+    return created, login["token"]
+
+
+def test_async_views_register_login_and_edit(asgi_app):
+    user, token = _register_and_login(asgi_app)
+    bearer = [("Authorization", f"Bearer {token}")]
+
+    status, _, body = call(asgi_app, "GET", f"/api/users/{user['id']}")
+    assert (status, body) == (200, user)
+    status, _, body = call(
+        asgi_app, "PUT", f"/api/users/{user['id']}", {"password": "Nueva1234"}, bearer
+    )
+    assert status == 200
+    status, headers, body = call(
+        asgi_app, "DELETE", f"/api/users/{user['id']}", headers=bearer
+    )
+    assert (status, body) == (401, {"error": "invalid_token"})
+    assert headers["www-authenticate"] == "Bearer"
+
+    status, _, body = call(asgi_app, "POST", "/api/users", {"name": "A"})
+    assert status == 400 and body["error"] == "validation_error"
+    status, _, body = call(
+        asgi_app,
+        "POST",
+        "/api/auth/login",
+        {"email": "ana@test.com", "password": "Secreto123"},
+    )
+    assert (status, body) == (401, {"error": "invalid_credentials"})
+
+
+@pytest.mark.parametrize(
+    "method, path, body",
+    [
+        ("POST", "/api/auth/login", ["ana@test.com", "Secreto123"]),
+        ("POST", "/api/users", {"name": "A"}),
+        ("GET", "/api/users/99", None),
+        ("POST", "/api/wall/posts", {"content": ""}),
+    ],
+)
+def test_native_views_answer_like_the_blueprints(asgi_app, method, path, body):
+    flask_client = asgi_app.flask_app.test_client()
+    expected = flask_client.open(path, method=method, json=body)
+
+    status, _, payload = call(asgi_app, method, path, body)
+
+    assert (status, payload) == (expected.status_code, expected.get_json())
+
+
+def test_async_login_is_rate_limited(asgi_app):
+    asgi_app.config.update(RATE_LIMIT_ENABLED=True, RATE_LIMIT_LOGIN_EMAIL="1/minute")
+    login = {"email": "nadie@test.com", "password": "x"}
+
+    assert call(asgi_app, "POST", "/api/auth/login", login)[0] == 401
+    status, headers, body = call(asgi_app, "POST", "/api/auth/login", login)
+
+    assert (status, body) == (429, {"error": "rate_limited"})
+    assert int(headers["retry-after"]) >= 1
+
+
+def test_other_routes_fall_back_to_flask(asgi_app):
+    _, token = _register_and_login(asgi_app)
+    headers = [("Authorization", f"Bearer {token}"), ("X-Author", "Otro")]
+    status, _, post = call(
+        asgi_app, "POST", "/api/wall/posts", {"content": "hola"}, headers
+    )
+    assert (status, post["author"]) == (201, "Ana")
+
+    status, headers, body = call(asgi_app, "GET", "/api/wall/posts")
+
+    assert status == 200
+    assert "etag" in headers
+    assert [p["content"] for p in body] == ["hola"]
+
+
+def test_stream_is_an_async_generator(asgi_app):
+    create_post("antes", "Ana")
+
+    async def scenario():
+        chunks = asyncio.Queue()
+        disconnect = asyncio.Event()
+        received = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if received:
+                return received.pop()
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            await chunks.put(message)
+
+        scope = _scope("GET", "/api/wall/stream", [("Last-Event-ID", "0")])
+        task = asyncio.ensure_future(asgi_app(scope, receive, send))
+        start = await chunks.get()
+        events = []
+        while len(events) < 2:
+            body = (await chunks.get())["body"].decode()
+            if body.startswith("id:"):
+                events.append(body)
+            if len(post_publisher) and len(events) == 1:
+                create_post("en vivo", "Ana")
+        disconnect.set()
+        await asyncio.wait_for(task, 1)
+        return start, events
+
+    start, events = asyncio.run(scenario())
+
+    assert dict(start["headers"])[b"content-type"].startswith(b"text/event-stream")
+    assert ['"antes"' in events[0], '"en vivo"' in events[1]] == [True, True]
+    assert len(post_publisher) == 0
+
+
+def test_native_routes_report_metrics_and_server_timing(asgi_app):
+    _register_and_login(asgi_app)
+    metrics.reset()
+
+    status, headers, _ = call(
+        asgi_app,
+        "POST",
+        "/api/auth/login",
+        {"email": "ana@test.com", "password": "Secreto123"},
+    )
+    _, _, exposition = call(asgi_app, "GET", "/api/metrics")
+
+    assert status == 200
+    assert headers["server-timing"].startswith("hash;dur=")
+    assert (
+        'http_requests_total{endpoint="auth_api.login_route",method="POST",'
+        'status="200"} 1' in exposition.decode()
+    )
+
+
+def test_store_calls_leave_the_event_loop(asgi_app, monkeypatch):
+    threads = []
+
+    def get_user(uid):
+        threads.append(threading.get_ident())
+        return None
+
+    monkeypatch.setattr("app.asgi.get_user", get_user)
+
+    assert call(asgi_app, "GET", "/api/users/1")[0] == 404
+    assert threads and threads[0] != threading.get_ident()
+
+
+def test_wsgi_fallback_streams_the_request_body(asgi_app):
+    _, token = _register_and_login(asgi_app)
+    asgi_app.config["USERS_BULK_BATCH_SIZE"] = 1
+    line = json.dumps({"name": "Ben", "email": "ben@test.com", "password": "x" * 8})
+
+    async def scenario():
+        first_result = asyncio.Event()
+        sent = []
+        messages = [
+            {"type": "http.request", "body": line.encode() + b"\n", "more_body": True},
+            {"type": "http.request", "body": b"", "more_body": False},
+        ]
+
+        async def receive():
+            if len(messages) == 1:
+                # The rest of the body only arrives once a result went out.
+                await first_result.wait()
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+            if b'"line":1' in message.get("body", b""):
+                first_result.set()
+
+        headers = [("Authorization", f"Bearer {token}")]
+        scope = _scope("POST", "/api/users/bulk", headers)
+        await asyncio.wait_for(asgi_app(scope, receive, send), 5)
+        return sent
+
+    sent = asyncio.run(scenario())
+    lines = b"".join(m.get("body", b"") for m in sent[1:]).splitlines()
+
+    assert sent[0]["status"] == 200
+    assert json.loads(lines[0])["status"] == 201
+    assert json.loads(lines[-1]) == {"summary": {"created": 1, "failed": 0}}
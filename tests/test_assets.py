@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import gzip
+import re
+
+import pytest
+
+from app import assets
+from app.create_app import create_app
+
+
+@pytest.fixture()
+def asset_app(tmp_path):
+    app = create_app(testing=True)
+    app.config.update(STATIC_FINGERPRINT=True, STATIC_BUILD_DIR=str(tmp_path))
+    assets.init_app(app)
+    return app
+
+
+def test_build_is_content_addressed_and_idempotent(tmp_path):
+    static = tmp_path / "static"
+    (static / "js").mkdir(parents=True)
+    (static / "js" / "app.js").write_text("console.log('hola');\n" * 50)
+    (static / "logo.png").write_bytes(b"\x89PNG")
+    build = tmp_path / "build"
+
+    first = assets.build_assets(str(static), str(build))
+    second = assets.build_assets(str(static), str(build))
+    (static / "js" / "app.js").write_text("console.log('adiós');\n" * 50)
+    changed = assets.build_assets(str(static), str(build))
+
+    hashed = first["js/app.js"]["path"]
+    assert re.fullmatch(r"js/app\.[0-9a-f]{12}\.js", hashed)
+    assert first == second
+    assert changed["js/app.js"]["path"] != hashed
+    assert "gzip" in first["js/app.js"]["encodings"]
+    assert first["logo.png"]["encodings"] == []
+    assert gzip.decompress((build / (hashed + ".gz")).read_bytes()) == (
+        "console.log('hola');\n" * 50
+    ).encode()
+
+
+def test_pages_link_hashed_assets(asset_app):
+    html = asset_app.test_client().get("/").get_data(as_text=True)
+
+    assert re.search(r'href="/static/css/styles\.[0-9a-f]{12}\.css"', html)
+    assert re.search(r'src="/static/js/app\.[0-9a-f]{12}\.js"', html)
+
+
+def test_hashed_assets_are_precompressed_and_immutable(asset_app):
+    client = asset_app.test_client()
+    url = asset_app.extensions["assets"].urls["js/app.js"]
+    original = client.get("/static/js/app.js")
+
+    compressed = client.get(f"/static/{url}", headers={"Accept-Encoding": "gzip"})
+    plain = client.get(f"/static/{url}", headers={"Accept-Encoding": "identity"})
+
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+    assert compressed.mimetype == "text/javascript"
+    assert gzip.decompress(compressed.data) == original.data
+    assert "Content-Encoding" not in plain.headers
+    assert plain.data == original.data
+    assert "immutable" not in original.headers.get("Cache-Control", "")
+
+
+def test_current_build_is_not_rewritten(tmp_path, monkeypatch):
+    static = tmp_path / "static"
+    static.mkdir()
+    (static / "app.js").write_text("console.log('hola');\n" * 50)
+    build = tmp_path / "build"
+    first = assets.build_assets(str(static), str(build))
+
+    def fail(path, data):
+        raise AssertionError(f"{path} rewritten")
+
+    monkeypatch.setattr(assets, "_write", fail)
+
+    assert assets.build_assets(str(static), str(build)) == first
+
+
+def test_only_encodings_present_on_disk_are_served(tmp_path):
+    (tmp_path / "app.abc.js").write_text("plain")
+    (tmp_path / "app.abc.js.br").write_bytes(b"br")
+    manifest = {"app.js": {"path": "app.abc.js", "encodings": ["br", "gzip"]}}
+
+    lookup = assets.AssetManifest(str(tmp_path), manifest).lookup("app.abc.js")
+
+    assert lookup == ("app.js", ("br",))
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.store import collection_version, create_post
+
+
+def _add_user(client, email="alice@example.com"):
+    return client.post(
+        "/api/users",
+        json={"name": "Alice", "email": email, "password": "Secret123"},
+    ).get_json()
+
+
+@pytest.mark.parametrize("path", ["/api/users", "/api/wall/posts"])
+def test_listing_returns_304_for_matching_etag(client, path):
+    first = client.get(path)
+    etag = first.headers["ETag"]
+
+    second = client.get(path, headers={"If-None-Match": etag})
+
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.headers["ETag"] == etag
+
+
+def test_users_etag_changes_on_every_mutation(client):
+    etags = [client.get("/api/users").headers["ETag"]]
+    user = _add_user(client)
+    etags.append(client.get("/api/users").headers["ETag"])
+    client.put(f"/api/users/{user['id']}", json={"name": "Alicia"})
+    etags.append(client.get("/api/users").headers["ETag"])
+    client.delete(f"/api/users/{user['id']}")
+    etags.append(client.get("/api/users").headers["ETag"])
+
+    assert len(set(etags)) == 4
+    stale = client.get("/api/users", headers={"If-None-Match": etags[0]})
+    assert stale.status_code == 200
+
+
+def test_posts_version_bumped_by_create_post(client):
+    before = collection_version("posts")
+    create_post("Hola", None)
+
+    assert collection_version("posts").counter == before.counter + 1
+    assert collection_version("users") == collection_version("users")
+
+
+def test_if_modified_since_is_honoured(client, monkeypatch):
+    later = collection_version("posts").modified + 1
+    monkeypatch.setattr("app.caching.time", SimpleNamespace(time=lambda: later))
+    first = client.get("/api/wall/posts")
+
+    response = client.get(
+        "/api/wall/posts", headers={"If-Modified-Since": first.headers["Last-Modified"]}
+    )
+
+    assert response.status_code == 304
+
+
+def test_write_in_the_same_second_is_not_answered_304(client, monkeypatch):
+    now = collection_version("posts").modified
+    monkeypatch.setattr("app.caching.time", SimpleNamespace(time=lambda: now))
+    first = client.get("/api/wall/posts")
+    create_post("Hola", None)
+
+    response = client.get(
+        "/api/wall/posts", headers={"If-Modified-Since": first.headers["Last-Modified"]}
+    )
+
+    assert response.status_code == 200
+    assert len(response.get_json()) == 1
+
+
+def test_304_does_not_read_the_collection(client, monkeypatch):
+    etag = client.get("/api/users").headers["ETag"]
+
+    def fail(**_):
+        raise AssertionError("listing should not be read")
+
+    monkeypatch.setattr("app.routes.users.list_user_records", fail)
+
+    assert client.get("/api/users", headers={"If-None-Match": etag}).status_code == 304
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app import hashing
+from app.store import get_store
+
+
+def test_pool_hashes_and_verifies():
+    pool = hashing.HashingPool(workers=1, queue_depth=0, method="pbkdf2:sha256:1000")
+    try:
+        pwhash = pool.hash("Secret123")
+        assert pool.check(pwhash, "Secret123")
+        assert not pool.check(pwhash, "wrong")
+    finally:
+        pool.shutdown()
+
+
+def test_hash_many_keeps_order_and_waits_for_slots():
+    pool = hashing.HashingPool(workers=2, queue_depth=0, method="pbkdf2:sha256:1000")
+    try:
+        passwords = [f"Secret{i}" for i in range(5)]
+        hashes = pool.hash_many(passwords)
+        assert [pool.check(h, p) for h, p in zip(hashes, passwords)] == [True] * 5
+    finally:
+        pool.shutdown()
+
+
+def test_pool_rejects_when_saturated():
+    pool = hashing.HashingPool(workers=1, queue_depth=0)
+    try:
+        pool._slots.acquire()
+        with pytest.raises(hashing.HashingBusyError):
+            pool.hash("Secret123")
+    finally:
+        pool.shutdown()
+
+
+def test_saturated_pool_returns_503(client):
+    pool = hashing.get_pool()
+    while pool._slots.acquire(blocking=False):
+        pass
+
+    response = client.post(
+        "/api/users",
+        json={"name": "Alice", "email": "alice@example.com", "password": "Secret123"},
+    )
+
+    assert response.status_code == 503
+    assert response.get_json() == {"error": "hashing_busy"}
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_hashing_time_reported_in_server_timing(client):
+    client.post(
+        "/api/users",
+        json={"name": "Alice", "email": "alice@example.com", "password": "Secret123"},
+    )
+
+    response = client.post(
+        "/api/auth/login", json={"email": "alice@example.com", "password": "Secret123"}
+    )
+
+    assert response.headers["Server-Timing"].startswith("hash;dur=")
+    assert "Server-Timing" not in client.get("/api/users").headers
+
+
+def test_calibration_scales_with_the_target_and_respects_the_floor():
+    fast, fast_ms = hashing.calibrate_method("pbkdf2:sha256", 5, 1000)
+    slow, slow_ms = hashing.calibrate_method("pbkdf2", 50, 1000)
+    floored, _ = hashing.calibrate_method("pbkdf2:sha256", 0.001, 1000)
+
+    fast_iterations = int(fast.rsplit(":", 1)[1])
+    slow_iterations = int(slow.rsplit(":", 1)[1])
+    assert slow.startswith("pbkdf2:sha256:")
+    assert slow_iterations > 3 * fast_iterations
+    assert slow_ms > 3 * fast_ms
+    assert floored == "pbkdf2:sha256:1000"
+    assert hashing.calibrate_method("scrypt", 50) == ("scrypt:32768:8:1", 0.0)
+
+
+def test_needs_rehash_tolerates_small_iteration_differences():
+    pwhash = "pbkdf2:sha256:100000$salt$digest"
+
+    assert not hashing.needs_rehash(pwhash, "pbkdf2:sha256:110000")
+    assert hashing.needs_rehash(pwhash, "pbkdf2:sha256:200000")
+    assert hashing.needs_rehash(pwhash, "pbkdf2:sha512:100000")
+    assert hashing.needs_rehash(pwhash, "scrypt")
+    assert not hashing.needs_rehash("pbkdf2:sha256:600000$s$d", "pbkdf2")
+
+
+def _login(client):
+    return client.post(
+        "/api/auth/login", json={"email": "alice@example.com", "password": "Secret123"}
+    )
+
+
+def _use_method(app, method):
+    hashing.configure_hashing({**app.config, "PASSWORD_HASH_METHOD": method})
+
+
+def test_login_upgrades_outdated_hashes(app, client):
+    client.post(
+        "/api/users",
+        json={"name": "Alice", "email": "alice@example.com", "password": "Secret123"},
+    )
+    bearer = {"Authorization": f"Bearer {_login(client).get_json()['token']}"}
+    store = get_store()
+
+    def stored_hash():
+        return store.find_user_by_email("alice@example.com")["password_hash"]
+
+    try:
+        _use_method(app, "pbkdf2:sha256:2000")
+        assert _login(client).status_code == 200
+        assert stored_hash().startswith("pbkdf2:sha256:2000$")
+
+        _use_method(app, "scrypt:1024:8:1")
+        login = store.authenticate_user_async("alice@example.com", "Secret123")
+        assert asyncio.run(login)["id"] == 1
+        assert stored_hash().startswith("scrypt:1024:8:1$")
+
+        # Same password: existing sessions stay valid.
+        rv = client.put("/api/users/1", json={"name": "Al"}, headers=bearer)
+        assert rv.status_code == 200
+    finally:
+        hashing.configure_hashing(app.config)
+
+
+def test_hash_parameters_are_exported_as_gauges(client):
+    body = client.get("/api/metrics").get_data(as_text=True)
+
+    assert "app_password_hash_iterations 1000" in body
+    assert "app_password_hash_estimated_seconds 0" in body
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from app.json_provider import FastJSONProvider, orjson
+from app.storage import PostRecord, UserRecord
+
+RECORDS = [
+    {
+        "id": 1,
+        "name": "Ana",
+        "email": "ana@example.com",
+        "password_hash": "secret",
+        "created_at": "2024-01-01T00:00:00Z",
+    }
+]
+
+
+@pytest.fixture(params=[True, False], ids=["fast", "stdlib"])
+def provider(app, request):
+    provider = FastJSONProvider(app)
+    provider.fast_path = request.param
+    return provider
+
+
+def test_records_are_projected_without_private_fields(provider):
+    body = provider.dumps_records(RECORDS, ("id", "name", "email", "created_at"))
+
+    assert json.loads(body) == [
+        {k: v for k, v in RECORDS[0].items() if k != "password_hash"}
+    ]
+
+
+def test_slotted_records_are_encoded_from_their_slots(provider, monkeypatch):
+    users = [
+        UserRecord(1, 'Ana "la" Pérez', "ana@example.com", "secret", 1704067200),
+        UserRecord(2, "Bo\\b", "bob@example.com", "secret", 1704067260),
+    ]
+    fields = ("id", "name", "created_at")
+    expected = [{name: user[name] for name in fields} for user in users]
+    monkeypatch.setattr(UserRecord, "__getitem__", None)
+
+    assert json.loads(provider.dumps_records(users, fields)) == expected
+
+
+def test_mixed_columns_fall_back_to_per_value_encoding(provider):
+    rows = [{"id": 1, "tag": "a"}, {"id": 2, "tag": None}, {"id": 3, "tag": 4}]
+
+    assert json.loads(provider.dumps_records(rows, ("id", "tag"))) == rows
+
+
+def test_both_paths_produce_the_same_document(app, provider):
+    payload = {"author": "Anónimo", "ids": [1, 2], "nested": {"ok": True}}
+
+    assert json.loads(provider.dumps_bytes(payload)) == payload
+    assert json.loads(provider.dumps(payload)) == payload
+
+
+def test_slotted_records_encode_as_objects(provider):
+    post = PostRecord(3, "Ana", "hola", 1704067200)
+    expected = {
+        "id": 3,
+        "author": "Ana",
+        "content": "hola",
+        "created_at": "2024-01-01T00:00:00Z",
+    }
+
+    assert json.loads(provider.dumps_bytes([post])) == [expected]
+    assert json.loads(provider.dumps(post)) == expected
+
+
+def test_fast_path_is_used_only_when_available(provider):
+    assert provider.using_orjson is (provider.fast_path and orjson is not None)
+
+
+def test_app_responses_keep_configured_key_order(client):
+    client.post(
+        "/api/users",
+        json={"name": "Ana", "email": "ana@example.com", "password": "Secret123"},
+    )
+
+    body = client.get("/api/users").get_json()
+
+    assert list(body[0]) == ["id", "name", "email", "created_at"]
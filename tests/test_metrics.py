@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import pytest
+
+from app import metrics as metrics_module
+from app.metrics import Histogram, MetricsRegistry, metrics
+
+
+@pytest.fixture(autouse=True)
+def _fresh_metrics():
+    metrics.reset()
+    yield
+    metrics.enabled = True
+
+
+def _samples(client):
+    rv = client.get("/api/metrics")
+    assert rv.status_code == 200
+    assert rv.content_type.startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in rv.get_data(as_text=True).splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    assert histogram.snapshot() == ([2, 3, 4], pytest.approx(3.65), 4)
+
+
+def test_render_escapes_label_values():
+    registry = MetricsRegistry()
+    registry.register_gauge("g", "A gauge.", lambda: 1, {"name": 'a"b\\c'})
+
+    assert 'g{name="a\\"b\\\\c"} 1' in registry.render()
+
+
+def test_requests_and_stages_are_exposed(client):
+    client.post(
+        "/api/users",
+        json={"name": "Ana", "email": "ana@test.com", "password": "secreto123"},
+    )
+    client.get("/api/users")
+    client.get("/api/nope")
+
+    samples = _samples(client)
+
+    requests = 'http_requests_total{endpoint="%s",method="%s",status="%s"}'
+    assert samples[requests % ("users_api.create_user_route", "POST", "201")] == 1
+    assert samples[requests % ("users_api.list_users_route", "GET", "200")] == 1
+    assert samples[requests % ("unmatched", "GET", "404")] == 1
+    duration = 'http_request_duration_seconds_count{endpoint="%s"}'
+    assert samples[duration % "users_api.create_user_route"] == 1
+    for stage in ("validate", "hash", "store.create_user", "serialize"):
+        assert samples[f'app_stage_duration_seconds_count{{stage="{stage}"}}'] == 1
+    assert samples['app_store_records{collection="users"}'] == 1
+    assert samples['app_store_records{collection="posts"}'] == 0
+    assert samples["app_stream_subscribers"] == 0
+
+
+def test_disabled_metrics_record_nothing(client):
+    metrics.enabled = False
+
+    client.get("/api/users")
+    with metrics_module.stage("serialize"):
+        pass
+
+    assert client.get("/api/metrics").status_code == 404
+    metrics.enabled = True
+    assert "http_requests_total{" not in metrics.render()
+    assert "app_stage_duration_seconds_count" not in metrics.render()
@@ -10,3 +10,9 @@ def test_pages_render(client, path):
 
     assert response.status_code == 200
     assert b"<!doctype html>" in response.data
+
+
+def test_wall_page_can_load_older_posts(client):
+    response = client.get("/muro")
+
+    assert b'id="wall-more"' in response.data
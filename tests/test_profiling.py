@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from app.config import ProductionConfig
+from app.profiling import profiler
+
+
+@pytest.fixture()
+def profiling_app(app):
+    app.config.update(PROFILER_ENABLED=True, PROFILER_TOKEN=None)
+    return app
+
+
+def _spin_handler():
+    deadline = time.monotonic() + 0.5
+    while time.monotonic() < deadline:
+        pass
+    return "done"
+
+
+def test_profiler_disabled_by_default(client):
+    assert client.get("/api/debug/profile?seconds=0.01").status_code == 404
+
+
+def test_production_requires_a_token(profiling_app):
+    assert ProductionConfig.PROFILER_REQUIRE_TOKEN
+    profiling_app.config["PROFILER_REQUIRE_TOKEN"] = True
+    client = profiling_app.test_client()
+
+    url = "/api/debug/profile?seconds=0.01"
+
+    assert client.get(url).status_code == 403
+
+    profiling_app.config["PROFILER_TOKEN"] = "s3cret"
+    assert client.get(url, headers={"X-Profiler-Token": "wrong"}).status_code == 403
+    assert client.get(url, headers={"X-Profiler-Token": "s3cret"}).status_code == 200
+
+
+def test_rejects_out_of_range_arguments(profiling_app):
+    client = profiling_app.test_client()
+
+    assert client.get("/api/debug/profile?seconds=0").status_code == 400
+    assert client.get("/api/debug/profile?seconds=999").status_code == 400
+    assert client.get("/api/debug/profile?interval_ms=abc").status_code == 400
+
+
+def test_profile_collects_collapsed_stacks_of_live_requests(profiling_app):
+    profiling_app.add_url_rule("/spin", view_func=_spin_handler)
+    worker = threading.Thread(target=lambda: profiling_app.test_client().get("/spin"))
+    worker.start()
+    time.sleep(0.05)
+
+    rv = profiling_app.test_client().get("/api/debug/profile?seconds=0.2&interval_ms=2")
+    worker.join()
+
+    assert rv.status_code == 200
+    assert int(rv.headers["X-Profile-Samples"]) > 0
+    lines = rv.get_data(as_text=True).splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert stack.split(";")[-1].startswith("_spin_handler (tests/test_profiling.py:")
+    assert "profile_route" not in rv.get_data(as_text=True)
+
+
+def test_overlapping_profiles_are_rejected(profiling_app):
+    profiler._lock.acquire()
+    try:
+        rv = profiling_app.test_client().get("/api/debug/profile?seconds=0.01")
+    finally:
+        profiler._lock.release()
+
+    assert rv.status_code == 409
+    assert rv.get_json() == {"error": "profiler_busy"}
+
+
+def test_threads_stay_sampled_until_their_last_request_ends():
+    profiler.enter_request()
+    profiler.enter_request()
+    profiler.exit_request()
+    still_sampled = threading.get_ident() in profiler._active
+    profiler.exit_request()
+
+    assert still_sampled
+    assert threading.get_ident() not in profiler._active
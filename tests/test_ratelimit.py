@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import pytest
+
+from app import store
+from app.ratelimit import Limit, TokenBucketLimiter, parse_limit
+from app.routes import auth
+
+
+@pytest.fixture()
+def limited_app(app):
+    app.config.update(RATE_LIMIT_ENABLED=True)
+    return app
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _login(client, email, password="incorrecta"):
+    return client.post("/api/auth/login", json={"email": email, "password": password})
+
+
+def test_parse_limit():
+    assert parse_limit("5/minute") == Limit(5, 60.0)
+    assert parse_limit("20/30s") == Limit(20, 30.0)
+    assert parse_limit("") is None
+    with pytest.raises(ValueError):
+        parse_limit("5/fortnight")
+    with pytest.raises(ValueError):
+        parse_limit("0/minute")
+
+
+def test_buckets_refill_and_reject_all_or_nothing():
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(clock=clock)
+    slow, fast = Limit(2, 10.0), Limit(10, 1.0)
+
+    assert limiter.acquire([("a", slow)]) == 0
+    assert limiter.acquire([("a", slow)]) == 0
+    assert limiter.acquire([("b", fast), ("a", slow)]) == pytest.approx(5.0)
+
+    clock.now += 5
+    assert limiter.acquire([("b", fast), ("a", slow)]) == 0
+    assert limiter.acquire([("a", slow)]) > 0
+
+
+def test_idle_buckets_expire_and_size_is_bounded():
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(max_keys=3, clock=clock)
+    limit = Limit(1, 1.0)
+    for key in range(5):
+        limiter.acquire([(key, limit)])
+
+    assert len(limiter) == 3
+
+    clock.now += 2
+    limiter.acquire([("fresh", limit)])
+    assert len(limiter) == 1
+
+
+def test_login_is_throttled_per_email_before_hashing(limited_app, monkeypatch):
+    limited_app.config.update(RATE_LIMIT_LOGIN_EMAIL="2/minute")
+    client = limited_app.test_client()
+    calls = []
+    monkeypatch.setattr(auth, "authenticate_user", lambda *args: calls.append(args))
+
+    assert _login(client, "ana@test.com").status_code == 401
+    assert _login(client, "ANA@test.com").status_code == 401
+    rv = _login(client, "ana@test.com")
+
+    assert rv.status_code == 429
+    assert rv.get_json() == {"error": "rate_limited"}
+    assert 1 <= int(rv.headers["Retry-After"]) <= 30
+    assert len(calls) == 2
+    assert _login(client, "otra@test.com").status_code == 401
+
+
+def test_wall_posts_are_throttled_per_ip_and_author(limited_app):
+    limited_app.config.update(RATE_LIMIT_POSTS_IP="3/minute")
+    limited_app.config.update(RATE_LIMIT_POSTS_AUTHOR="1/minute")
+    client = limited_app.test_client()
+
+    def post(author):
+        return client.post(
+            "/api/wall/posts", json={"content": "hola"}, headers={"X-Author": author}
+        )
+
+    assert post("Ana").status_code == 201
+    assert post("ana").status_code == 429
+    assert post("Luis").status_code == 201
+    assert client.post("/api/wall/posts", json={"content": "x"}).status_code == 201
+    assert post("Eva").status_code == 429
+    assert len(store.list_posts()) == 3
+
+
+def test_limits_are_off_in_testing_config(client):
+    for _ in range(12):
+        _login(client, "ana@test.com")
+
+    assert _login(client, "ana@test.com").status_code == 401
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import gzip
+import json
+
+from app.caching import CachedListing, ResponseCache, response_cache
+
+
+def _add_user(client, n):
+    client.post(
+        "/api/users",
+        json={"name": f"U{n}", "email": f"u{n}@example.com", "password": "Secret123"},
+    )
+
+
+def test_second_listing_request_is_served_from_cache(client):
+    _add_user(client, 0)
+
+    first = client.get("/api/users")
+    second = client.get("/api/users")
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert first.data == second.data
+    assert response_cache.stats()["hits"] == 1
+
+
+def test_mutations_invalidate_cached_pages(client):
+    _add_user(client, 0)
+    client.get("/api/users")
+    client.get("/api/wall/posts")
+
+    _add_user(client, 1)
+
+    users = client.get("/api/users")
+    posts = client.get("/api/wall/posts")
+    assert users.headers["X-Cache"] == "MISS"
+    assert len(users.get_json()) == 2
+    assert posts.headers["X-Cache"] == "HIT"
+
+
+def test_pages_and_projections_are_cached_separately(client):
+    for n in range(3):
+        _add_user(client, n)
+
+    first = client.get("/api/users?limit=2")
+    projected = client.get("/api/users?limit=2&fields=id")
+
+    assert projected.headers["X-Cache"] == "MISS"
+    assert projected.get_json() == [{"id": 1}, {"id": 2}]
+    assert client.get("/api/users?limit=2").headers["X-Next-Cursor"] == "2"
+    assert first.headers["X-Next-Cursor"] == "2"
+
+
+def test_large_pages_are_served_gzipped_when_accepted(client):
+    for n in range(30):
+        client.post("/api/wall/posts", json={"content": f"Mensaje número {n} " * 5})
+
+    plain = client.get("/api/wall/posts")
+    zipped = client.get("/api/wall/posts", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in plain.headers
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in zipped.headers["Vary"]
+    assert json.loads(gzip.decompress(zipped.data)) == plain.get_json()
+
+
+def test_cache_is_bounded_lru():
+    cache = ResponseCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.put("users", key, CachedListing(b"[]", None))
+    cache.get("users", "a")
+    cache.put("users", "c", CachedListing(b"[]", None))
+
+    assert cache.get("users", "b") is None
+    assert cache.get("users", "a") is not None
+    assert len(cache) == 2
+
+
+def test_cache_stats_endpoint(client):
+    client.get("/api/users")
+    client.get("/api/users")
+
+    stats = client.get("/api/cache/stats").get_json()
+
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import pytest
+from marshmallow import ValidationError
+
+from app.schemas import (
+    compiled_user_create_loader,
+    compiled_user_update_loader,
+    is_valid_email_syntax,
+    user_create_schema,
+    user_update_schema,
+)
+
+VALID = {"name": "Ana María", "email": "ana@test.com", "password": "secreto123"}
+
+PAYLOADS = [
+    VALID,
+    {"name": "Ana"},
+    {},
+    {"name": "A", "email": "ana@test.com", "password": "secreto123"},
+    {"name": "Ana<script>", "email": "ana@test.com", "password": "secreto123"},
+    {"name": "   ", "email": "ana@test.com", "password": "short"},
+    {"name": "", "email": "", "password": ""},
+    {"name": 3, "email": None, "password": 1.5},
+    {"name": True, "email": ["ana@test.com"]},
+    {"name": "Ana", "email": 5, "password": "secreto123"},
+    {"name": "Ana", "email": "not-an-email", "password": "secreto123"},
+    {"name": "Ana", "email": "ana@test.com", "password": "secreto123", "role": "x"},
+    {"role": "admin", "is_admin": True},
+    [],
+    "ana",
+    None,
+    42,
+]
+
+
+def _outcome(loader, payload):
+    try:
+        return "ok", loader.load(payload)
+    except ValidationError as exc:
+        return "error", exc.messages
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+@pytest.mark.parametrize(
+    "schema, loader",
+    [
+        (user_create_schema, compiled_user_create_loader),
+        (user_update_schema, compiled_user_update_loader),
+    ],
+    ids=["create", "update"],
+)
+def test_compiled_loader_matches_marshmallow(schema, loader, payload):
+    assert _outcome(loader, payload) == _outcome(schema, payload)
+
+
+def test_email_syntax_results_are_memoized():
+    is_valid_email_syntax.cache_clear()
+
+    assert is_valid_email_syntax("ana@test.com")
+    assert is_valid_email_syntax("ana@test.com")
+    assert not is_valid_email_syntax("ana@")
+
+    info = is_valid_email_syntax.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
+
+
+@pytest.mark.parametrize("mode", ["compiled", "marshmallow"])
+def test_validator_errors_are_reported_as_400(app, client, mode):
+    app.config["VALIDATION_MODE"] = mode
+
+    rv = client.post(
+        "/api/users",
+        json={"name": "A", "email": "ana@test.com", "password": "short"},
+    )
+
+    assert rv.status_code == 400
+    assert rv.get_json() == {
+        "error": "validation_error",
+        "details": {
+            "name": ["Name must be between 2 and 80 characters long."],
+            "password": ["Password must be at least 8 characters long."],
+        },
+    }
@@ -0,0 +1,411 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from app.storage import (
+    JournaledMemoryBackend,
+    MemoryBackend,
+    SharedMemoryBackend,
+    SQLiteBackend,
+)
+from app.events import post_publisher
+from app.store import Store, configure_store, get_store
+from app.tokens import InvalidTokenError, session_tokens
+
+CREATED = 1704067200  # 2024-01-01T00:00:00Z
+
+
+@pytest.fixture(params=["memory", "journal", "sqlite", "shared"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        instance = MemoryBackend(max_posts=3)
+    elif request.param == "journal":
+        instance = JournaledMemoryBackend(str(tmp_path / "journal"), max_posts=3)
+    elif request.param == "sqlite":
+        instance = SQLiteBackend(str(tmp_path / "store.db"), max_posts=3)
+    else:
+        instance = SharedMemoryBackend(
+            str(tmp_path / "store.shm"), max_posts=3, size=1 << 20, max_users=100
+        )
+    yield instance
+    instance.close()
+
+
+def test_users_round_trip(backend):
+    alice = backend.insert_user("Alice", "Alice@Example.com", "hash", CREATED)
+
+    assert backend.get_user(alice["id"])["email"] == "Alice@Example.com"
+    assert backend.get_user_by_email("alice@example.COM")["id"] == alice["id"]
+    with pytest.raises(ValueError, match="email_already_exists"):
+        backend.insert_user("Other", "ALICE@example.com", "hash", CREATED)
+
+    updated = backend.update_user(alice["id"], {"email": "a2@example.com"})
+    assert updated["email"] == "a2@example.com"
+    assert backend.get_user_by_email("alice@example.com") is None
+
+    assert backend.delete_user(alice["id"]) is True
+    assert backend.delete_user(alice["id"]) is False
+    assert backend.get_user(alice["id"]) is None
+
+
+def test_records_read_as_public_mappings(backend):
+    user = backend.insert_user("Alice", "alice@example.com", "hash", CREATED)
+    post = backend.insert_post("Ana", "hola", CREATED)
+
+    assert dict(backend.get_user(user["id"])) == {
+        "id": 1,
+        "name": "Alice",
+        "email": "alice@example.com",
+        "password_hash": "hash",
+        "created_at": "2024-01-01T00:00:00Z",
+    }
+    assert dict(backend.list_posts(None, None)[0][0]) == {
+        "id": post["id"],
+        "author": "Ana",
+        "content": "hola",
+        "created_at": "2024-01-01T00:00:00Z",
+    }
+
+
+def test_update_rejects_email_of_other_user(backend):
+    backend.insert_user("Alice", "alice@example.com", "hash", CREATED)
+    bob = backend.insert_user("Bob", "bob@example.com", "hash", CREATED)
+
+    with pytest.raises(ValueError, match="email_already_exists"):
+        backend.update_user(bob["id"], {"email": "Alice@example.com"})
+
+
+def test_non_ascii_emails_are_unique_ignoring_case(backend):
+    alvaro = backend.insert_user("Álvaro", "Álvaro@example.com", "hash", CREATED)
+
+    assert backend.get_user_by_email("álvaro@EXAMPLE.com")["id"] == alvaro["id"]
+    with pytest.raises(ValueError, match="email_already_exists"):
+        backend.insert_user("Otro", "ÁLVARO@example.com", "hash", CREATED)
+
+
+def test_users_page_by_id(backend):
+    for n in range(5):
+        backend.insert_user(f"User {n}", f"u{n}@example.com", "hash", CREATED)
+
+    first, cursor = backend.list_users(None, 2)
+    rest, end = backend.list_users(cursor, None)
+
+    assert [u["id"] for u in first] == [1, 2]
+    assert cursor == 2
+    assert [u["id"] for u in rest] == [3, 4, 5]
+    assert end is None
+
+
+def test_posts_are_bounded_and_paged_newest_first(backend):
+    for n in range(5):
+        backend.insert_post("Ana", f"post {n}", CREATED)
+
+    page, cursor = backend.list_posts(None, 2)
+    older, end = backend.list_posts(cursor, 2)
+
+    assert [p["id"] for p in page] == [5, 4]
+    assert [p["id"] for p in older] == [3]
+    assert end is None
+
+
+def test_reset_restarts_ids(backend):
+    backend.insert_user("Alice", "alice@example.com", "hash", CREATED)
+    backend.insert_post("Ana", "hola", CREATED)
+
+    backend.reset()
+
+    assert backend.list_users(None, None) == ([], None)
+    assert backend.insert_user("Bob", "bob@example.com", "hash", CREATED)["id"] == 1
+
+
+def test_sqlite_data_survives_reopen(tmp_path):
+    path = str(tmp_path / "store.db")
+    first = SQLiteBackend(path, max_posts=10)
+    first.insert_user("Alice", "alice@example.com", "hash", CREATED)
+    first.close()
+
+    second = SQLiteBackend(path, max_posts=10)
+    try:
+        assert second.get_user_by_email("ALICE@example.com")["name"] == "Alice"
+        mode = second._connection().execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+    finally:
+        second.close()
+
+
+def test_sqlite_uses_one_connection_per_thread(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "store.db"), max_posts=10)
+    seen = []
+    try:
+        thread = threading.Thread(target=lambda: seen.append(backend._connection()))
+        thread.start()
+        thread.join()
+        assert seen[0] is not backend._connection()
+    finally:
+        backend.close()
+
+
+def test_sqlite_closes_the_connection_of_an_exited_thread(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "store.db"), max_posts=10)
+    seen = []
+    try:
+        for _ in range(20):
+            thread = threading.Thread(
+                target=lambda: seen.append(backend._connection())
+            )
+            thread.start()
+            thread.join()
+
+        assert len(backend._connections) <= 1
+        with pytest.raises(sqlite3.ProgrammingError):
+            seen[0].execute("SELECT 1")
+        assert backend.get_user(1) is None
+    finally:
+        backend.close()
+
+
+def _shared(path, max_posts=10):
+    return SharedMemoryBackend(str(path), max_posts, size=1 << 20, max_users=100)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_shared_backend_is_visible_across_processes(tmp_path):
+    path = tmp_path / "store.shm"
+    backend = _shared(path)
+    try:
+        backend.insert_user("Alice", "alice@example.com", "hash", CREATED)
+        posts = backend.version("posts")
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - runs in the child
+            child = _shared(path)
+            child.update_user(1, {"name": "Alicia"})
+            child.insert_post("Ana", "desde otro proceso", CREATED)
+            os._exit(0)
+        os.waitpid(pid, 0)
+
+        assert backend.get_user_by_email("ALICE@example.com")["name"] == "Alicia"
+        assert backend.list_posts(None, None)[0][0]["author"] == "Ana"
+        assert backend.version("posts") > posts
+    finally:
+        backend.close()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_shared_backend_writers_exclude_each_other_after_fork(tmp_path):
+    backend = _shared(tmp_path / "store.shm")
+    held, done = os.pipe(), os.pipe()
+    try:
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - runs in the child
+            try:
+                os.read(held[0], 1)
+                started = time.monotonic()
+                backend.insert_post("Ana", "hijo", CREATED)
+                os.write(done[1], b"%f" % (time.monotonic() - started))
+            finally:
+                os._exit(0)
+        with backend._writing():
+            os.write(held[1], b"x")
+            time.sleep(0.3)
+        waited = float(os.read(done[0], 32))
+        os.waitpid(pid, 0)
+
+        assert waited >= 0.2
+        assert backend.list_posts(None, None)[0][0]["content"] == "hijo"
+    finally:
+        for fd in held + done:
+            os.close(fd)
+        backend.close()
+
+
+@pytest.mark.parametrize("kind", ["sqlite", "shared"])
+def test_multiprocess_backends_keep_session_cutoffs(kind, tmp_path):
+    if kind == "sqlite":
+        backend = SQLiteBackend(str(tmp_path / "store.db"), max_posts=3)
+    else:
+        backend = _shared(tmp_path / "store.shm")
+    try:
+        assert backend.session_cutoff(1) == -1
+        backend.revoke_sessions(1, 2000)
+        backend.revoke_sessions(2, 1000)
+        backend.revoke_sessions(None, 1500)
+
+        assert backend.multiprocess
+        assert [backend.session_cutoff(uid) for uid in (1, 2, 3)] == [
+            2000,
+            1500,
+            1500,
+        ]
+    finally:
+        backend.close()
+
+
+@pytest.mark.parametrize("kind", ["sqlite", "shared"])
+def test_multiprocess_backends_log_changed_users(kind, tmp_path, monkeypatch):
+    if kind == "sqlite":
+        backend = SQLiteBackend(str(tmp_path / "store.db"), max_posts=3)
+    else:
+        backend = _shared(tmp_path / "store.shm")
+    try:
+        start = backend.version("users").counter
+        alice = backend.insert_user("Alice", "alice@example.com", "hash", CREATED)
+        bob = backend.insert_user("Bob", "bob@example.com", "hash", CREATED)
+        backend.update_user(alice["id"], {"name": "Alicia"})
+        backend.delete_user(bob["id"])
+        middle = backend.version("users").counter
+        changed = backend.changed_users(start)
+        backend.reset()
+
+        assert changed == [1, 2, 1, 2]
+        assert backend.changed_users(middle) == [0]
+        assert backend.changed_users(backend.version("users").counter) == []
+        monkeypatch.setattr(f"app.storage.{kind}.CHANGE_LOG_SIZE", 2)
+        for n in range(3):
+            backend.insert_user("U", f"u{n}@example.com", "hash", CREATED)
+        assert backend.changed_users(middle + 1) is None
+    finally:
+        backend.close()
+
+
+def test_store_catches_up_with_foreign_writes_by_id(tmp_path, monkeypatch):
+    path = str(tmp_path / "store.db")
+    store = Store(SQLiteBackend(path, max_posts=10))
+    other = SQLiteBackend(path, max_posts=10)
+    rebuilds = []
+    rebuild = store._rebuild
+    monkeypatch.setattr(
+        store, "_rebuild", lambda reindex: rebuilds.append(reindex) or rebuild(reindex)
+    )
+    try:
+        bob = other.insert_user("Bob", "bob@example.com", "hash", CREATED)
+        other.insert_post("Ana", "hola mundo", CREATED)
+        found = [user["name"] for user in store.search_user_records("bo", 10)]
+        posts = store.search_posts("mundo")[0]
+        other.delete_user(bob["id"])
+        after_delete = store.search_user_records("bo", 10)
+
+        assert found == ["Bob"]
+        assert [post["content"] for post in posts] == ["hola mundo"]
+        assert after_delete == []
+        assert rebuilds == []
+
+        monkeypatch.setattr("app.storage.sqlite.CHANGE_LOG_SIZE", 2)
+        for name in ("Bea", "Beto", "Berta"):
+            other.insert_user(name, f"{name.lower()}@example.com", "hash", CREATED)
+        names = [user["name"] for user in store.search_user_records("be", 10)]
+
+        assert sorted(names) == ["Bea", "Berta", "Beto"]
+        assert rebuilds == [store._reindex_users]
+    finally:
+        other.close()
+        store.backend.close()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_store_follows_writes_from_other_processes(tmp_path):
+    configure_store(
+        {
+            "STORE_BACKEND": "shared",
+            "SHARED_STORE_PATH": str(tmp_path / "store.shm"),
+            "SHARED_STORE_SIZE": 1 << 20,
+            "SHARED_STORE_MAX_USERS": 100,
+        }
+    )
+    store = get_store()
+    interval, post_publisher.poll_interval = post_publisher.poll_interval, 0.01
+    subscription = post_publisher.subscribe()
+    try:
+        alice = store.create_user("Alice", "alice@example.com", "Secret123")
+        token = session_tokens.issue(alice["id"])
+        assert store.search_user_records("bo", 10) == []
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - runs in the child
+            try:
+                store.backend.insert_user("Bob", "bob@example.com", "hash", CREATED)
+                store.backend.insert_post("Ana", "desde otro proceso", CREATED)
+                store.delete_user(alice["id"])
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+
+        assert [user["name"] for user in store.search_user_records("bo", 10)] == [
+            "Bob"
+        ]
+        assert store.search_posts("proceso")[0][0]["author"] == "Ana"
+        assert subscription.get(timeout=5)["content"] == "desde otro proceso"
+        with pytest.raises(InvalidTokenError):
+            session_tokens.verify(token)
+    finally:
+        post_publisher.unsubscribe(subscription)
+        post_publisher.poll_interval = interval
+        configure_store({"STORE_BACKEND": "memory"})
+
+
+def test_shared_backend_compacts_its_heap(tmp_path):
+    backend = SharedMemoryBackend(
+        str(tmp_path / "store.shm"), 3, size=128 << 10, max_users=8
+    )
+    try:
+        alice = backend.insert_user("Alice", "alice@example.com", "hash", CREATED)
+        bob = backend.insert_user("Bob", "bob@example.com", "hash", CREATED)
+        for n in range(2000):
+            backend.update_user(alice["id"], {"name": f"Alice {n}" + "x" * 64})
+            backend.insert_post("Ana", f"post {n}", CREATED)
+
+        assert backend.get_user(alice["id"])["name"].startswith("Alice 1999")
+        assert backend.get_user_by_email("bob@example.com")["id"] == bob["id"]
+        assert [p["content"] for p in backend.list_posts(None, None)[0]] == [
+            "post 1999",
+            "post 1998",
+            "post 1997",
+        ]
+        with pytest.raises(ValueError):
+            backend.set_max_posts(4)
+    finally:
+        backend.close()
+
+
+def test_api_runs_on_sqlite_backend(client, tmp_path):
+    configure_store({"STORE_BACKEND": "sqlite", "SQLITE_PATH": str(tmp_path / "a.db")})
+    try:
+        created = client.post(
+            "/api/users",
+            json={
+                "name": "Alice",
+                "email": "alice@example.com",
+                "password": "Secret123",
+            },
+        )
+        login = client.post(
+            "/api/auth/login",
+            json={"email": "ALICE@example.com", "password": "Secret123"},
+        )
+        client.post("/api/wall/posts", json={"content": "Hola"})
+
+        assert created.status_code == 201
+        assert login.status_code == 200
+        assert client.get("/api/users").get_json()[0]["email"] == "alice@example.com"
+        assert client.get("/api/wall/posts").get_json()[0]["content"] == "Hola"
+    finally:
+        configure_store({"STORE_BACKEND": "memory"})
+
+
+def test_every_mutation_bumps_the_collection_version(backend):
+    users = [backend.version("users").counter]
+    alice = backend.insert_user("Alice", "alice@example.com", "hash", CREATED)
+    users.append(backend.version("users").counter)
+    backend.update_user(alice["id"], {"name": "Alicia"})
+    users.append(backend.version("users").counter)
+    backend.delete_user(alice["id"])
+    users.append(backend.version("users").counter)
+    posts = backend.version("posts").counter
+    backend.insert_post("Ana", "hola", CREATED)
+
+    assert users == sorted(set(users))
+    assert backend.version("posts").counter == posts + 1
+    assert backend.version("users").counter == users[-1]
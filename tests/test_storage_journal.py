@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import threading
+
+from app.storage import JournaledMemoryBackend
+
+CREATED = 1704067200  # 2024-01-01T00:00:00Z
+
+
+def _open(path, **kwargs):
+    return JournaledMemoryBackend(str(path), max_posts=10, **kwargs)
+
+
+def _state(backend):
+    users, _ = backend.list_users(None, None)
+    posts, _ = backend.list_posts(None, None)
+    return users, posts
+
+
+def _mutate(backend):
+    alice = backend.insert_user("Alice", "alice@example.com", "h1", CREATED)
+    bob = backend.insert_user("Bob", "bob@example.com", "h2", CREATED)
+    backend.update_user(alice["id"], {"name": "Alicia", "password_hash": "h3"})
+    backend.delete_user(bob["id"])
+    for n in range(3):
+        backend.insert_post("Ana", f"post {n}", CREATED)
+
+
+def test_journal_replay_restores_state(tmp_path):
+    first = _open(tmp_path)
+    _mutate(first)
+    expected = _state(first)
+    first.close()
+
+    second = _open(tmp_path)
+    try:
+        assert _state(second) == expected
+        assert second.get_user_by_email("ALICE@example.com")["name"] == "Alicia"
+        assert second.insert_user("Carol", "c@example.com", "h", CREATED)["id"] == 3
+        assert second.insert_post("Ana", "next", CREATED)["id"] == 4
+    finally:
+        second.close()
+
+
+def test_snapshot_compacts_and_replays_tail(tmp_path):
+    first = _open(tmp_path)
+    _mutate(first)
+    first.snapshot()
+    first.insert_post("Ana", "after snapshot", CREATED)
+    expected = _state(first)
+    first.close()
+
+    names = sorted(path.name for path in tmp_path.iterdir())
+    assert names == ["journal-00000001.ndjson", "snapshot-00000001.ndjson"]
+
+    second = _open(tmp_path)
+    try:
+        assert _state(second) == expected
+    finally:
+        second.close()
+
+
+def test_snapshot_is_taken_automatically(tmp_path):
+    backend = _open(tmp_path, snapshot_every=5)
+    for n in range(6):
+        backend.insert_user(f"User {n}", f"u{n}@example.com", "h", CREATED)
+    backend.close()
+
+    assert list(tmp_path.glob("snapshot-*.ndjson"))
+    reopened = _open(tmp_path)
+    try:
+        assert len(reopened.list_users(None, None)[0]) == 6
+    finally:
+        reopened.close()
+
+
+def test_torn_final_line_is_ignored(tmp_path):
+    first = _open(tmp_path, fsync_interval=0)
+    first.insert_user("Alice", "alice@example.com", "h", CREATED)
+    first.close()
+    journal = next(tmp_path.glob("journal-*.ndjson"))
+    with journal.open("ab") as handle:
+        handle.write(b'{"op":"user","rec":{"id":2,')
+
+    reopened = _open(tmp_path)
+    try:
+        assert [u["id"] for u in reopened.list_users(None, None)[0]] == [1]
+        reopened.insert_user("Bob", "bob@example.com", "h", CREATED)
+        reopened.insert_user("Carol", "carol@example.com", "h", CREATED)
+    finally:
+        reopened.close()
+
+    again = _open(tmp_path)
+    try:
+        assert [u["id"] for u in again.list_users(None, None)[0]] == [1, 2, 3]
+        assert again.insert_user("Dan", "dan@example.com", "h", CREATED)["id"] == 4
+    finally:
+        again.close()
+
+
+def test_reset_is_journaled(tmp_path):
+    first = _open(tmp_path)
+    _mutate(first)
+    first.reset()
+    first.close()
+
+    second = _open(tmp_path)
+    try:
+        assert _state(second) == ([], [])
+        assert second.insert_user("Alice", "a@example.com", "h", CREATED)["id"] == 1
+    finally:
+        second.close()
+
+
+def test_journals_with_iso_timestamps_still_load(tmp_path):
+    (tmp_path / "journal-00000000.ndjson").write_text(
+        '{"op":"user","rec":{"id":1,"name":"Alice","email":"a@example.com",'
+        '"password_hash":"h","created_at":"2024-01-01T00:00:00Z"}}\n'
+        '{"op":"post","rec":{"id":1,"author":"Ana","content":"hola",'
+        '"created_at":"2024-01-01T00:00:00Z"}}\n'
+    )
+
+    backend = _open(tmp_path)
+    try:
+        users, posts = _state(backend)
+        assert users[0]["created_at"] == posts[0]["created_at"]
+        assert users[0]["created_at"] == "2024-01-01T00:00:00Z"
+        assert users[0].created == CREATED
+    finally:
+        backend.close()
+
+
+def test_pending_count_is_exact_across_user_and_post_writers(tmp_path):
+    backend = _open(tmp_path, snapshot_every=1_000_000)
+
+    def users(offset):
+        for n in range(500):
+            backend.insert_user("U", f"u{offset}-{n}@example.com", "h", CREATED)
+
+    def posts():
+        for n in range(500):
+            backend.insert_post("Ana", f"post {n}", CREATED)
+
+    threads = [threading.Thread(target=users, args=(i,)) for i in range(2)]
+    threads += [threading.Thread(target=posts) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        assert backend._pending == 2_000
+    finally:
+        backend.close()
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from app import hashing
+from app.store import Store
+
+
+@pytest.fixture()
+def cheap_hashing():
+    hashing.configure_hashing(
+        {"HASH_WORKERS": 4, "PASSWORD_HASH_METHOD": "pbkdf2:sha256:1"}
+    )
+    yield
+
+
+def _run_threads(count, target):
+    barrier = threading.Barrier(count)
+    errors = []
+
+    def worker(index):
+        barrier.wait()
+        try:
+            target(index)
+        except Exception as exc:  # pragma: no cover - surfaced by the assert
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+
+@pytest.mark.parametrize("thread_count", [2, 8, 16])
+def test_concurrent_registrations_never_duplicate(cheap_hashing, thread_count):
+    store = Store()
+    distinct_emails = 25
+    conflicts = []
+
+    def register(index):
+        for n in range(distinct_emails):
+            email = f"user{n}@example.com" if index % 2 else f"USER{n}@example.com"
+            try:
+                store.create_user(f"User {n}", email, "Secret123")
+            except ValueError:
+                conflicts.append(email)
+
+    _run_threads(thread_count, register)
+
+    users, _ = store.list_users_page()
+    ids = [user["id"] for user in users]
+    emails = [user["email"].lower() for user in users]
+    assert len(users) == distinct_emails
+    assert len(set(ids)) == len(ids)
+    assert len(set(emails)) == len(emails)
+    assert len(conflicts) == distinct_emails * (thread_count - 1)
+
+
+@pytest.mark.parametrize("thread_count", [2, 8])
+def test_concurrent_posts_get_unique_contiguous_ids(thread_count):
+    store = Store(max_posts=10_000)
+    per_thread = 200
+
+    def publish(index):
+        for n in range(per_thread):
+            store.create_post(f"post {n}", f"t{index}")
+
+    _run_threads(thread_count, publish)
+
+    posts, _ = store.list_posts_page()
+    ids = [post["id"] for post in posts]
+    assert ids == list(range(thread_count * per_thread, 0, -1))
+
+
+def test_readers_see_consistent_records_during_updates(cheap_hashing):
+    store = Store()
+    user = store.create_user("Alice", "alice0@example.com", "Secret123")
+    stop = threading.Event()
+    torn = []
+
+    def reader():
+        while not stop.is_set():
+            current = store.get_user(user["id"])
+            suffix = current["email"][len("alice") : -len("@example.com")]
+            if current["name"] != f"Alice {suffix}" and current["name"] != "Alice":
+                torn.append(current)
+
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in readers:
+        thread.start()
+    for n in range(1, 300):
+        store.update_user(user["id"], name=f"Alice {n}", email=f"alice{n}@example.com")
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    assert not torn
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import pytest
+
+from app.tokens import InvalidTokenError, TokenManager
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _register(client, email="ana@test.com", password="Secreto123"):
+    rv = client.post(
+        "/api/users", json={"name": "Ana", "email": email, "password": password}
+    )
+    return rv.get_json()
+
+
+def _login(client, email="ana@test.com", password="Secreto123"):
+    rv = client.post("/api/auth/login", json={"email": email, "password": password})
+    assert rv.status_code == 200
+    return rv.get_json()["token"]
+
+
+def _bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_tokens_expire_and_reject_tampering():
+    clock = FakeClock()
+    manager = TokenManager("secreto", max_age=60, clock=clock)
+    token = manager.issue(7)
+
+    assert manager.verify(token) == 7
+    assert manager.verify(token) == 7
+    with pytest.raises(InvalidTokenError):
+        manager.verify(token[:-2] + "xx")
+    with pytest.raises(InvalidTokenError):
+        TokenManager("otro-secreto").verify(token)
+
+    clock.now += 61
+    with pytest.raises(InvalidTokenError):
+        manager.verify(token)
+
+
+def test_revocation_applies_to_cached_tokens_only_before_cutoff():
+    clock = FakeClock()
+    manager = TokenManager("secreto", clock=clock)
+    old = manager.issue(1)
+    other = manager.issue(2)
+    manager.verify(old)
+
+    manager.revoke_user(1)
+    fresh = manager.issue(1)
+
+    with pytest.raises(InvalidTokenError):
+        manager.verify(old)
+    assert manager.verify(fresh) == 1
+    assert manager.verify(other) == 2
+
+
+def test_verified_cache_is_bounded():
+    manager = TokenManager("secreto", cache_size=2)
+    for uid in range(5):
+        manager.verify(manager.issue(uid))
+
+    assert len(manager._verified) == 2
+
+
+def test_login_returns_a_token_accepted_by_protected_routes(client):
+    user = _register(client)
+    body = client.post(
+        "/api/auth/login", json={"email": "ana@test.com", "password": "Secreto123"}
+    ).get_json()
+
+    assert body["id"] == user["id"]
+    assert body["expires_in"] == 3600
+    rv = client.put(
+        f"/api/users/{user['id']}",
+        json={"name": "Ana María"},
+        headers=_bearer(body["token"]),
+    )
+    assert rv.status_code == 200
+
+
+def test_tokens_cannot_act_on_other_users(client):
+    _register(client)
+    other = _register(client, email="luis@test.com")
+    token = _login(client)
+
+    rv = client.delete(f"/api/users/{other['id']}", headers=_bearer(token))
+
+    assert rv.status_code == 403
+    assert rv.get_json() == {"error": "forbidden"}
+
+
+def test_invalid_or_missing_tokens(app, client):
+    user = _register(client)
+
+    rv = client.delete(f"/api/users/{user['id']}", headers=_bearer("basura"))
+    assert rv.status_code == 401
+    assert rv.get_json() == {"error": "invalid_token"}
+    assert rv.headers["WWW-Authenticate"] == "Bearer"
+
+    app.config["AUTH_REQUIRED"] = True
+    rv = client.delete(f"/api/users/{user['id']}")
+    assert rv.status_code == 401
+    assert rv.get_json() == {"error": "authentication_required"}
+
+
+def test_password_change_and_delete_revoke_tokens(client):
+    user = _register(client)
+    uid = user["id"]
+    token = _login(client)
+
+    client.put(
+        f"/api/users/{uid}", json={"password": "Nueva1234"}, headers=_bearer(token)
+    )
+    rv = client.put(f"/api/users/{uid}", json={"name": "X"}, headers=_bearer(token))
+    assert rv.status_code == 401
+
+    token = _login(client, password="Nueva1234")
+    assert client.delete(f"/api/users/{uid}", headers=_bearer(token)).status_code == 204
+    rv = client.put(f"/api/users/{uid}", json={"name": "X"}, headers=_bearer(token))
+    assert rv.status_code == 401
+
+
+def test_signed_in_posts_use_the_account_name(client):
+    _register(client)
+    token = _login(client)
+    headers = {**_bearer(token), "X-Author": "Impostor"}
+
+    rv = client.post("/api/wall/posts", json={"content": "hola"}, headers=headers)
+
+    assert rv.status_code == 201
+    assert rv.get_json()["author"] == "Ana"
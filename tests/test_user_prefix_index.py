@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from app.search import UserPrefixIndex, _SortedStrings
+
+
+def test_sorted_strings_stay_ordered_across_block_splits(monkeypatch):
+    monkeypatch.setattr(_SortedStrings, "_LOAD", 2)
+    items = _SortedStrings()
+    for word in ["m", "c", "x", "a", "q", "e", "b", "z", "k"]:
+        items.add(word)
+    items.add("c")
+    items.discard("q")
+    items.discard("missing")
+
+    assert list(items.iter_from("")) == ["a", "b", "c", "e", "k", "m", "x", "z"]
+    assert list(items.iter_from("d")) == ["e", "k", "m", "x", "z"]
+    assert len(items._blocks) > 1
+
+
+def test_prefix_index_tracks_shared_and_unique_terms():
+    index = UserPrefixIndex()
+    index.rebuild(
+        [
+            {"id": 1, "name": "Ana López", "email": "ana@x.com"},
+            {"id": 2, "name": "Ana Ruiz", "email": "ruiz@x.com"},
+        ]
+    )
+    index.put({"id": 3, "name": "Anabel", "email": "Bel@X.com"})
+
+    assert index.search("ana", 10) == [1, 2, 3]
+    assert index.search("ANA L", 10) == [1]
+    assert index.search("bel@", 10) == [3]
+
+    index.remove(2)
+    index.put({"id": 1, "name": "Zoe", "email": "zoe@x.com"})
+
+    assert index.search("ana", 10) == [3]
+    assert index.search("lopez", 10) == []
+    assert len(index) == 2
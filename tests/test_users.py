@@ -35,3 +35,46 @@ def test_list_users(client):
     assert len(data) == 2
     emails = {user["email"] for user in data}
     assert emails == {"alice@example.com", "bob@example.com"}
+
+
+def test_duplicate_email_is_case_insensitive(client):
+    payload = {"name": "Alice", "email": "alice@example.com", "password": "Secret123"}
+    assert client.post("/api/users", json=payload).status_code == 201
+
+    response = client.post("/api/users", json={**payload, "email": "ALICE@Example.com"})
+
+    assert response.status_code == 409
+
+
+def test_email_index_follows_update_and_delete(client):
+    alice = client.post(
+        "/api/users",
+        json={"name": "Alice", "email": "alice@example.com", "password": "Secret123"},
+    ).get_json()
+
+    client.put(f"/api/users/{alice['id']}", json={"email": "alice2@example.com"})
+    reuse_old = client.post(
+        "/api/users",
+        json={"name": "Bob", "email": "Alice@example.com", "password": "Secret123"},
+    )
+    assert reuse_old.status_code == 201
+
+    client.delete(f"/api/users/{alice['id']}")
+    reuse_new = client.post(
+        "/api/users",
+        json={"name": "Carol", "email": "alice2@example.com", "password": "Secret123"},
+    )
+    assert reuse_new.status_code == 201
+
+
+def test_login_lookup_is_case_insensitive(client):
+    client.post(
+        "/api/users",
+        json={"name": "Alice", "email": "alice@example.com", "password": "Secret123"},
+    )
+
+    response = client.post(
+        "/api/auth/login", json={"email": "ALICE@example.com", "password": "Secret123"}
+    )
+
+    assert response.status_code == 200
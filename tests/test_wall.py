@@ -41,3 +41,39 @@ def test_create_post_empty_content(client):
 
     assert response.status_code == 400
     assert response.get_json()["error"] == "invalid_content"
+
+
+def _seed_posts(client, count):
+    for i in range(count):
+        client.post("/api/wall/posts", json={"content": f"Mensaje {i}"})
+
+
+def test_list_posts_newest_first_with_before_id_paging(client):
+    _seed_posts(client, 5)
+
+    first = client.get("/api/wall/posts?limit=2")
+    assert [p["id"] for p in first.get_json()] == [5, 4]
+    assert first.headers["X-Next-Cursor"] == "4"
+
+    second = client.get("/api/wall/posts?limit=2&before_id=4")
+    assert [p["id"] for p in second.get_json()] == [3, 2]
+
+    last = client.get("/api/wall/posts?limit=2&before_id=2")
+    assert [p["id"] for p in last.get_json()] == [1]
+    assert "X-Next-Cursor" not in last.headers
+
+
+def test_wall_keeps_only_configured_number_of_posts(client):
+    from app.store import configure_store
+
+    configure_store({"WALL_MAX_POSTS": 3})
+    _seed_posts(client, 5)
+
+    response = client.get("/api/wall/posts")
+
+    assert [p["content"] for p in response.get_json()] == [
+        "Mensaje 4",
+        "Mensaje 3",
+        "Mensaje 2",
+    ]
+    assert "X-Next-Cursor" not in response.headers
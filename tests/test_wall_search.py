@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from app.search import PostIndex, tokenize
+from app.storage import MemoryBackend
+from app.store import Store, configure_store
+
+
+def _post(client, content, author=None):
+    headers = {"X-Author": author} if author else {}
+    return client.post("/api/wall/posts", json={"content": content}, headers=headers)
+
+
+def _contents(rv):
+    return [post["content"] for post in rv.get_json()]
+
+
+def test_tokenize_folds_case_and_accents():
+    tokens = tokenize("¡Canción del Niño, ANÓNIMO!")
+
+    assert tokens == ["cancion", "del", "nino", "anonimo"]
+
+
+def test_search_is_accent_insensitive_and_covers_author(client):
+    _post(client, "Mañana hay examen de programación")
+    _post(client, "Nada que ver", author="José")
+
+    assert _contents(client.get("/api/wall/search?q=PROGRAMACION")) == [
+        "Mañana hay examen de programación"
+    ]
+    assert _contents(client.get("/api/wall/search?q=jose")) == ["Nada que ver"]
+    assert _contents(client.get("/api/wall/search?q=anónimo")) == [
+        "Mañana hay examen de programación"
+    ]
+
+
+def test_search_requires_every_term_and_ranks_matches(client):
+    _post(client, "flask es un framework de python")
+    _post(client, "python python python")
+    _post(client, "solo flask")
+
+    rv = client.get("/api/wall/search?q=python")
+    assert _contents(rv) == ["python python python", "flask es un framework de python"]
+    assert _contents(client.get("/api/wall/search?q=flask python")) == [
+        "flask es un framework de python"
+    ]
+    assert client.get("/api/wall/search?q=django").get_json() == []
+
+
+def test_search_pages_with_offset_cursor(client):
+    for n in range(5):
+        _post(client, f"mensaje {n}")
+
+    first = client.get("/api/wall/search?q=mensaje&limit=2")
+    assert len(first.get_json()) == 2
+    offset = first.headers["X-Next-Cursor"]
+    assert offset == "2"
+
+    rest = client.get(f"/api/wall/search?q=mensaje&limit=10&offset={offset}")
+    assert len(rest.get_json()) == 3
+    assert "X-Next-Cursor" not in rest.headers
+    seen = {p["id"] for p in first.get_json()} | {p["id"] for p in rest.get_json()}
+    assert seen == {1, 2, 3, 4, 5}
+
+
+def test_search_results_follow_new_posts(client):
+    assert client.get("/api/wall/search?q=nuevo").get_json() == []
+
+    _post(client, "algo nuevo")
+
+    assert _contents(client.get("/api/wall/search?q=nuevo")) == ["algo nuevo"]
+
+
+def test_evicted_posts_leave_the_index(client):
+    configure_store({"WALL_MAX_POSTS": 2})
+    try:
+        for n in range(3):
+            _post(client, f"aviso {n}")
+
+        assert _contents(client.get("/api/wall/search?q=aviso")) == [
+            "aviso 2",
+            "aviso 1",
+        ]
+    finally:
+        configure_store({"WALL_MAX_POSTS": 10_000})
+
+
+def test_store_indexes_posts_already_in_its_backend():
+    backend = MemoryBackend(10)
+    backend.insert_post("Ana", "recuperado del diario", 1704067200)
+
+    store = Store(backend)
+
+    assert [p["content"] for p in store.search_posts("diario")[0]] == [
+        "recuperado del diario"
+    ]
+
+
+def test_index_is_bounded_by_capacity():
+    index = PostIndex(capacity=2)
+    for n in range(1, 5):
+        index.add({"id": n, "author": "Ana", "content": f"palabra{n} comun"})
+
+    assert len(index) == 2
+    assert index.search("palabra1") == ([], None)
+    assert [p["id"] for p in index.search("comun")[0]] == [4, 3]
+
+
+def test_search_validates_query(client):
+    assert client.get("/api/wall/search").status_code == 400
+    assert client.get("/api/wall/search?q=" + "a" * 201).status_code == 400
+    assert client.get("/api/wall/search?q=hola&limit=0").status_code == 400
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import json
+
+from app.events import PostPublisher, PostStream, post_publisher
+from app.store import create_post
+
+
+def _events(response, count):
+    chunks = response.response
+    events = []
+    while len(events) < count:
+        chunk = next(chunks)
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if chunk.startswith("event:") or chunk.startswith("id:"):
+            events.append(chunk)
+    return events
+
+
+def _parse(chunk):
+    fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines())
+    return fields["event"], json.loads(fields["data"]), fields.get("id")
+
+
+def test_stream_resumes_from_last_event_id_then_goes_live(client):
+    for n in range(3):
+        create_post(f"post {n}", "Ana")
+
+    response = client.get(
+        "/api/wall/stream", headers={"Last-Event-ID": "1"}, buffered=False
+    )
+    try:
+        assert response.mimetype == "text/event-stream"
+        backlog = [_parse(chunk) for chunk in _events(response, 2)]
+        assert [(event, post["id"], eid) for event, post, eid in backlog] == [
+            ("post", 2, "2"),
+            ("post", 3, "3"),
+        ]
+
+        create_post("live", "Ana")
+        event, post, eid = _parse(_events(response, 1)[0])
+        assert (event, post["content"], eid) == ("post", "live", "4")
+    finally:
+        response.close()
+    assert len(post_publisher) == 0
+
+
+def test_stream_asks_client_to_reload_when_too_far_behind(client, app):
+    app.config["SSE_BACKLOG"] = 2
+    for n in range(5):
+        create_post(f"post {n}", "Ana")
+
+    response = client.get("/api/wall/stream?last_event_id=1", buffered=False)
+    try:
+        event, _, _ = _parse(_events(response, 1)[0])
+    finally:
+        response.close()
+
+    assert event == "reset"
+
+
+def test_slow_subscriber_is_dropped_instead_of_buffering():
+    publisher = PostPublisher(queue_size=2)
+    slow = publisher.subscribe()
+
+    for n in range(3):
+        publisher.publish({"id": n})
+
+    assert slow.overflowed
+    assert len(publisher) == 0
+    assert [slow.get(0)["id"], slow.get(0)["id"]] == [0, 1]
+
+
+def test_post_stream_skips_posts_the_client_already_has():
+    stream = PostStream(1, json.dumps, 500)
+
+    backlog = list(stream.backlog([{"id": 2}, {"id": 3}]))
+    frames = [stream.frame(post) for post in ({"id": 3}, None, {"id": 4})]
+
+    assert stream.opening() == "retry: 500\n\n"
+    assert [_parse(frame)[2] for frame in backlog] == ["2", "3"]
+    assert frames[:2] == ["", PostStream.keep_alive]
+    assert _parse(frames[2]) == ("post", {"id": 4}, "4")
+    assert list(stream.backlog(None)) == ["event: reset\ndata: {}\n\n"]
+    assert stream.ended